@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from pathlib import Path
+import backtest
 import utils
 
 # =========================================================
@@ -90,32 +90,13 @@ def check_login():
 check_login()
 
 # =========================
-# 3. تحميل البيانات (كما هي في كودك)
+# 3. تحميل البيانات (Lazy – كل dataset يُحمّل عند أول طلب ويُعاد لو ظهر ملف أحدث)
 # =========================
-BASE_DIR = Path(__file__).resolve().parent
-INTRADAY_DIR = BASE_DIR / "intraday"
-TRANSACTION_DIR = BASE_DIR / "transaction"
-
-def get_latest_file(folder: Path, pattern: str):
-    if not folder.exists(): return None
-    files = [f for f in folder.glob(pattern) if not f.name.startswith(("~$", "-$"))]
-    if not files: return None
-    files = sorted(files, key=lambda f: f.stat().st_mtime)
-    return files[-1]
-
-@st.cache_data(show_spinner=False)
-def load_daily_data():
-    intraday_path = get_latest_file(INTRADAY_DIR, "*.xlsx")
-    tx_path = get_latest_file(TRANSACTION_DIR, "*.csv")
-    df_intraday = utils.load_intraday(intraday_path) if intraday_path else None
-    df_tx = utils.load_transactions(tx_path) if tx_path else None
-    signals = None
-    if intraday_path and tx_path:
-        signals = utils.build_signals_for_day(intraday_path, tx_path)
-        signals = utils.apply_ai_score(signals)
-    return df_intraday, df_tx, signals, intraday_path, tx_path
-
-df_intraday, df_tx, signals, intraday_path, tx_path = load_daily_data()
+intraday_path, tx_path = utils.latest_daily_paths()
+
+# لقطة المؤشرات لكل السوق تُحسب مع تحميل ملف الجلسة وتُحفظ بتاريخها
+# (قراءة فقط: إضافة الجلسة لمخزن CASE خطوة نهاية اليوم فى close_session.py)
+utils.daily_screener(intraday_path)
 
 # =========================================================
 # 4. القائمة الجانبية (Sidebar) + زر تسجيل الخروج
@@ -123,7 +104,7 @@ df_intraday, df_tx, signals, intraday_path, tx_path = load_daily_data()
 st.sidebar.title("EGX AI Navigation")
 page = st.sidebar.radio(
     "إختر صفحة",
-    ["📊 Market Overview", "📈 Technical View", "📉 S/R Breakouts", "🤖 AI Recommendations", "📌 Group Picks Ranking", "🧠 AI & News Analytics"]
+    ["📊 Market Overview", "📈 Technical View", "🔎 Market Screener", "📉 S/R Breakouts", "🤖 AI Recommendations", "📌 Group Picks Ranking", "🧠 AI & News Analytics"]
 )
 
 st.sidebar.markdown("---")
@@ -133,6 +114,17 @@ if st.sidebar.button("Logout | تسجيل الخروج", use_container_width=Tru
     st.session_state['logged_in'] = False
     st.rerun()
 
+with st.sidebar.expander("⏱️ إحصائيات تحميل البيانات"):
+    st.dataframe(utils.dataset_stats(), use_container_width=True)
+    live_stats = utils.live_tape_stats()
+    if not live_stats.empty:
+        st.caption("متابعة شريط المعاملات (Live)")
+        st.dataframe(live_stats, use_container_width=True)
+    st.caption("قراءات ملفات المصدر")
+    st.dataframe(utils.load_counts(), use_container_width=True)
+    st.caption("نموذج التوصيات (AI_Prob)")
+    st.dataframe(utils.model_stats(), use_container_width=True)
+
 st.sidebar.markdown("---")
 try: st.sidebar.image("pics/photo.jpg", use_container_width=True)
 except: pass
@@ -152,6 +144,7 @@ st.sidebar.markdown(f"""
 # =========================================================
 if page == "📊 Market Overview":
     st.title("📊 Market Overview – نظرة عامة على السوق")
+    df_intraday = utils.daily_intraday(intraday_path)
 
     if df_intraday is None or df_intraday.empty:
         st.warning("لا توجد بيانات Intraday متاحة.")
@@ -247,6 +240,8 @@ if page == "📊 Market Overview":
 # =========================================================
 elif page == "📈 Technical View":
     st.title("📈 Technical View – المؤشرات الفنية و الشارتات")
+    df_intraday = utils.daily_intraday(intraday_path)
+    signals = utils.daily_signals(intraday_path, tx_path)
 
     if df_intraday is None or df_intraday.empty:
         st.warning("لا توجد بيانات لحظية (intraday) متاحة.")
@@ -256,27 +251,28 @@ elif page == "📈 Technical View":
         st.error("ملف intraday لا يحتوى على عمود Symbol.")
         st.stop()
 
-    # تجهيز قائمة الرموز
+    # تجهيز قائمة الرموز (نسخة: الإطار من cached_dataset مشترك بين كل الصفحات والجلسات)
+    df_intraday = df_intraday.copy()
     df_intraday["Symbol"] = df_intraday["Symbol"].astype(str)
-    symbols_all = sorted(df_intraday["Symbol"].dropna().unique())
+    search_index = utils.daily_symbol_index(intraday_path)
+    symbols_all = search_index["symbols"]
 
-    # خانة بحث
+    # خانة بحث (رمز أو اسم عربى/إنجليزى، الهمزات و ى/ي و ة/ه لا تفرق)
     search_text = st.text_input("اكتب رمز السهم أو جزء من الاسم:", "")
 
     if search_text.strip():
-        mask = df_intraday["Symbol"].str.contains(search_text.strip(), case=False, na=False)
-        if "S. Description" in df_intraday.columns:
-            mask |= df_intraday["S. Description"].astype(str).str.contains(
-                search_text.strip(), case=False, na=False
-            )
-        filtered_symbols = sorted(df_intraday.loc[mask, "Symbol"].unique())
+        filtered_symbols = utils.symbol_index.search(search_index, search_text, limit=len(symbols_all))
         if not filtered_symbols:
             st.warning("لا يوجد أى سهم يطابق النص الذى أدخلته.")
             st.stop()
     else:
         filtered_symbols = symbols_all
 
-    symbol = st.selectbox("اختر سهم للتحليل الفني من النتائج:", filtered_symbols)
+    symbol = st.selectbox(
+        "اختر سهم للتحليل الفني من النتائج:",
+        filtered_symbols,
+        format_func=lambda s: utils.symbol_index.label(search_index, s),
+    )
 
     if not symbol:
         st.stop()
@@ -318,12 +314,12 @@ elif page == "📈 Technical View":
         change_pct = float(change_pct)
 
     # Pivot / R1 / R2 / S1 / S2 (لو مش موجودة نحسبها)
-    row_intr_full = utils.add_pivot_levels(df_intraday[df_intraday["Symbol"] == symbol]).iloc[0]
-    r1 = float(row_intr_full.get("Resistance 1 (R1)", np.nan)) if not pd.isna(row_intr_full.get("Resistance 1 (R1)", np.nan)) else np.nan
-    r2 = float(row_intr_full.get("Resistance 2 (R2)", np.nan)) if not pd.isna(row_intr_full.get("Resistance 2 (R2)", np.nan)) else np.nan
-    s1 = float(row_intr_full.get("Support 1 (S1)", np.nan)) if not pd.isna(row_intr_full.get("Support 1 (S1)", np.nan)) else np.nan
-    s2 = float(row_intr_full.get("Support 2 (S2)", np.nan)) if not pd.isna(row_intr_full.get("Support 2 (S2)", np.nan)) else np.nan
-    pivot = float(row_intr_full.get("Pivot Point", np.nan)) if not pd.isna(row_intr_full.get("Pivot Point", np.nan)) else np.nan
+    levels = utils.symbol_pivots(utils.daily_pivots(intraday_path), symbol)
+    r1 = levels["Resistance 1 (R1)"]
+    r2 = levels["Resistance 2 (R2)"]
+    s1 = levels["Support 1 (S1)"]
+    s2 = levels["Support 2 (S2)"]
+    pivot = levels["Pivot Point"]
 
     # -------- المؤشرات من CASE (MA20/MA50/Vol20 + RSI) --------
     ma20 = ma50 = vol20 = None
@@ -335,29 +331,11 @@ elif page == "📈 Technical View":
             ma20 = float(tech_last["MA20"].iloc[0]) if not pd.isna(tech_last["MA20"].iloc[0]) else None
             ma50 = float(tech_last["MA50"].iloc[0]) if not pd.isna(tech_last["MA50"].iloc[0]) else None
             vol20 = float(tech_last["Vol20"].iloc[0]) if not pd.isna(tech_last["Vol20"].iloc[0]) else None
+            # RSI 14 يوم (من نفس محرك المؤشرات)
+            rsi_last = float(tech_last["RSI14"].iloc[0]) if not pd.isna(tech_last["RSI14"].iloc[0]) else None
         except Exception:
             pass
 
-        # RSI 14 يوم
-        try:
-            close_series = None
-            if "Closed" in df_case.columns:
-                close_series = pd.to_numeric(df_case["Closed"], errors="coerce")
-            elif "Close" in df_case.columns:
-                close_series = pd.to_numeric(df_case["Close"], errors="coerce")
-
-            if close_series is not None and len(close_series) > 14:
-                delta = close_series.diff()
-                gain = delta.clip(lower=0)
-                loss = -delta.clip(upper=0)
-                avg_gain = gain.rolling(14).mean()
-                avg_loss = loss.rolling(14).mean()
-                rs = avg_gain / avg_loss.replace(0, np.nan)
-                rsi = 100 - 100 / (1 + rs)
-                rsi_last = float(rsi.iloc[-1])
-        except Exception:
-            rsi_last = None
-
     # -------- سلوك الجلسة من جدول الإشارات --------
     behavior_label = "غير متاح"
     behavior_expl = "لا توجد بيانات معاملات كافية لهذا السهم فى جلسة اليوم."
@@ -504,6 +482,59 @@ elif page == "📈 Technical View":
     df_indicators = pd.DataFrame(rows)
     st.dataframe(df_indicators, use_container_width=True)
 
+    with st.expander("📐 مستويات Pivot بكل الطرق (يومى / أسبوعى / شهرى)"):
+        st.dataframe(utils.symbol_pivot_table(utils.daily_pivots(intraday_path), symbol),
+                     use_container_width=True)
+
+    # -------- تدفق الصفقات اللحظى (من شريط المعاملات) --------
+    order_flow = utils.symbol_order_flow(utils.daily_ticks(tx_path), symbol)
+    if order_flow is not None:
+        flow_summary, flow_ticks, flow_profile = order_flow
+        st.markdown("---")
+        st.subheader("⚡ تدفق الصفقات اللحظى (Order Flow)")
+
+        o1, o2, o3, o4 = st.columns(4)
+        o1.metric("VWAP", f"{flow_summary['VWAP']:.2f}")
+        o2.metric("Delta (شراء - بيع)", f"{flow_summary['Delta']:,.0f}")
+        o3.metric("عدد الصفقات", f"{int(flow_summary['Trades']):,}")
+        o4.metric("صفقات كبيرة", f"{int(flow_summary['Large_Trades']):,}")
+
+        oc1, oc2 = st.columns(2)
+        with oc1:
+            st.caption("الدلتا التراكمية خلال الجلسة (Cumulative Delta)")
+            if flow_ticks["Seconds"].notna().any():
+                delta_chart = flow_ticks.set_index(pd.to_datetime(flow_ticks["Seconds"], unit="s"))
+            else:
+                delta_chart = flow_ticks
+            st.line_chart(delta_chart["Cum_Delta"])
+        with oc2:
+            st.caption(f"توزيع الحجم على الأسعار (POC ≈ {flow_summary['POC']:.2f})")
+            if not flow_profile.empty:
+                st.bar_chart(flow_profile.assign(Price=flow_profile["Price"].round(2))
+                             .set_index("Price")[["Buy_Volume", "Sell_Volume"]])
+
+        bar_interval = st.selectbox("فترة الشموع (دقائق):", utils.BAR_INTERVALS, index=1)
+        bars = utils.daily_bars(tx_path, bar_interval, symbol)
+        if bars is not None and not bars.empty:
+            st.caption(f"شموع {bar_interval} دقيقة: الإغلاق و VWAP")
+            st.line_chart(bars.set_index("Time")[["Close", "VWAP"]])
+            st.caption("حجم الشراء / البيع لكل شمعة")
+            st.bar_chart(bars.set_index("Time")[["Buy_Volume", "Sell_Volume"]])
+
+        large_ticks = flow_ticks[flow_ticks["Large"]]
+        if not large_ticks.empty:
+            st.caption("الصفقات الكبيرة (أكبر من المتوسط + 3 انحراف معيارى)")
+            st.dataframe(large_ticks.drop(columns="Large"), use_container_width=True)
+
+    # -------- تاريخ إشارات السهم من الأرشيف --------
+    archive = utils.daily_signals_archive()
+    history = utils.symbol_history(archive, symbol)
+    if len(history) > 1:
+        with st.expander(f"📅 إشارات السهم خلال آخر {len(history)} جلسات"):
+            hist_cols = [c for c in ["Date", "Last", "% Change", "buy_ratio", "behavior",
+                                     "AI_Prob", "Pivot Point"] if c in history.columns]
+            st.dataframe(history[hist_cols], use_container_width=True)
+
     # -------- ملخص فنى آلى (Buy / Sell / Wait – تعليمى فقط) --------
     st.markdown("---")
     st.subheader("🧭 ملخص فنى آلى (ليس توصية استثمارية)")
@@ -559,17 +590,85 @@ elif page == "📈 Technical View":
         )
 
 
+# =========================================================
+# 🔎 صفحة Market Screener
+# =========================================================
+elif page == "🔎 Market Screener":
+    st.title("🔎 Market Screener – فلترة السوق بالكامل بالمؤشرات الفنية")
+    screener_df = utils.daily_screener(intraday_path)
+
+    if screener_df is None or screener_df.empty:
+        st.warning("لا توجد لقطة مؤشرات متاحة – تأكد من وجود ملف intraday وملفات CASE.")
+        st.stop()
+
+    st.caption(f"لقطة المؤشرات لجلسة: {screener_df['Trading_Date'].iloc[0]:%Y-%m-%d} – عدد الأسهم: {len(screener_df)}")
+
+    f1, f2, f3, f4 = st.columns(4)
+    with f1:
+        trend_sel = st.multiselect("الاتجاه", utils.TREND_LABELS)
+    with f2:
+        rsi_sel = st.multiselect("منطقة RSI", utils.RSI_ZONES)
+    with f3:
+        vol_sel = st.multiselect("التذبذب", utils.VOLATILITY_LABELS)
+    with f4:
+        brk_sel = st.multiselect("الاختراق", utils.BREAKOUT_STATES)
+
+    df_scr = screener_df
+    if trend_sel:
+        df_scr = df_scr[df_scr["Trend"].isin(trend_sel)]
+    if rsi_sel:
+        df_scr = df_scr[df_scr["RSI_Zone"].isin(rsi_sel)]
+    if vol_sel:
+        df_scr = df_scr[df_scr["Volatility"].isin(vol_sel)]
+    if brk_sel:
+        df_scr = df_scr[df_scr["Breakout"].isin(brk_sel)]
+
+    sort_cols = [c for c in ["% Change", "RSI14", "Volume", "Vol20", "ATR14", "Last"] if c in df_scr.columns]
+    s1_col, s2_col = st.columns([3, 1])
+    with s1_col:
+        sort_by = st.selectbox("ترتيب حسب", sort_cols)
+    with s2_col:
+        ascending = st.checkbox("تصاعدى", value=False)
+
+    cols_show = ["Symbol", "S. Description", "Last", "% Change", "Volume",
+                 "MA20", "MA50", "RSI14", "ATR14", "Vol20",
+                 "Trend", "RSI_Zone", "Volatility", "Breakout"]
+    cols_show = [c for c in cols_show if c in df_scr.columns]
+
+    st.write(f"عدد الأسهم المطابقة: **{len(df_scr)}**")
+    st.dataframe(
+        df_scr.sort_values(sort_by, ascending=ascending)[cols_show],
+        use_container_width=True
+    )
+
+
 # =========================================================
 # 📉 صفحة S/R Breakouts
 # =========================================================
 elif page == "📉 S/R Breakouts":
     st.title("📉 S/R Breakouts – اختراقات الدعوم والمقاومات")
+    df_intraday = utils.daily_intraday(intraday_path)
 
     if df_intraday is None or df_intraday.empty:
         st.warning("لا توجد بيانات Intraday متاحة.")
         st.stop()
 
-    breakouts = utils.find_sr_breakouts(df_intraday)
+    pivot_levels = utils.daily_pivots(intraday_path)
+    col_method, col_timeframe = st.columns(2)
+    with col_method:
+        pivot_method = st.selectbox("طريقة حساب Pivot", utils.pivots.METHODS)
+    with col_timeframe:
+        timeframes = [tf for tf in utils.pivots.TIMEFRAMES if (tf, pivot_method) in pivot_levels["table"]]
+        pivot_timeframe = st.selectbox("الفترة", timeframes,
+                                       format_func={"daily": "يومى", "weekly": "أسبوعى", "monthly": "شهرى"}.get)
+
+    breakouts = utils.find_sr_breakouts(df_intraday, pivot_levels, pivot_method, pivot_timeframe)
+
+    # نسبة نجاح اختراقات كل سهم تاريخياً (Pivot يومى كلاسيكى على تاريخ CASE)
+    breakout_events, breakout_stats = utils.daily_breakout_history()
+    breakouts = utils.attach_breakout_stats(breakouts, breakout_stats)
+    st.caption("Hist_Events / Hit_5d / Avg_Ret_5d: عدد مرات نفس الاختراق للسهم تاريخياً (Pivot يومى "
+               "كلاسيكى من CASE)، ونسبة استمرار الحركة فى اتجاهه ومتوسط العائد بعد 5 جلسات.")
 
     st.subheader("أسهم اخترقت المقاومة الأولى R1 (إغلاق ≥ R1)")
     st.dataframe(breakouts["R1_break"], use_container_width=True)
@@ -583,12 +682,21 @@ elif page == "📉 S/R Breakouts":
     st.subheader("أسهم كسرت الدعم الثانى S2 (إغلاق ≤ S2)")
     st.dataframe(breakouts["S2_break"], use_container_width=True)
 
+    st.subheader("سجل اختراقات سهم تاريخياً")
+    history_symbol = st.selectbox(
+        "اختر سهم:", sorted(breakout_stats.index.get_level_values("Symbol").unique()))
+    if history_symbol:
+        st.dataframe(breakout_stats.loc[history_symbol], use_container_width=True)
+        st.dataframe(utils.symbol_breakouts(breakout_events, history_symbol, last=30),
+                     use_container_width=True)
+
 
 # =========================================================
 # 🤖 AI Recommendations
 # =========================================================
 elif page == "🤖 AI Recommendations":
     st.title("🤖 AI Recommendations – إشارات الذكاء الاصطناعى")
+    signals = utils.daily_signals(intraday_path, tx_path)
 
     if signals is None or signals.empty:
         st.warning("لا توجد إشارات اليوم – تأكد من وجود ملفات intraday و transactions.")
@@ -617,16 +725,34 @@ elif page == "🤖 AI Recommendations":
     except Exception as e:
         st.error(f"تعذر حساب قائمة T+0 / T+1: {e}")
 
+    # -------- اختبار القواعد تاريخياً (Backtest) --------
+    with st.expander("🧪 اختبار تاريخى لقواعد AI_Prob و T0T1_Score (Backtest على CASE)"):
+        try:
+            bt = utils.daily_backtest(top_n=5)
+            st.caption("أعلى 5 أسهم يومياً حسب كل درجة مقابل عائد اليوم التالى.")
+            st.dataframe(backtest.summary_table(bt), use_container_width=True)
+            st.caption("متوسط عائد اليوم التالى لكل شريحة (1 = أقل درجة، 10 = أعلى درجة)")
+            st.bar_chart(backtest.decile_table(bt))
+        except Exception as e:
+            st.error(f"تعذر تشغيل الـ Backtest: {e}")
+
     # -------- علاقات الأسهم من CASE (تأثر متبادل) --------
     st.markdown("---")
     st.subheader("🔗 علاقات حركة الأسعار بين الأسهم (من CASE – تعليمى)")
 
+    corr_window = st.selectbox(
+        "فترة حساب الارتباط",
+        utils.CORR_WINDOWS,
+        format_func=lambda w: "كل التاريخ" if w is None else f"آخر {w} يوم",
+    )
+
     try:
-        rel_df = utils.build_stock_relationships(
-            intraday_df=df_intraday,
+        rel_df = utils.daily_relationships(
+            intraday_path,
+            window=corr_window,
             min_days=60,
             min_abs_corr=0.7,
-            top_n=40
+            top_n=None
         )
 
         if rel_df.empty:
@@ -656,6 +782,7 @@ elif page == "🤖 AI Recommendations":
 # =========================================================
 elif page == "📌 Group Picks Ranking":
     st.title("📌 Group Picks Ranking – تقييم توصيات الجروبات")
+    signals = utils.daily_signals(intraday_path, tx_path)
 
     if signals is None or signals.empty:
         st.warning("لا توجد بيانات إشارات اليوم لاستخدامها فى التقييم.")
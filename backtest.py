@@ -0,0 +1,231 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import correlation
+import utils
+
+# =========================
+# محرك الـ Backtest المتجه لقواعد التقييم
+# =========================
+# كل المدخلات مصفوفات (صفوف = أيام، أعمدة = أسهم) مثل panel الخاص بـ CASE.
+# قواعد apply_ai_score و build_t0_t1_candidates مكتوبة هنا كعمليات على المصفوفة
+# كلها مرة واحدة (كل الأيام × كل الأسهم)، والتقييم (hit rate / الشرائح / turnover /
+# drawdown) كذلك بدون أى حلقة على الأيام أو الأسهم.
+
+TOP_N = 5
+N_DECILES = 10
+
+
+def ai_prob_scores(change, buy_ratio, w_change: float = 0.07, w_buy_ratio: float = 0.3,
+                   w_behavior: float = 0.08, accumulation: float = 0.6,
+                   distribution: float = 0.4) -> np.ndarray:
+    """نفس قواعد apply_ai_score: اتجاه التغير + buy_ratio + سلوك الجلسة، مقصوصة 0.05–0.95."""
+    change = np.asarray(change, dtype=float)
+    br = np.asarray(buy_ratio, dtype=float)
+    with np.errstate(invalid="ignore"):
+        prob = 0.5 + w_change * np.sign(np.nan_to_num(change))
+        prob = prob + w_buy_ratio * np.nan_to_num(br - 0.5)
+        prob = prob + w_behavior * ((br > accumulation).astype(float) - (br < distribution))
+    return np.clip(prob, 0.05, 0.95)
+
+
+def t0t1_mask(range_pct, volume) -> np.ndarray:
+    """
+    فلتر build_t0_t1_candidates لكل يوم: حجم ≥ الوسيط و Range ≥ الوسيط، محسوب
+    على أسهم اليوم فقط (volume = NaN للأسهم غير المتداولة فتُستبعد من الوسيط).
+    """
+    range_pct = np.asarray(range_pct, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # أيام كلها NaN (All-NaN slice)
+        vol_median = np.nanquantile(volume, 0.5, axis=1, keepdims=True)
+        range_median = np.nanquantile(range_pct, 0.5, axis=1, keepdims=True)
+        return (volume >= vol_median) & (range_pct >= range_median)
+
+
+def t0t1_scores(ai_prob, range_pct, volume, buy_ratio, mask=None) -> np.ndarray:
+    """درجة T0T1_Score للأسهم داخل الفلتر (الباقى NaN). mask جاهز من t0t1_mask لو متاح."""
+    if mask is None:
+        mask = t0t1_mask(range_pct, volume)
+    range_pct = np.asarray(range_pct, dtype=float)
+    score = (100 * np.nan_to_num(np.asarray(ai_prob, dtype=float), nan=0.5)
+             + 3 * np.nan_to_num(range_pct)
+             + 50 * (np.nan_to_num(np.asarray(buy_ratio, dtype=float), nan=0.5) - 0.5))
+    return np.where(mask, score, np.nan)
+
+
+def forward_returns(close, horizon: int = 1) -> np.ndarray:
+    """العائد من إغلاق اليوم لإغلاق بعد horizon صف (NaN لو أى طرف ناقص)."""
+    close = np.asarray(close, dtype=float)
+    fwd = np.full(close.shape, np.nan)
+    if horizon < close.shape[0]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fwd[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    fwd[~np.isfinite(fwd)] = np.nan
+    return fwd
+
+
+def _row_ranks(scores: np.ndarray, valid: np.ndarray):
+    """ترتيب تصاعدى لكل صف على القيم الصالحة فقط + عدد الصالح فى كل صف."""
+    order = np.argsort(np.where(valid, scores, np.inf), axis=1, kind="stable")
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, np.arange(scores.shape[1])[None, :], axis=1)
+    return ranks, valid.sum(axis=1, keepdims=True)
+
+
+def evaluate_scores(scores, fwd, top_n: int = TOP_N, n_deciles: int = N_DECILES) -> dict:
+    """
+    تقييم درجة (أعلى = أفضل) مقابل العائد التالى:
+    - hit_rate: نسبة أعلى top_n أسهم يومياً التى عائدها التالى > 0
+    - decile_returns: متوسط العائد التالى لكل شريحة (0 = الأقل درجة)
+    - turnover: متوسط نسبة تغيير المحفظة (أعلى top_n بأوزان متساوية) يومياً
+    - max_drawdown / equity: منحنى المحفظة اليومى
+    """
+    scores = np.asarray(scores, dtype=float)
+    fwd = np.asarray(fwd, dtype=float)
+    valid = ~np.isnan(scores) & ~np.isnan(fwd)
+    ranks, n_valid = _row_ranks(scores, valid)
+
+    # أعلى top_n فى كل يوم = آخر top_n فى الترتيب التصاعدى
+    picks = valid & (ranks >= n_valid - top_n)
+    n_picks = picks.sum(axis=1)
+    active = n_picks > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        port = np.where(active, np.where(picks, fwd, 0).sum(axis=1) / n_picks, np.nan)
+        weights = np.where(picks, 1.0 / n_picks[:, None], 0.0)
+
+    hits = (picks & (fwd > 0)).sum()
+    turnover = 0.5 * np.abs(np.diff(weights[active], axis=0)).sum(axis=1)
+
+    equity = np.cumprod(1 + np.nan_to_num(port))
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    decile = np.where(valid, ranks * n_deciles // np.maximum(n_valid, 1), 0)
+    dec_sum = np.bincount(decile[valid], weights=fwd[valid], minlength=n_deciles)
+    dec_cnt = np.bincount(decile[valid], minlength=n_deciles)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decile_returns = dec_sum / dec_cnt
+
+    return {
+        "days": int(active.sum()),
+        "picks": int(n_picks.sum()),
+        "hit_rate": hits / n_picks.sum() if n_picks.sum() else np.nan,
+        "mean_return": float(np.nanmean(port)) if active.any() else np.nan,
+        "turnover": float(turnover.mean()) if turnover.size else np.nan,
+        "max_drawdown": float(drawdown.min()) if drawdown.size else np.nan,
+        "total_return": float(equity[-1] - 1) if equity.size else np.nan,
+        "decile_returns": decile_returns,
+        "decile_counts": dec_cnt,
+        "portfolio_returns": port,
+        "equity": equity,
+    }
+
+
+def summary_table(results: dict) -> pd.DataFrame:
+    """صف لكل درجة: الأيام، hit rate، متوسط العائد، turnover، أقصى تراجع."""
+    rows = []
+    for name, res in results.items():
+        rows.append({
+            "Score": name,
+            "Days": res["days"],
+            "Picks": res["picks"],
+            "Hit_Rate": res["hit_rate"],
+            "Mean_Return": res["mean_return"],
+            "Turnover": res["turnover"],
+            "Max_Drawdown": res["max_drawdown"],
+            "Total_Return": res["total_return"],
+        })
+    return pd.DataFrame(rows)
+
+
+def decile_table(results: dict) -> pd.DataFrame:
+    """متوسط العائد التالى لكل شريحة (صفوف) ولكل درجة (أعمدة)."""
+    n = max((len(r["decile_returns"]) for r in results.values()), default=0)
+    return pd.DataFrame({name: r["decile_returns"] for name, r in results.items()},
+                        index=pd.RangeIndex(1, n + 1, name="Decile"))
+
+
+# =========================
+# Backtest لقواعد AI_Prob و T0T1_Score على تاريخ CASE
+# =========================
+# مدخلات القواعد لكل يوم تاريخى من panel الـ CASE: اتجاه التغير من الإغلاق السابق،
+# Range = (High - Low) / Close، والحجم. buy_ratio متاح فقط للأيام الموجودة فى أرشيف
+# الإشارات (لها شريط معاملات)، وباقى الأيام NaN (أى سلوك Normal و buy_ratio محايد).
+
+def backtest_inputs(lookback: int = None) -> dict:
+    """مصفوفات (أيام × أسهم): close, change, range_pct, volume, buy_ratio, active."""
+    panel = utils.load_case_panel(align="date")
+    rows = slice(None) if lookback is None else slice(-lookback, None)
+    close, high, low = panel["close"][rows], panel["high"][rows], panel["low"][rows]
+    dates = panel["dates"][rows]
+    active = ~np.isnan(close)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        range_pct = np.where(close > 0, (high - low) / close * 100, np.nan)
+    buy_ratio = np.full(close.shape, np.nan)
+    model_prob = np.full(close.shape, np.nan)
+
+    archive = utils.load_signals_archive()
+    if not archive.empty and "buy_ratio" in archive.columns:
+        hist = archive.reset_index()
+        r = np.searchsorted(dates, hist["Date"].to_numpy().astype("datetime64[D]"))
+        col_of = {sym: j for j, sym in enumerate(panel["symbols"])}
+        c = hist["Symbol"].map(col_of).to_numpy(dtype=float)
+        ok = (r < len(dates)) & ~np.isnan(c)
+        ok[ok] &= dates[r[ok]] == hist["Date"].to_numpy().astype("datetime64[D]")[ok]
+        buy_ratio[r[ok], c[ok].astype(np.int64)] = pd.to_numeric(hist["buy_ratio"], errors="coerce")[ok]
+        # AI_Prob الذى قدمه النموذج فعلاً لهذا اليوم (score_signals) بدل القواعد
+        if "AI_Source" in hist.columns:
+            served = ok & (hist["AI_Source"] == "model").to_numpy()
+            model_prob[r[served], c[served].astype(np.int64)] = \
+                pd.to_numeric(hist["AI_Prob"], errors="coerce")[served]
+
+    volume = np.where(active, np.nan_to_num(panel["volume"][rows]), np.nan)
+    return {
+        "symbols": panel["symbols"],
+        "dates": dates,
+        "close": close,
+        "change": correlation.returns_from_prices(close),
+        "range_pct": range_pct,
+        "volume": volume,
+        "buy_ratio": buy_ratio,
+        "model_prob": model_prob,
+        "active": active,
+        # فلتر T0/T1 لا يعتمد على الأوزان فيُحسب مرة واحدة
+        "t0t1_mask": t0t1_mask(range_pct, volume),
+    }
+
+
+def score_backtest_inputs(inputs: dict, **params) -> dict:
+    """
+    درجات AI_Prob و T0T1_Score لكل الأيام والأسهم.
+    params: أى من utils.AI_SCORE_WEIGHTS أو accumulation / distribution (الافتراضى الحالى).
+    الأيام/الأسهم التى قيّمها النموذج فى الأرشيف (model_prob) تأخذ درجته كما عُرضت،
+    والباقى درجة القواعد بالمعاملات المعطاة.
+    """
+    params = {**utils.AI_SCORE_WEIGHTS, "accumulation": utils.ACCUMULATION_RATIO,
+              "distribution": utils.DISTRIBUTION_RATIO, **params}
+    ai_prob = np.where(inputs["active"],
+                       ai_prob_scores(inputs["change"], inputs["buy_ratio"], **params),
+                       np.nan)
+    model_prob = inputs.get("model_prob")
+    if model_prob is not None:
+        ai_prob = np.where(np.isnan(model_prob), ai_prob, model_prob)
+    t0t1 = t0t1_scores(ai_prob, inputs["range_pct"], inputs["volume"],
+                       inputs["buy_ratio"], mask=inputs["t0t1_mask"])
+    return {"AI_Prob": ai_prob, "T0T1_Score": t0t1}
+
+
+def run_backtest(lookback: int = None, top_n: int = TOP_N, horizon: int = 1,
+                 inputs: dict = None, **params) -> dict:
+    """
+    تقييم AI_Prob و T0T1_Score مقابل عائد horizon يوم التالى على تاريخ CASE كله
+    (أو آخر lookback يوم). يرجع {اسم الدرجة: ناتج evaluate_scores}.
+    """
+    if inputs is None:
+        inputs = backtest_inputs(lookback)
+    fwd = forward_returns(inputs["close"], horizon)
+    return {name: evaluate_scores(scores, fwd, top_n)
+            for name, scores in score_backtest_inputs(inputs, **params).items()}
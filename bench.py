@@ -0,0 +1,340 @@
+"""
+قياسات أداء (Benchmarks) لمسارات التحميل والتحليل على بيانات المشروع.
+
+الاستخدام:
+    python bench.py            # كل القياسات
+    python bench.py case       # قياس واحد بالاسم
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import utils
+
+
+def _timeit(fn, repeat: int = 3):
+    """أفضل زمن (ثوانى) من عدة مرات + ناتج آخر تشغيل."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        # نكتم رسائل الـ print الخاصة بالتحميل حتى لا تؤثر على القياس
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _peak_memory(fn):
+    """زمن تشغيل واحد + ذروة الذاكرة (tracemalloc) + الناتج."""
+    tracemalloc.start()
+    try:
+        seconds, result = _timeit(fn, repeat=1)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def _report(title: str, rows):
+    print(f"\n== {title} ==")
+    base = rows[0][1]
+    for name, seconds in rows:
+        print(f"  {name:<32} {seconds * 1000:10.1f} ms   x{base / seconds:6.2f}")
+
+
+# =========================
+# CASE: قراءة متسلسلة مقابل متوازية مقابل المخزن
+# =========================
+
+def bench_case(workers: int = None):
+    symbols = sorted(p.stem for p in utils.CASE_DIR.glob("*.csv"))
+    workers = workers or min(os.cpu_count() or 1, 8)
+
+    serial, frames = _timeit(lambda: utils.load_case_many(symbols, workers=1), repeat=1)
+    parallel, _ = _timeit(lambda: utils.load_case_many(symbols, workers=workers), repeat=1)
+    utils.ensure_case_store()
+    store_panel, _ = _timeit(lambda: utils.load_case_panel(symbols))
+
+    rows = sum(len(df) for df in frames.values())
+    cpus = os.cpu_count() or 1
+    print(f"CASE files: {len(symbols)} | rows: {rows:,} | workers: {workers} | CPU cores: {cpus}")
+    pool_name = (f"process pool ({workers} workers)" if min(workers, cpus) > 1
+                 else "pool -> serial (1 core)")
+    _report("CASE loading", [
+        ("serial CSV parse", serial),
+        (pool_name, parallel),
+        ("columnar store -> panel", store_panel),
+    ])
+    print("  (سرعة الـ process pool تعتمد على عدد الأنوية؛ على نواة واحدة load_case_many "
+          "يقرأ متسلسلاً)")
+
+
+# =========================
+# intraday: read_excel مقابل streaming مقابل اللقطة المحفوظة
+# =========================
+
+def bench_intraday():
+    files = sorted(f for f in utils.INTRADAY_DIR.glob("*.xlsx") if not f.name.startswith(("~$", "-$")))
+    for path in files:
+        snap = utils._intraday_snapshot_path(path)
+
+        def cold():
+            if snap.exists():
+                snap.unlink()
+            return utils.load_intraday(path)
+
+        read_excel, _ = _timeit(lambda: pd.read_excel(path, engine="openpyxl"))
+        streaming, _ = _timeit(lambda: utils.read_xlsx_streaming(path))
+        cold_load, _ = _timeit(cold)
+        warm_load, df = _timeit(lambda: utils.load_intraday(path))
+
+        print(f"\n{path.name}: {path.stat().st_size / 1024:.0f} KB, {len(df)} rows")
+        _report(f"intraday {path.name}", [
+            ("pd.read_excel (openpyxl)", read_excel),
+            ("streaming read-only parse", streaming),
+            ("cold load_intraday (+snapshot)", cold_load),
+            ("warm load_intraday (snapshot)", warm_load),
+        ])
+
+
+# =========================
+# معاملات الجلسة: التجميع القديم مقابل bincount على شريط صناعى
+# =========================
+
+def _aggregate_transactions_legacy(df_tx):
+    """النسخة القديمة (apply صف بصف + groupby لكل قناع) كمرجع للمقارنة."""
+    if df_tx is None or df_tx.empty:
+        return pd.DataFrame(columns=["Symbol", "total_volume", "total_turnover",
+                                     "buy_volume", "sell_volume", "buy_ratio",
+                                     "behavior"])
+
+    df = df_tx.copy()
+    df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0)
+    df["Turnover"] = pd.to_numeric(df["Turnover"], errors="coerce").fillna(0)
+
+    # تحديد عمليات الشراء والبيع:
+    side = df["Side"].astype(str).str.upper()
+
+    buy_mask = side.isin(["B", "BUY"])
+    sell_mask = side.isin(["S", "SELL"])
+
+    # لو مفيش معلومات فى Side نحاول نستفيد من Direction (2 / -2 / 1...)
+    if (not buy_mask.any()) and ("Direction" in df.columns):
+        dir_col = pd.to_numeric(df["Direction"], errors="coerce")
+        buy_mask = dir_col.gt(0)
+        sell_mask = dir_col.lt(0)
+
+    grouped = df.groupby("Symbol")
+
+    total_volume = grouped["Volume"].sum()
+    total_turnover = grouped["Turnover"].sum()
+    buy_volume = df[buy_mask].groupby("Symbol")["Volume"].sum()
+    sell_volume = df[sell_mask].groupby("Symbol")["Volume"].sum()
+
+    agg = pd.DataFrame({
+        "total_volume": total_volume,
+        "total_turnover": total_turnover,
+        "buy_volume": buy_volume,
+        "sell_volume": sell_volume,
+    }).fillna(0)
+
+    agg["buy_ratio"] = agg.apply(
+        lambda r: r["buy_volume"] / r["total_volume"] if r["total_volume"] > 0 else np.nan,
+        axis=1
+    )
+
+    def classify_behavior(row):
+        if np.isnan(row["buy_ratio"]):
+            return "Normal"
+        if row["buy_ratio"] > 0.6:
+            return "Accumulation"
+        if row["buy_ratio"] < 0.4:
+            return "Distribution"
+        return "Normal"
+
+    agg["behavior"] = agg.apply(classify_behavior, axis=1)
+
+    agg.reset_index(inplace=True)
+    return agg
+
+
+def synthetic_tape(n_rows: int = 1_000_000, n_symbols: int = 250, seed: int = 0,
+                   direction_only: bool = False):
+    """
+    شريط معاملات صناعى بنفس أعمدة transaction/ (Symbol, Side, Volume, Turnover).
+    direction_only: Side فاضى (NaN) والاتجاه فى Direction فقط، مثل بعض ملفات الشريط.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = np.array([f"SYM{i:03d}" for i in range(n_symbols)], dtype=object)
+    volume = rng.integers(1, 5_000, n_rows).astype(float)
+    price = rng.uniform(0.5, 100.0, n_rows)
+    tape = pd.DataFrame({
+        "Symbol": symbols[rng.integers(0, n_symbols, n_rows)],
+        "Side": rng.choice(np.array(["B", "S", "buy", "sell", ""], dtype=object), n_rows),
+        "Volume": volume,
+        "Turnover": volume * price,
+    })
+    if direction_only:
+        tape["Side"] = np.nan
+        tape["Direction"] = rng.choice(np.array([2, 1, -1, -2, 0]), n_rows)
+    return tape
+
+
+def bench_transactions(n_rows: int = 1_000_000):
+    tape = synthetic_tape(n_rows)
+    legacy, expected = _timeit(lambda: _aggregate_transactions_legacy(tape), repeat=1)
+    vectorized, result = _timeit(lambda: utils.aggregate_transactions(tape))
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    print(f"tape rows: {len(tape):,} | symbols: {tape['Symbol'].nunique()}")
+    _report("aggregate_transactions", [
+        ("groupby + row-wise apply", legacy),
+        ("factorize + bincount", vectorized),
+    ])
+
+    # نفس الشريط من ملف CSV: تحميل كامل مقابل قراءة على دفعات (مع ذروة الذاكرة)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tape.csv"
+        tape.to_csv(path, index=False, encoding="cp1256")
+
+        def full():
+            return utils.aggregate_transactions(utils.load_transactions(path))
+
+        full_load, full_peak, expected = _peak_memory(full)
+        stream_load, stream_peak, result = _peak_memory(lambda: utils.aggregate_transactions_file(path))
+        pd.testing.assert_frame_equal(result, expected)
+
+    print(f"\ntape CSV: {n_rows:,} rows | chunk: {utils.TAPE_CHUNK_ROWS:,} rows")
+    _report("aggregate from CSV", [
+        (f"full load (peak {full_peak / 2**20:.0f} MB)", full_load),
+        (f"streaming chunks (peak {stream_peak / 2**20:.0f} MB)", stream_load),
+    ])
+
+    # شريط فيه Direction فقط (Side كله NaN): نفس النتائج من كل المسارات
+    tape = synthetic_tape(n_rows // 10, direction_only=True)
+    legacy, expected = _timeit(lambda: _aggregate_transactions_legacy(tape), repeat=1)
+    vectorized, result = _timeit(lambda: utils.aggregate_transactions(tape))
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tape.csv"
+        tape.to_csv(path, index=False, encoding="cp1256")
+        with contextlib.redirect_stdout(io.StringIO()):
+            streamed = utils.aggregate_transactions_file(path)
+            full = utils.aggregate_transactions(utils.load_transactions(path))
+        pd.testing.assert_frame_equal(streamed, full)
+    _report(f"aggregate_transactions, Direction-only tape ({len(tape):,} rows)", [
+        ("groupby + row-wise apply", legacy),
+        ("factorize + bincount", vectorized),
+    ])
+
+
+# =========================
+# مستويات Pivot: نسخ الإطار فى كل استدعاء مقابل مصفوفات محسوبة مرة واحدة
+# =========================
+
+def _add_pivot_levels_legacy(df_intraday):
+    """النسخة القديمة (نسخ الإطار + تحويل الأعمدة فى كل استدعاء) كمرجع للمقارنة."""
+    df = df_intraday.copy()
+    for col in utils.PIVOT_COLUMNS.values():
+        if col not in df.columns:
+            df[col] = np.nan
+    high = pd.to_numeric(df.get("High"), errors="coerce")
+    low = pd.to_numeric(df.get("Low"), errors="coerce")
+    close_for_pivot = pd.to_numeric(df["Prev. Closed"] if "Prev. Closed" in df.columns
+                                    else df.get("Last"), errors="coerce")
+    need_calc = (high.notna() & low.notna() & close_for_pivot.notna()
+                 & df[list(utils.PIVOT_COLUMNS.values())].isna().all(axis=1))
+    P = (high + low + close_for_pivot) / 3.0
+    calc = {"Pivot Point": P, "Resistance 1 (R1)": 2 * P - low, "Resistance 2 (R2)": P + (high - low),
+            "Support 1 (S1)": 2 * P - high, "Support 2 (S2)": P - (high - low)}
+    for col, values in calc.items():
+        df.loc[need_calc, col] = values[need_calc]
+    return df
+
+
+def _pivot_page_legacy(df_intraday, symbols):
+    df = _add_pivot_levels_legacy(df_intraday)
+    price = pd.to_numeric(df.get("Last"), errors="coerce")
+    for col in ["Resistance 1 (R1)", "Resistance 2 (R2)"]:
+        level = pd.to_numeric(df[col], errors="coerce")
+        df[(price >= level) & level.notna()][utils.SR_BREAKOUT_COLUMNS]
+    for col in ["Support 1 (S1)", "Support 2 (S2)"]:
+        level = pd.to_numeric(df[col], errors="coerce")
+        df[(price <= level) & level.notna()][utils.SR_BREAKOUT_COLUMNS]
+    return [_add_pivot_levels_legacy(df_intraday[df_intraday["Symbol"] == s]).iloc[0] for s in symbols]
+
+
+def _pivot_page_arrays(df_intraday, symbols):
+    levels = utils.pivot_levels(df_intraday)
+    utils.find_sr_breakouts(df_intraday, levels)
+    return [utils.symbol_pivots(levels, s) for s in symbols]
+
+
+def bench_pivots(scale: int = 200, lookups: int = 50):
+    path, _ = utils.latest_daily_paths()
+    if path is None:
+        print("no intraday file")
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = utils.load_intraday(path)
+    # نفس الملف مكرر scale مرة (أسهم بأسماء مختلفة) حتى يظهر فرق الذاكرة
+    df = pd.concat([base.assign(Symbol=base["Symbol"].astype(str) + f"_{i}") for i in range(scale)],
+                   ignore_index=True)
+    symbols = df["Symbol"].iloc[:: max(1, len(df) // lookups)].tolist()
+
+    # الزمن بدون tracemalloc (يبطئ إنشاء الكائنات)، والذروة من تشغيل منفصل
+    legacy, _ = _timeit(lambda: _pivot_page_legacy(df, symbols))
+    arrays, _ = _timeit(lambda: _pivot_page_arrays(df, symbols))
+    legacy_peak = _peak_memory(lambda: _pivot_page_legacy(df, symbols))[1]
+    arrays_peak = _peak_memory(lambda: _pivot_page_arrays(df, symbols))[1]
+
+    print(f"intraday rows: {len(df):,} | symbol lookups: {len(symbols)}")
+    _report("pivot levels + breakouts + lookups", [
+        (f"frame copies (peak {legacy_peak / 2**20:.0f} MB)", legacy),
+        (f"pivot arrays (peak {arrays_peak / 2**20:.0f} MB)", arrays),
+    ])
+
+
+# =========================
+# Backtest: كل تاريخ CASE لكل الأسهم
+# =========================
+
+def bench_backtest():
+    inputs_time, inputs = _timeit(backtest.backtest_inputs, repeat=1)
+    run_time, _ = _timeit(lambda: backtest.run_backtest(inputs=inputs))
+    days, n_symbols = inputs["close"].shape
+    print(f"backtest panel: {days:,} days x {n_symbols} symbols")
+    _report("backtest", [
+        ("inputs (store panel + archive)", inputs_time),
+        ("score + evaluate (2 scores)", run_time),
+    ])
+
+
+BENCHMARKS = {
+    "case": bench_case,
+    "intraday": bench_intraday,
+    "transactions": bench_transactions,
+    "pivots": bench_pivots,
+    "backtest": bench_backtest,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EGX AI benchmarks")
+    parser.add_argument("names", nargs="*",
+                        help="أسماء القياسات (الافتراضى: الكل): " + ", ".join(BENCHMARKS))
+    args = parser.parse_args()
+    unknown = [n for n in args.names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,95 @@
+import numpy as np
+
+# =========================
+# مصنف نموذج التوصيات (بدون scikit-learn)
+# =========================
+# Logistic regression بـ numpy فقط بنفس واجهة scikit-learn (fit / predict_proba /
+# predict / get_params)، فملف models/model_stock_reco.pkl يُقرأ فى أى بيئة فيها
+# numpy، ويمكن استبداله بأى مصنف من sklearn بدون تغيير utils.score_signals.
+# الخصائص تُوحّد (mean / scale) داخل النموذج، والتدريب Newton (IRLS) مع L2.
+
+
+class LogisticClassifier:
+    """تصنيف ثنائى: هل عائد الجلسة التالية > 0. الفئة 1 = صعود."""
+
+    def __init__(self, alpha: float = 1.0, max_iter: int = 50, tol: float = 1e-6):
+        self.alpha = alpha
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def get_params(self, deep: bool = True) -> dict:
+        return {"alpha": self.alpha, "max_iter": self.max_iter, "tol": self.tol}
+
+    def set_params(self, **params):
+        for k, v in params.items():
+            setattr(self, k, v)
+        return self
+
+    def fit(self, X, y, feature_names=None):
+        """X: (صفوف × خصائص) بدون NaN، y: 0/1. feature_names تُحفظ فى feature_names_in_."""
+        if hasattr(X, "columns"):
+            feature_names = list(X.columns)
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        self.mean_ = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+        Z = np.column_stack([np.ones(len(X)), (X - self.mean_) / self.scale_])
+
+        # L2 على المعاملات فقط (بدون الـ intercept)
+        penalty = np.full(Z.shape[1], self.alpha)
+        penalty[0] = 0.0
+        w = np.zeros(Z.shape[1])
+        self.n_iter_ = 0
+        for self.n_iter_ in range(1, self.max_iter + 1):
+            p = _sigmoid(Z @ w)
+            grad = Z.T @ (p - y) + penalty * w
+            hess = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(penalty)
+            step = np.linalg.solve(hess, grad)
+            w -= step
+            if np.abs(step).max() < self.tol:
+                break
+
+        self.intercept_ = w[:1]
+        self.coef_ = w[1:][None, :]
+        self.classes_ = np.array([0, 1])
+        self.n_features_in_ = X.shape[1]
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        return self
+
+    def decision_function(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        return ((X - self.mean_) / self.scale_) @ self.coef_[0] + self.intercept_[0]
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = _sigmoid(self.decision_function(X))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.decision_function(X) > 0).astype(np.int64)]
+
+    def score(self, X, y) -> float:
+        """الدقة (accuracy) مثل sklearn."""
+        return float(np.mean(self.predict(X) == np.asarray(y)))
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+def roc_auc(y, prob) -> float:
+    """مساحة ROC من الترتيب (Mann–Whitney) مع متوسط الرتب للقيم المتساوية."""
+    y = np.asarray(y, dtype=bool)
+    prob = np.asarray(prob, dtype=float)
+    n_pos, n_neg = y.sum(), (~y).sum()
+    if n_pos == 0 or n_neg == 0:
+        return np.nan
+    order = np.argsort(prob, kind="stable")
+    ranks = np.empty(len(prob))
+    ranks[order] = np.arange(1, len(prob) + 1)
+    # القيم المتساوية تأخذ متوسط رتبها
+    _, inv, counts = np.unique(prob, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inv, weights=ranks) / counts)[inv]
+    return float((ranks[y].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
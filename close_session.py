@@ -0,0 +1,24 @@
+"""
+إغلاق الجلسة (نهاية اليوم): إضافة ملف intraday النهائى لمخزن CASE التاريخى
+وأرشفة إشارات اليوم (الصفحات لا تؤرشف الجلسة المفتوحة).
+
+الصفحات لا تكتب فى المخزن، فيُشغَّل هذا السكريبت بعد انتهاء التداول ووصول ملف
+الجلسة النهائى (إعادة تشغيله على ملف أحدث لنفس اليوم تستبدل صفوف اليوم).
+
+الاستخدام:
+    python close_session.py                        # أحدث ملف فى intraday/
+    python close_session.py intraday/14-1-2026.xlsx
+"""
+import argparse
+from pathlib import Path
+
+import utils
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EGX AI end-of-day CASE update")
+    parser.add_argument("intraday", nargs="?", type=Path, help="ملف الجلسة (الافتراضى: الأحدث)")
+    args = parser.parse_args()
+
+    added = utils.close_session(args.intraday)
+    print(f"Session closed: {added} CASE rows written.")
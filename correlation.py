@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# محرك الارتباط (Correlation) المتجه لكل السوق
+# =========================
+# الارتباط لكل زوج يُحسب على الأيام المشتركة فقط (pairwise-complete) مثل
+# pandas DataFrame.corr(min_periods=...)، لكن بضرب مصفوفات NumPy (corr_stats)
+# بدلاً من inner join يحذف أى يوم ناقص فى أى سهم.
+
+PAIR_COLUMNS = ["Symbol_A", "Symbol_B", "Corr", "Relation"]
+
+
+def returns_from_prices(close) -> np.ndarray:
+    """
+    العائد اليومى لكل سهم على panel مرتب بالتاريخ (صفوف = أيام).
+    العائد محسوب من آخر إغلاق متاح للسهم (الأيام الناقصة تبقى NaN).
+    """
+    close = np.asarray(close, dtype=float)
+    n_rows = close.shape[0]
+    valid = ~np.isnan(close)
+
+    # رقم آخر صف صالح حتى كل صف (forward-fill بالمؤشرات)
+    idx = np.where(valid, np.arange(n_rows)[:, None], -1)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    prev_idx = np.full(close.shape, -1)
+    prev_idx[1:] = idx[:-1]
+
+    cols = np.arange(close.shape[1])[None, :]
+    prev = np.where(prev_idx >= 0, close[np.clip(prev_idx, 0, None), cols], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = close / prev - 1
+    ret[~valid | ~np.isfinite(ret)] = np.nan
+    return ret
+
+
+def _block_stats(x: np.ndarray, m: np.ndarray, cols: slice):
+    """إحصائيات الأيام المشتركة بين الأعمدة cols وكل الأعمدة."""
+    xb, mb = x[:, cols], m[:, cols]
+    n = mb.T @ m                    # عدد الأيام المشتركة
+    sx = xb.T @ m                   # مجموع قيم البلوك على الأيام المشتركة
+    sy = mb.T @ x                   # مجموع قيم العمود الآخر على الأيام المشتركة
+    sxx = (xb * xb).T @ m
+    syy = mb.T @ (x * x)
+    sxy = xb.T @ x
+    return n, sx, sy, sxx, syy, sxy
+
+
+def _corr_from_stats(n, sx, sy, sxx, syy, sxy, min_overlap: int) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / n
+        vx = sxx - sx * sx / n
+        vy = syy - sy * sy / n
+        corr = cov / np.sqrt(vx * vy)
+    corr[(n < max(min_overlap, 2)) | ~np.isfinite(corr)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _masked(returns):
+    r = np.asarray(returns, dtype=float)
+    if r.ndim == 1:
+        r = r.reshape(1, -1)
+    m = (~np.isnan(r)).astype(float)
+    return np.where(m > 0, r, 0.0), m
+
+
+def _pairs_frame(a_idx, b_idx, values, symbols) -> pd.DataFrame:
+    if len(values) == 0:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    order = np.argsort(-np.abs(values), kind="stable")
+    a_idx, b_idx, values = a_idx[order], b_idx[order], values[order]
+    symbols = np.asarray(symbols, dtype=object)
+    return pd.DataFrame({
+        "Symbol_A": symbols[a_idx],
+        "Symbol_B": symbols[b_idx],
+        "Corr": values,
+        "Relation": np.where(values > 0, "Positive", "Negative"),
+    })
+
+
+def _upper_hits(corr: np.ndarray, row_offset: int, min_abs_corr: float):
+    """مؤشرات المثلث العلوى (j > i) التى |corr| >= min_abs_corr."""
+    rows = np.arange(row_offset, row_offset + corr.shape[0])[:, None]
+    upper = np.arange(corr.shape[1])[None, :] > rows
+    with np.errstate(invalid="ignore"):
+        bi, bj = np.nonzero(upper & (np.abs(corr) >= min_abs_corr))
+    return bi + row_offset, bj, corr[bi, bj]
+
+
+# =========================
+# الإحصائيات الكافية (Sufficient statistics) مع تحديث يومى
+# =========================
+# لكل زوج نحتفظ بـ: عدد الأيام المشتركة n، مجموع x على الأيام المشتركة sx،
+# مجموع x² sxx، ومجموع x·y sxy (كلها N × N؛ sy = sx.T و syy = sxx.T).
+# إضافة يوم (أو حذف يوم خارج من نافذة متحركة) = تحديث rank-1 لهذه المصفوفات.
+
+def corr_stats(returns) -> dict:
+    """الإحصائيات الكافية لكل الأزواج من panel عوائد (صفوف = أيام)."""
+    x, m = _masked(returns)
+    n, sx, _, sxx, _, sxy = _block_stats(x, m, slice(None))
+    return {"n": n, "sx": sx, "sxx": sxx, "sxy": sxy}
+
+
+def update_corr_stats(stats: dict, add_rows=None, remove_rows=None) -> dict:
+    """إضافة أيام جديدة و/أو حذف أيام خرجت من النافذة (كل صف = يوم لكل الأسهم)."""
+    for rows, sign in ((add_rows, 1.0), (remove_rows, -1.0)):
+        if rows is None or np.size(rows) == 0:
+            continue
+        delta = corr_stats(rows)
+        for k in stats:
+            stats[k] += sign * delta[k]
+    return stats
+
+
+def corr_from_stats(stats: dict, idx=None, min_overlap: int = 60) -> np.ndarray:
+    """مصفوفة الارتباط من الإحصائيات (idx لاختيار مجموعة أسهم فقط)."""
+    if idx is None:
+        idx = np.arange(stats["n"].shape[0])
+    sub = np.ix_(idx, idx)
+    n, sx, sxx, sxy = (stats[k][sub] for k in ("n", "sx", "sxx", "sxy"))
+    return _corr_from_stats(n, sx, sx.T, sxx, sxx.T, sxy, min_overlap)
+
+
+def pairs_from_corr(corr: np.ndarray, symbols, min_abs_corr: float = 0.7) -> pd.DataFrame:
+    """
+    كل الأزواج (i < j) التى |corr| >= min_abs_corr من مصفوفة ارتباط جاهزة،
+    مرتبة تنازلياً بالقيمة المطلقة.
+    """
+    a_idx, b_idx, values = _upper_hits(corr, 0, min_abs_corr)
+    return _pairs_frame(a_idx, b_idx, values, symbols)
@@ -0,0 +1,245 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import technicals
+import utils
+
+# =========================
+# خصائص (Features) نموذج التوصيات
+# =========================
+# نفس الدالة تُستخدم للتدريب (كل الأيام من تاريخ CASE) وللتقييم اللحظى (آخر صفوف
+# CASE لكل سهم + صف لقطة الجلسة المفتوحة)، فالنموذج يرى نفس التعريفات فى الحالتين.
+# كل الخصائص نسب/فروق بدون وحدات حتى تكون قابلة للمقارنة بين الأسهم.
+
+FEATURE_COLUMNS = [
+    "ret_1d", "ret_5d",            # عائد يوم / 5 أيام
+    "ma20_ratio", "ma50_ratio",    # الإغلاق / المتوسط - 1
+    "rsi14",                       # RSI / 100
+    "range_pct",                   # (High - Low) / Close
+    "vol_z20",                     # z-score للحجم على 20 يوم
+    "pivot_dist", "r1_dist", "s1_dist",  # الإغلاق / مستوى Pivot الكلاسيكى من اليوم السابق - 1
+    "buy_ratio",                   # من شريط المعاملات (NaN لو غير متاح)
+]
+
+# صفوف التاريخ المطلوبة لحساب آخر صف (MA50 + RSI + هامش)
+FEATURE_LOOKBACK = 60
+
+
+def _shift(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if n < x.shape[0]:
+        out[n:] = x[:-n]
+    return out
+
+
+def _ratio(a, b) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = a / b - 1
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def panel_features(close, high, low, volume, buy_ratio=None) -> dict:
+    """
+    كل الخصائص لكل صف فى panel (صفوف = جلسات السهم، أعمدة = أسهم).
+    الأنسب panel بمحاذاة align="last" حتى تكون الصفوف جلسات متتالية لكل سهم.
+    """
+    close, high, low, volume = (technicals._as_2d(x) for x in (close, high, low, volume))
+    prev_close = _shift(close, 1)
+    prev_high, prev_low = _shift(high, 1), _shift(low, 1)
+
+    vol_mean = technicals.rolling_mean(volume, 20)
+    vol_std = technicals.rolling_std(volume, 20)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_z = np.where(vol_std > 0, (volume - vol_mean) / vol_std, 0.0)
+        range_pct = np.where(close > 0, (high - low) / close, np.nan)
+    vol_z[np.isnan(vol_mean)] = np.nan
+
+    pivot = (prev_high + prev_low + prev_close) / 3
+    out = {
+        "ret_1d": _ratio(close, prev_close),
+        "ret_5d": _ratio(close, _shift(close, 5)),
+        "ma20_ratio": _ratio(close, technicals.rolling_mean(close, 20)),
+        "ma50_ratio": _ratio(close, technicals.rolling_mean(close, 50)),
+        "rsi14": technicals.rsi(close) / 100,
+        "range_pct": range_pct,
+        "vol_z20": vol_z,
+        "pivot_dist": _ratio(close, pivot),
+        "r1_dist": _ratio(close, 2 * pivot - prev_low),
+        "s1_dist": _ratio(close, 2 * pivot - prev_high),
+    }
+    # بدون شريط تبقى NaN: الصف لا يدخل التدريب ولا تقييم النموذج (لا قيمة ثابتة بديلة)
+    out["buy_ratio"] = np.full(close.shape, np.nan) if buy_ratio is None else technicals._as_2d(buy_ratio)
+    return out
+
+
+def feature_matrix(features: dict, row: int = -1) -> np.ndarray:
+    """مصفوفة (أسهم × خصائص) لصف واحد من panel_features بترتيب FEATURE_COLUMNS."""
+    return np.column_stack([features[c][row] for c in FEATURE_COLUMNS])
+
+
+# =========================
+# مخزن الخصائص (Feature store)
+# =========================
+# خصائص panel_features لكل (سهم، جلسة) من تاريخ CASE بنفس ترتيب صفوف
+# مخزن CASE (شريحة متصلة لكل سهم)، داخل cache/features:
+#   values.npy : (عدد الخصائص × عدد الصفوف) float64
+#   index.json : لكل سهم [start, stop, آخر تاريخ, size, mtime_ns] لملف الـ CSV الأصلى
+# لو ملف الـ CSV لم يتغير والصفوف القديمة كما هى، تُنسخ خصائصها ونحسب الصفوف
+# الجديدة فقط (جلسة اليوم المضافة بـ close_session) من آخر
+# FEATURE_LOOKBACK صف؛ لو الملف اتغير تُعاد خصائص السهم كله.
+
+FEATURE_STORE_VERSION = 2
+_FEATURE_STORE_CACHE = {}
+
+
+def _open_feature_store():
+    index_path = utils.FEATURE_STORE_DIR / "index.json"
+    if not index_path.exists():
+        return None
+
+    sig = utils._file_signature(index_path)
+    cached = _FEATURE_STORE_CACHE.get("store")
+    if cached is not None and cached["signature"] == sig:
+        return cached
+
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    store = {
+        "signature": sig,
+        "version": index.get("version"),
+        "columns": index["columns"],
+        "case_signature": index.get("case_signature"),
+        "symbols": index["symbols"],
+        "values": np.load(utils.FEATURE_STORE_DIR / "values.npy", mmap_mode="r"),
+    }
+    _FEATURE_STORE_CACHE["store"] = store
+    return store
+
+
+def _write_feature_store(symbols: dict, values: np.ndarray, case_signature: list):
+    utils.FEATURE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    _FEATURE_STORE_CACHE.clear()
+    utils._save_npy(utils.FEATURE_STORE_DIR / "values.npy", values)
+
+    index_path = utils.FEATURE_STORE_DIR / "index.json"
+    tmp = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": FEATURE_STORE_VERSION, "columns": FEATURE_COLUMNS,
+                   "case_signature": case_signature, "symbols": symbols}, f)
+    os.replace(tmp, index_path)
+
+
+def _fill_feature_rows(values: np.ndarray, store: dict, jobs: list, lookback: int = None):
+    """
+    jobs: [(symbol, عدد الصفوف الأخيرة المطلوبة)]. الخصائص تُحسب لكل الأسهم مرة واحدة
+    على panel بمحاذاة last ثم تُكتب فى صفوف المخزن المقابلة.
+    """
+    if not jobs:
+        return
+    panel = utils._panel_from_store(store, [sym for sym, _ in jobs], align="last", lookback=lookback)
+    feats = panel_features(panel["close"], panel["high"], panel["low"], panel["volume"])
+    n_rows = panel["close"].shape[0]
+    for j, (sym, n_new) in enumerate(jobs):
+        stop = store["symbols"][sym][1]
+        for k, c in enumerate(FEATURE_COLUMNS):
+            values[k, stop - n_new:stop] = feats[c][n_rows - n_new:, j]
+
+
+def build_feature_store(force: bool = False) -> dict:
+    """
+    تحديث مخزن الخصائص ليطابق مخزن CASE الحالى (الصفوف الجديدة فقط إن أمكن).
+    يرجع المخزن بعد فتحه.
+    """
+    store = utils.ensure_case_store()
+    case_sig = utils._file_signature(utils.CASE_STORE_DIR / "index.json")
+    old = None if force else _open_feature_store()
+    if old is not None and (old["columns"] != FEATURE_COLUMNS
+                            or old["version"] != FEATURE_STORE_VERSION):
+        old = None
+    if old is not None and old["case_signature"] == case_sig:
+        return old
+
+    n_total = store["dates"].shape[0]
+    values = np.full((len(FEATURE_COLUMNS), n_total), np.nan)
+    symbols, full, tails = {}, [], []
+    reused = 0
+    for sym, (start, stop, *source_sig) in store["symbols"].items():
+        last = str(store["dates"][stop - 1]) if stop > start else None
+        symbols[sym] = [start, stop, last] + source_sig
+
+        entry = old["symbols"].get(sym) if old is not None else None
+        n_old = entry[1] - entry[0] if entry is not None else 0
+        if (entry is None or entry[3:] != source_sig or n_old > stop - start
+                or (n_old and str(store["dates"][start + n_old - 1]) != entry[2])):
+            full.append((sym, stop - start))
+            continue
+
+        # آخر صف قديم يُعاد حسابه دائماً: ممكن يكون اتستبدل بملف الجلسة النهائى بنفس التاريخ
+        n_keep = max(n_old - 1, 0)
+        values[:, start:start + n_keep] = old["values"][:, entry[0]:entry[0] + n_keep]
+        reused += 1
+        if stop - start > n_keep:
+            tails.append((sym, stop - start - n_keep))
+
+    _fill_feature_rows(values, store, full)
+    if tails:
+        _fill_feature_rows(values, store, tails,
+                           lookback=FEATURE_LOOKBACK + max(n for _, n in tails))
+
+    _write_feature_store(symbols, values, case_sig)
+    print(f"Feature store built: {len(symbols)} symbols, {n_total} rows "
+          f"({len(full)} recomputed, {sum(n for _, n in tails)} new rows, {reused} reused).")
+    return _open_feature_store()
+
+
+def training_set(horizon: int = 1) -> dict:
+    """
+    مصفوفة التدريب من مخزن الخصائص: X (صفوف × FEATURE_COLUMNS)، y = عائد الجلسة
+    بعد horizon جلسة للسهم نفسه > 0، مع dates / symbols / fwd لكل صف.
+    buy_ratio من أرشيف الإشارات، فالأيام التى ليس لها شريط معاملات لا تدخل التدريب
+    (الصفوف التى تنقصها أى خاصية أو العائد التالى تُستبعد).
+    """
+    feats = build_feature_store()
+    store = utils.ensure_case_store()
+    X = np.array(feats["values"]).T
+    dates = np.asarray(store["dates"])
+
+    names = sorted(store["symbols"], key=lambda s: store["symbols"][s][0])
+    bounds = np.array([store["symbols"][s][:2] for s in names]).reshape(-1, 2)
+    sym_code = np.repeat(np.arange(len(names)), bounds[:, 1] - bounds[:, 0])
+    row_stop = np.repeat(bounds[:, 1], bounds[:, 1] - bounds[:, 0])
+
+    archive = utils.load_signals_archive()
+    if not archive.empty and "buy_ratio" in archive.columns:
+        hist = archive["buy_ratio"].reset_index()
+        hist_dates = hist["Date"].to_numpy().astype("datetime64[D]")
+        col = FEATURE_COLUMNS.index("buy_ratio")
+        br = pd.to_numeric(hist["buy_ratio"], errors="coerce").to_numpy(dtype=float)
+        for sym, pos in hist.groupby("Symbol").indices.items():
+            if sym not in store["symbols"]:
+                continue
+            start, stop = store["symbols"][sym][:2]
+            r = start + np.searchsorted(dates[start:stop], hist_dates[pos])
+            ok = (r < stop) & ~np.isnan(br[pos])
+            ok[ok] &= dates[r[ok]] == hist_dates[pos][ok]
+            X[r[ok], col] = br[pos][ok]
+
+    close = np.asarray(store["values"][utils.CASE_NUMERIC_COLUMNS.index("Closed")])
+    rows = np.arange(len(close))
+    nxt = np.minimum(rows + horizon, len(close) - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fwd = np.where(rows + horizon < row_stop, close[nxt] / close - 1, np.nan)
+    fwd[~np.isfinite(fwd)] = np.nan
+
+    keep = ~np.isnan(X).any(axis=1) & ~np.isnan(fwd) & ~np.isnat(dates)
+    return {
+        "X": X[keep],
+        "y": (fwd[keep] > 0).astype(np.int64),
+        "fwd": fwd[keep],
+        "dates": dates[keep],
+        "symbols": np.asarray(names, dtype=object)[sym_code[keep]],
+    }
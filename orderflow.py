@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# تحليلات الصفقات اللحظية (Order flow) لكل الأسهم
+# =========================
+# مرور واحد متجه على الشريط بعد ترتيبه بـ (السهم، الوقت، رقم التسلسل):
+# صفقات كل سهم تصبح جزءاً متصلاً [offsets[i], offsets[i+1]) من المصفوفات،
+# فـ VWAP / الدلتا التراكمية / الصفقات الكبيرة / توزيع الحجم على الأسعار كلها
+# bincount أو cumsum على المصفوفة كلها بدون حلقة على الأسهم.
+
+PROFILE_BINS = 24
+LARGE_TRADE_SIGMA = 3.0
+
+BAR_COLUMNS = ["Symbol", "Time", "Open", "High", "Low", "Close", "Volume",
+               "Buy_Volume", "Sell_Volume", "Trades", "VWAP"]
+
+SUMMARY_COLUMNS = ["Symbol", "Trades", "Volume", "VWAP", "Delta",
+                   "Large_Trades", "Large_Volume", "POC"]
+
+
+def _segment_offsets(codes: np.ndarray, n_symbols: int) -> np.ndarray:
+    counts = np.bincount(codes, minlength=n_symbols)
+    return np.concatenate([[0], np.cumsum(counts)])
+
+
+def tick_analytics(codes, price, volume, sign, seconds=None, seq=None,
+                   n_symbols: int = None, bins: int = PROFILE_BINS,
+                   large_sigma: float = LARGE_TRADE_SIGMA) -> dict:
+    """
+    codes: رقم السهم لكل صفقة (-1 = بدون رمز وتُستبعد).
+    sign: +1 شراء / -1 بيع / 0 غير معروف.
+    seconds / seq: للترتيب الزمنى داخل كل سهم (اختيارى).
+    يرجع dict من مصفوفات مضغوطة (صفقات مرتبة + ملخص لكل سهم + volume profile).
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    if n_symbols is None:
+        n_symbols = int(codes.max()) + 1 if codes.size else 0
+
+    rows = np.flatnonzero(codes >= 0)
+    codes = codes[rows]
+    seconds = np.full(rows.size, np.nan) if seconds is None else np.asarray(seconds, dtype=float)[rows]
+    seq = np.full(rows.size, np.nan) if seq is None else np.asarray(seq, dtype=float)[rows]
+
+    # الترتيب: السهم ثم الوقت ثم التسلسل ثم ترتيب الملف (القيم الناقصة فى الآخر)
+    order = np.lexsort((rows, np.nan_to_num(seq, nan=np.inf),
+                        np.nan_to_num(seconds, nan=np.inf), codes))
+    rows, codes, seconds = rows[order], codes[order], seconds[order]
+    price = np.asarray(price, dtype=float)[rows]
+    volume = np.nan_to_num(np.asarray(volume, dtype=float)[rows])
+    sign = np.asarray(sign, dtype=float)[rows]
+
+    offsets = _segment_offsets(codes, n_symbols)
+    starts, trades = offsets[:-1], np.diff(offsets)
+
+    # VWAP على الصفقات التى لها سعر
+    priced = ~np.isnan(price)
+    pv = np.bincount(codes[priced], weights=price[priced] * volume[priced], minlength=n_symbols)
+    priced_volume = np.bincount(codes[priced], weights=volume[priced], minlength=n_symbols)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap = np.where(priced_volume > 0, pv / priced_volume, np.nan)
+
+    # الدلتا التراكمية داخل كل سهم: cumsum واحد ثم طرح قيمته قبل بداية السهم
+    signed = sign * volume
+    cs = np.cumsum(signed)
+    before = np.zeros(n_symbols)
+    nonempty = trades > 0
+    before[nonempty] = cs[starts[nonempty]] - signed[starts[nonempty]]
+    cum_delta = cs - np.repeat(before, trades)
+
+    # الصفقات الكبيرة: حجم > المتوسط + large_sigma × الانحراف المعيارى للسهم
+    total = np.bincount(codes, weights=volume, minlength=n_symbols)
+    sq = np.bincount(codes, weights=volume * volume, minlength=n_symbols)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / trades
+        std = np.sqrt(np.clip(sq / trades - mean * mean, 0, None))
+    threshold = mean + large_sigma * std
+    large = volume > threshold[codes]
+
+    # توزيع الحجم على مستويات سعرية متساوية بين أدنى وأعلى سعر للسهم
+    low = np.full(n_symbols, np.nan)
+    high = np.full(n_symbols, np.nan)
+    if priced.any():
+        np.fmin.at(low, codes[priced], price[priced])
+        np.fmax.at(high, codes[priced], price[priced])
+    width = (high - low) / bins
+    with np.errstate(divide="ignore", invalid="ignore"):
+        level = np.floor((price - low[codes]) / width[codes])
+    level = np.clip(np.nan_to_num(level, nan=0.0), 0, bins - 1).astype(np.int64)
+    flat = codes[priced] * bins + level[priced]
+    profile = np.bincount(flat, weights=volume[priced], minlength=n_symbols * bins)
+    profile_buy = np.bincount(flat, weights=np.where(sign[priced] > 0, volume[priced], 0.0),
+                              minlength=n_symbols * bins)
+
+    return {
+        "offsets": offsets,
+        "seconds": seconds,
+        "price": price,
+        "volume": volume,
+        "sign": sign.astype(np.int8),
+        "cum_delta": cum_delta,
+        "large": large,
+        "trades": trades,
+        "total_volume": total,
+        "vwap": vwap,
+        "delta": np.bincount(codes, weights=signed, minlength=n_symbols),
+        "large_threshold": threshold,
+        "large_trades": np.bincount(codes, weights=large, minlength=n_symbols).astype(np.int64),
+        "large_volume": np.bincount(codes[large], weights=volume[large], minlength=n_symbols),
+        "profile_low": low,
+        "profile_high": high,
+        "profile": profile.reshape(n_symbols, bins),
+        "profile_buy": profile_buy.reshape(n_symbols, bins),
+    }
+
+
+def symbol_ticks(result: dict, i: int) -> pd.DataFrame:
+    """صفقات سهم واحد مرتبة زمنياً (Seconds = ثوانى من بداية اليوم)."""
+    part = slice(result["offsets"][i], result["offsets"][i + 1])
+    return pd.DataFrame({
+        "Seconds": result["seconds"][part],
+        "Price": result["price"][part],
+        "Volume": result["volume"][part],
+        "Cum_Delta": result["cum_delta"][part],
+        "Large": result["large"][part],
+    })
+
+
+def volume_profile(result: dict, i: int) -> pd.DataFrame:
+    """حجم التداول (كلى/شراء/بيع) عند كل مستوى سعرى (منتصف المستوى) لسهم واحد."""
+    bins = result["profile"].shape[1]
+    low, high = result["profile_low"][i], result["profile_high"][i]
+    if np.isnan(low):
+        return pd.DataFrame(columns=["Price", "Volume", "Buy_Volume", "Sell_Volume"])
+
+    edges = np.linspace(low, high, bins + 1)
+    volume, buy = result["profile"][i], result["profile_buy"][i]
+    df = pd.DataFrame({
+        "Price": (edges[:-1] + edges[1:]) / 2,
+        "Volume": volume,
+        "Buy_Volume": buy,
+        "Sell_Volume": volume - buy,
+    })
+    return df[df["Volume"] > 0].reset_index(drop=True)
+
+
+def summary_table(result: dict, symbols) -> pd.DataFrame:
+    """صف واحد لكل سهم: عدد الصفقات، الحجم، VWAP، الدلتا، الصفقات الكبيرة، POC."""
+    bins = result["profile"].shape[1]
+    width = (result["profile_high"] - result["profile_low"]) / bins
+    poc_level = np.argmax(result["profile"], axis=1) if len(symbols) else np.zeros(0, dtype=np.int64)
+    return pd.DataFrame({
+        "Symbol": list(symbols),
+        "Trades": result["trades"],
+        "Volume": result["total_volume"],
+        "VWAP": result["vwap"],
+        "Delta": result["delta"],
+        "Large_Trades": result["large_trades"],
+        "Large_Volume": result["large_volume"],
+        # منتصف المستوى السعرى صاحب أعلى حجم (Point of Control)
+        "POC": result["profile_low"] + (poc_level + 0.5) * width,
+    }, columns=SUMMARY_COLUMNS)
+
+
+# =========================
+# شموع زمنية (OHLCV + شراء/بيع) لكل الأسهم
+# =========================
+# الصفقات مرتبة أصلاً بـ (السهم، الوقت)، فكل شمعة = جزء متصل من المصفوفات
+# يبدأ عند تغير السهم أو تغير رقم الفترة الزمنية؛ كل القيم reduceat على الحدود.
+
+def bars_from_ticks(ticks: dict, interval_seconds: int) -> dict:
+    """
+    شموع بطول interval_seconds من ناتج tick_analytics (الصفقات بدون وقت أو سعر تُستبعد).
+    يرجع dict أعمدة: code, start (ثوانى بداية الشمعة)، open/high/low/close، volume،
+    buy_volume, sell_volume, trades, vwap + offsets لشموع كل سهم.
+    """
+    n_symbols = ticks["trades"].size
+    codes = np.repeat(np.arange(n_symbols), ticks["trades"])
+    ok = ~np.isnan(ticks["seconds"]) & ~np.isnan(ticks["price"])
+    codes = codes[ok]
+    price, volume = ticks["price"][ok], ticks["volume"][ok]
+    sign = ticks["sign"][ok]
+    bucket = np.floor(ticks["seconds"][ok] / interval_seconds).astype(np.int64)
+
+    if codes.size == 0:
+        empty = np.zeros(0)
+        return {"code": np.zeros(0, dtype=np.int64), "start": np.zeros(0, dtype=np.int64),
+                "open": empty, "high": empty, "low": empty, "close": empty,
+                "volume": empty, "buy_volume": empty, "sell_volume": empty,
+                "trades": np.zeros(0, dtype=np.int64), "vwap": empty,
+                "offsets": np.zeros(n_symbols + 1, dtype=np.int64)}
+
+    new_bar = np.empty(codes.size, dtype=bool)
+    new_bar[0] = True
+    new_bar[1:] = (codes[1:] != codes[:-1]) | (bucket[1:] != bucket[:-1])
+    starts = np.flatnonzero(new_bar)
+    ends = np.append(starts[1:], codes.size)
+
+    bar_volume = np.add.reduceat(volume, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap = np.where(bar_volume > 0, np.add.reduceat(price * volume, starts) / bar_volume, np.nan)
+
+    bar_codes = codes[starts]
+    return {
+        "code": bar_codes,
+        "start": bucket[starts] * interval_seconds,
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends - 1],
+        "volume": bar_volume,
+        "buy_volume": np.add.reduceat(np.where(sign > 0, volume, 0.0), starts),
+        "sell_volume": np.add.reduceat(np.where(sign < 0, volume, 0.0), starts),
+        "trades": ends - starts,
+        "vwap": vwap,
+        "offsets": _segment_offsets(bar_codes, n_symbols),
+    }
+
+
+def bars_frame(bars: dict, symbols, day=None, i: int = None) -> pd.DataFrame:
+    """جدول الشموع (كل الأسهم أو السهم رقم i فقط عن طريق offsets بدون بحث)."""
+    part = slice(None) if i is None else slice(bars["offsets"][i], bars["offsets"][i + 1])
+    start = pd.to_timedelta(bars["start"][part], unit="s")
+    base = pd.Timestamp(day) if day is not None else pd.Timestamp(0)
+    return pd.DataFrame({
+        "Symbol": np.asarray(symbols, dtype=object)[bars["code"][part]],
+        "Time": base + start,
+        "Open": bars["open"][part],
+        "High": bars["high"][part],
+        "Low": bars["low"][part],
+        "Close": bars["close"][part],
+        "Volume": bars["volume"][part],
+        "Buy_Volume": bars["buy_volume"][part],
+        "Sell_Volume": bars["sell_volume"][part],
+        "Trades": bars["trades"][part],
+        "VWAP": bars["vwap"][part],
+    }, columns=BAR_COLUMNS)
@@ -0,0 +1,154 @@
+import numpy as np
+
+# =========================
+# محرك مستويات Pivot (كل الطرق وكل الفترات) لكل الأسهم
+# =========================
+# كل الدوال على مصفوفات (سهم لكل عنصر)؛ الناتج لكل طريقة مصفوفة واحدة متصلة
+# (len(LEVELS) × عدد الأسهم) بترتيب LEVELS، فتحديد أى مستوى = صف من المصفوفة.
+# المدخلات High / Low / Close للفترة السابقة (يوم / أسبوع / شهر).
+
+METHODS = ["classic", "fibonacci", "camarilla", "woodie"]
+TIMEFRAMES = ["daily", "weekly", "monthly"]
+LEVELS = ["pivot", "r1", "r2", "r3", "s1", "s2", "s3"]
+
+FIB_RATIOS = (0.382, 0.618, 1.0)
+CAMARILLA_RATIOS = (1.1 / 12, 1.1 / 6, 1.1 / 4)
+
+# أيام الأسبوع فى البورصة المصرية من الأحد للخميس؛ 1970-01-01 كان خميس
+_SUNDAY_OFFSET = 3
+
+
+def method_levels(high, low, close, method: str = "classic") -> np.ndarray:
+    """مستويات طريقة واحدة: مصفوفة (len(LEVELS) × n)."""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    rng = high - low
+
+    if method == "woodie":
+        p = (high + low + 2 * close) / 4
+    else:
+        p = (high + low + close) / 3
+
+    if method in ("classic", "woodie"):
+        r1, s1 = 2 * p - low, 2 * p - high
+        r2, s2 = p + rng, p - rng
+        r3, s3 = high + 2 * (p - low), low - 2 * (high - p)
+    elif method == "fibonacci":
+        r1, r2, r3 = (p + k * rng for k in FIB_RATIOS)
+        s1, s2, s3 = (p - k * rng for k in FIB_RATIOS)
+    elif method == "camarilla":
+        r1, r2, r3 = (close + k * rng for k in CAMARILLA_RATIOS)
+        s1, s2, s3 = (close - k * rng for k in CAMARILLA_RATIOS)
+    else:
+        raise ValueError(f"unknown pivot method: {method}")
+
+    return np.stack([p, r1, r2, r3, s1, s2, s3])
+
+
+def all_method_levels(high, low, close) -> dict:
+    """{method: مصفوفة المستويات} لكل الطرق من نفس المدخلات."""
+    return {m: method_levels(high, low, close, m) for m in METHODS}
+
+
+def period_keys(dates, timeframe: str) -> np.ndarray:
+    """رقم الفترة لكل تاريخ: weekly = أسبوع يبدأ الأحد، monthly = الشهر، daily = اليوم."""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if timeframe == "daily":
+        return days.astype(np.int64)
+    if timeframe == "weekly":
+        return (days.astype(np.int64) - _SUNDAY_OFFSET) // 7
+    if timeframe == "monthly":
+        return days.astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"unknown pivot timeframe: {timeframe}")
+
+
+def previous_period_hlc(dates, high, low, close, before, timeframe: str):
+    """
+    High / Low / Close لآخر فترة كاملة قبل فترة التاريخ before لكل سهم.
+    dates: تواريخ صفوف panel مرتبة تصاعدياً (align="date")، high/low/close: (صفوف × أسهم).
+    صفوف الفترة متصلة: High = fmax و Low = fmin عليها، والإغلاق = آخر إغلاق متاح فيها.
+    """
+    high, low, close = (np.asarray(x, dtype=float) for x in (high, low, close))
+    keys = period_keys(dates, timeframe)
+    current = period_keys(np.array([before], dtype="datetime64[D]"), timeframe)[0]
+    rows = np.flatnonzero(keys < current)
+    n_symbols = close.shape[1]
+    if rows.size == 0:
+        empty = np.full(n_symbols, np.nan)
+        return empty, empty.copy(), empty.copy()
+
+    # صفوف آخر فترة قبل الحالية (متصلة لأن التواريخ مرتبة)
+    last_key = keys[rows[-1]]
+    part = slice(np.searchsorted(keys, last_key, side="left"), rows[-1] + 1)
+    with np.errstate(invalid="ignore"):
+        h = np.fmax.reduce(high[part], axis=0)
+        lo = np.fmin.reduce(low[part], axis=0)
+
+    c = close[part]
+    has = ~np.isnan(c)
+    last_row = c.shape[0] - 1 - np.argmax(has[::-1], axis=0)
+    cl = np.where(has.any(axis=0), c[last_row, np.arange(n_symbols)], np.nan)
+    return h, lo, cl
+
+
+# =========================
+# أحداث الاختراق التاريخية (كل الأسهم × كل الجلسات)
+# =========================
+# المدخلات مصفوفات 1D بترتيب الجلسات، متصلة لكل سهم (segment = رقم السهم)، مثل
+# صفوف مخزن CASE. مستويات كل جلسة من High / Low / Close الجلسة السابقة لنفس السهم،
+# والحدث = إغلاق الجلسة ≥ R1/R2 أو ≤ S1/S2، ومعه عائد الإغلاق بعد كل horizon جلسة.
+
+BREAK_TYPES = ["r1", "r2", "s1", "s2"]
+FOLLOW_THROUGH = (1, 3, 5)
+
+
+def session_breakouts(high, low, close, segment, method: str = "classic",
+                      horizons=FOLLOW_THROUGH) -> dict:
+    """
+    يرجع dict: row (رقم الصف)، type (رقم فى BREAK_TYPES)، level، و fwd_{h}
+    (عائد الإغلاق بعد h جلسة لنفس السهم، NaN لو غير متاح) لكل حدث.
+    """
+    high, low, close = (np.asarray(x, dtype=float) for x in (high, low, close))
+    segment = np.asarray(segment)
+    n = close.size
+
+    same_prev = np.zeros(n, dtype=bool)
+    same_prev[1:] = segment[1:] == segment[:-1]
+
+    def _prev(x):
+        out = np.full(n, np.nan)
+        out[1:] = x[:-1]
+        return np.where(same_prev, out, np.nan)
+
+    levels = method_levels(_prev(high), _prev(low), _prev(close), method)
+
+    fwd = {}
+    rows = np.arange(n)
+    for h in horizons:
+        nxt = np.minimum(rows + h, n - 1)
+        ok = (rows + h < n) & (segment[nxt] == segment)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.where(ok, close[nxt] / close - 1, np.nan)
+        r[~np.isfinite(r)] = np.nan
+        fwd[h] = r
+
+    event_rows, event_types = [], []
+    with np.errstate(invalid="ignore"):
+        for t, name in enumerate(BREAK_TYPES):
+            level = levels[LEVELS.index(name)]
+            hit = close >= level if name.startswith("r") else close <= level
+            idx = np.flatnonzero(hit)
+            event_rows.append(idx)
+            event_types.append(np.full(idx.size, t, dtype=np.int8))
+
+    event_rows = np.concatenate(event_rows)
+    event_types = np.concatenate(event_types)
+    out = {
+        "row": event_rows,
+        "type": event_types,
+        "level": levels[[LEVELS.index(name) for name in BREAK_TYPES]][event_types, event_rows],
+    }
+    for h in horizons:
+        out[f"fwd_{h}"] = fwd[h][event_rows]
+    return out
@@ -0,0 +1,155 @@
+"""
+بحث عن أفضل أوزان AI_Prob وحدود buy_ratio بالـ Backtest على تاريخ CASE.
+
+الاستخدام:
+    python sweep.py                       # 50 مجموعة عشوائية
+    python sweep.py --trials 200 --workers 4
+    python sweep.py --grid                # شبكة حول القيم الحالية
+النتائج مرتبة فى cache/sweep/results.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import utils
+
+# =========================
+# Parameter sweep لأوزان AI_Prob وحدود buy_ratio
+# =========================
+# كل مجموعة معاملات = backtest كامل على نفس المدخلات. المدخلات تُحمّل مرة واحدة فى
+# العملية الرئيسية وتُوضع فى shared_memory، والعمليات الفرعية تقرأها كـ views بدون
+# نسخ أو pickling؛ كل مهمة ترسل dict المعاملات فقط وترجع صف المقاييس.
+
+SWEEP_SPACE = {
+    "w_change": (0.0, 0.15),
+    "w_buy_ratio": (0.0, 0.6),
+    "w_behavior": (0.0, 0.16),
+    "accumulation": (0.5, 0.8),
+    "distribution": (0.2, 0.5),
+}
+SWEEP_METRICS = ["hit_rate", "mean_return", "turnover", "max_drawdown"]
+_SWEEP_SHARED = ["change", "buy_ratio", "model_prob", "active", "range_pct", "volume",
+                 "t0t1_mask", "fwd"]
+
+# فى كل عملية: المصفوفات (views على الذاكرة المشتركة) + كائنات SharedMemory نفسها
+_SWEEP_STATE = {}
+
+
+def sweep_grid(grid: dict) -> list:
+    """كل التركيبات من dict {اسم المعامل: قائمة قيم}."""
+    from itertools import product
+
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[n] for n in names))]
+
+
+def sweep_random(n: int, space: dict = None, seed: int = 0) -> list:
+    """n مجموعة معاملات عشوائية (uniform) داخل حدود space."""
+    space = space or SWEEP_SPACE
+    rng = np.random.default_rng(seed)
+    draws = {name: rng.uniform(lo, hi, n) for name, (lo, hi) in space.items()}
+    return [{name: float(draws[name][i]) for name in space} for i in range(n)]
+
+
+def _attach_sweep_arrays(specs: dict):
+    """initializer للعمليات الفرعية: ربط المصفوفات بالذاكرة المشتركة."""
+    from multiprocessing import shared_memory
+
+    _SWEEP_STATE.clear()
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SWEEP_STATE[f"shm:{name}"] = shm
+        _SWEEP_STATE[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _sweep_worker(task):
+    params, top_n = task
+    inputs = {name: _SWEEP_STATE[name] for name in _SWEEP_SHARED}
+    row = dict(params)
+    for score, values in backtest.score_backtest_inputs(inputs, **params).items():
+        result = backtest.evaluate_scores(values, inputs["fwd"], top_n)
+        for metric in SWEEP_METRICS:
+            row[f"{score}_{metric}"] = result[metric]
+    return row
+
+
+def run_sweep(param_sets, workers: int = None, top_n: int = backtest.TOP_N,
+              lookback: int = None, horizon: int = 1,
+              rank_by: str = "T0T1_Score_mean_return") -> pd.DataFrame:
+    """
+    تقييم كل مجموعة معاملات فى param_sets (من sweep_grid / sweep_random) بالتوازى.
+    يرجع جدول مرتب تنازلياً حسب rank_by ويحفظه فى cache/sweep/results.csv.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    # أكثر من عدد الأنوية لا يفيد (على نواة واحدة الـ pool أبطأ من القراءة المتسلسلة)
+    cpus = os.cpu_count() or 1
+    workers = min(cpus, 8) if workers is None else min(workers, cpus)
+    inputs = backtest.backtest_inputs(lookback)
+    inputs["fwd"] = backtest.forward_returns(inputs["close"], horizon)
+    tasks = [(dict(p), top_n) for p in param_sets]
+
+    blocks, specs = [], {}
+    try:
+        if workers > 1 and len(tasks) > 1:
+            for name in _SWEEP_SHARED:
+                arr = np.ascontiguousarray(inputs[name])
+                shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                blocks.append(shm)
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+                specs[name] = (shm.name, arr.shape, arr.dtype.str)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_sweep_arrays,
+                                     initargs=(specs,)) as pool:
+                rows = list(pool.map(_sweep_worker, tasks))
+        else:
+            _SWEEP_STATE.update({name: inputs[name] for name in _SWEEP_SHARED})
+            rows = [_sweep_worker(t) for t in tasks]
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame(rows)
+    if not results.empty:
+        results = results.sort_values(rank_by, ascending=False, na_position="last")
+        results.insert(0, "Rank", np.arange(1, len(results) + 1))
+    try:
+        utils.SWEEP_DIR.mkdir(parents=True, exist_ok=True)
+        results.to_csv(utils.SWEEP_DIR / "results.csv", index=False)
+    except Exception as e:
+        print(f"⚠️ Could not save sweep results: {e}")
+    return results.reset_index(drop=True)
+
+
+
+def default_grid() -> dict:
+    """شبكة صغيرة حول القيم الحالية (0.07 / 0.3 / 0.08 و 0.6 / 0.4)."""
+    return {
+        "w_change": [0.0, 0.07, 0.14],
+        "w_buy_ratio": [0.15, 0.3, 0.45],
+        "w_behavior": [0.0, 0.08, 0.16],
+        "accumulation": [0.55, 0.6, 0.7],
+        "distribution": [0.3, 0.4, 0.45],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EGX AI scoring parameter sweep")
+    parser.add_argument("--trials", type=int, default=50, help="عدد المجموعات العشوائية")
+    parser.add_argument("--grid", action="store_true", help="استخدام الشبكة بدل البحث العشوائى")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--lookback", type=int, default=None, help="آخر N يوم فقط")
+    parser.add_argument("--rank-by", default="T0T1_Score_mean_return")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    params = sweep_grid(default_grid()) if args.grid else sweep_random(args.trials, seed=args.seed)
+    results = run_sweep(params, workers=args.workers, top_n=args.top_n,
+                        lookback=args.lookback, rank_by=args.rank_by)
+    print(f"{len(results)} parameter sets -> {utils.SWEEP_DIR / 'results.csv'}")
+    print(results.head(10).to_string(index=False))
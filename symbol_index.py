@@ -0,0 +1,146 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+# =========================
+# فهرس بحث الأسهم (رمز + اسم عربى/إنجليزى)
+# =========================
+# يُبنى مرة واحدة لكل تحديث بيانات، والبحث بعده lookups فى dict / bisect فقط:
+#   - prefix: قائمة مرتبة (كلمة مطبعة، رقم السهم) لكل كلمات الرمز والأسماء
+#   - trigram: لكل 3 حروف متتالية من الرمز/الاسم المطبع مجموعة أرقام الأسهم
+# التطبيع يوحد أشكال الحروف العربية (أ/إ/آ -> ا، ى/ی -> ي، ة -> ه، ؤ -> و، ئ -> ي)
+# ويحذف التشكيل والتطويل، فـ "الإسم" و "الاسم" نفس المفتاح.
+
+_ARABIC_FOLD = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ی": "ي", "ئ": "ي",
+    "ة": "ه", "ؤ": "و", "ک": "ك",
+    "ـ": None,  # تطويل
+})
+_DIACRITICS = re.compile("[\u064b-\u0652\u0670]")  # التشكيل و الألف الخنجرية
+_SEPARATORS = re.compile(r"[\s\-–—_.,/()&+'\"]+")
+
+# أوزان الترتيب (الأعلى أولاً)
+SCORE_EXACT_SYMBOL = 100
+SCORE_SYMBOL_PREFIX = 80
+SCORE_NAME_PREFIX = 70
+SCORE_WORD_PREFIX = 60
+SCORE_SUBSTRING = 40
+SCORE_TRIGRAM = 30  # × نسبة الـ trigrams المشتركة
+MIN_TRIGRAM_SHARE = 0.5
+
+
+def normalize(text) -> str:
+    """تطبيع للبحث: حروف صغيرة، توحيد الحروف العربية، بدون تشكيل، مسافة واحدة بين الكلمات."""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+    text = _DIACRITICS.sub("", str(text).lower()).translate(_ARABIC_FOLD)
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_index(records) -> dict:
+    """
+    records: [(symbol, [أسماء...], sector)] — الاسم الأول هو المعروض.
+    يرجع dict: symbols (مرتبة)، names، sectors، keys (النصوص المطبعة لكل سهم)،
+    prefix (قائمة مرتبة من (كلمة، رقم))، trigrams {trigram: set(أرقام)}.
+    """
+    merged = {}
+    for symbol, names, sector in records:
+        symbol = str(symbol).strip()
+        if not symbol:
+            continue
+        entry = merged.setdefault(symbol, {"names": [], "sector": None})
+        for name in names:
+            if normalize(name) and str(name).strip() not in entry["names"]:
+                entry["names"].append(str(name).strip())
+        if sector is not None and entry["sector"] is None and normalize(sector):
+            entry["sector"] = str(sector).strip()
+
+    symbols = sorted(merged)
+    keys, prefix, trigrams = [], [], {}
+    for i, symbol in enumerate(symbols):
+        texts = [normalize(symbol)] + [normalize(n) for n in merged[symbol]["names"]]
+        keys.append(texts)
+        words = set(texts)
+        for t in texts:
+            words.update(t.split())
+        prefix.extend((w, i) for w in words if w)
+        for t in texts:
+            for g in _trigrams(t):
+                trigrams.setdefault(g, set()).add(i)
+    prefix.sort()
+
+    return {
+        "symbols": symbols,
+        "names": [merged[s]["names"][0] if merged[s]["names"] else "" for s in symbols],
+        "sectors": [merged[s]["sector"] for s in symbols],
+        "keys": keys,
+        "prefix": prefix,
+        "prefix_words": [w for w, _ in prefix],
+        "trigrams": trigrams,
+    }
+
+
+def _prefix_matches(index: dict, query: str) -> set:
+    words = index["prefix_words"]
+    lo = bisect_left(words, query)
+    hi = bisect_left(words, query + "\uffff", lo)
+    return {index["prefix"][k][1] for k in range(lo, hi)}
+
+
+def search(index: dict, query: str, limit: int = 50) -> list:
+    """الرموز المطابقة مرتبة بالأقرب (رمز مطابق، بداية رمز/اسم/كلمة، جزء، trigram)."""
+    q = normalize(query)
+    if not q:
+        return []
+
+    scores = {}
+
+    def _score(i, s):
+        if s > scores.get(i, 0):
+            scores[i] = s
+
+    for i in _prefix_matches(index, q):
+        symbol_key, *name_keys = index["keys"][i]
+        if symbol_key == q:
+            _score(i, SCORE_EXACT_SYMBOL)
+        elif symbol_key.startswith(q):
+            _score(i, SCORE_SYMBOL_PREFIX)
+        elif any(n.startswith(q) for n in name_keys):
+            _score(i, SCORE_NAME_PREFIX)
+        else:
+            _score(i, SCORE_WORD_PREFIX)
+
+    # المرشحين من الـ trigrams: جزء من النص أو تشابه تقريبى (أخطاء إملائية)
+    # الجزء (q داخل النص) يحتوى كل trigrams q الداخلية، والتقريبى يحتاج نصفها على الأقل
+    grams = _trigrams(q)
+    inner = len({q[k:k + 3] for k in range(len(q) - 2)})
+    needed = min(inner, MIN_TRIGRAM_SHARE * len(grams))
+    counts = {}
+    for g in grams:
+        for i in index["trigrams"].get(g, ()):
+            counts[i] = counts.get(i, 0) + 1
+    for i, n in counts.items():
+        if i in scores or n < needed:
+            continue
+        if any(q in k for k in index["keys"][i]):
+            _score(i, SCORE_SUBSTRING)
+        elif n / len(grams) >= MIN_TRIGRAM_SHARE:
+            _score(i, SCORE_TRIGRAM * n / len(grams))
+
+    ranked = sorted(scores, key=lambda i: (-scores[i], index["symbols"][i]))
+    return [index["symbols"][i] for i in ranked[:limit]]
+
+
+def label(index: dict, symbol: str) -> str:
+    """"SYM – الاسم" للعرض فى القوائم."""
+    i = bisect_left(index["symbols"], symbol)
+    if i < len(index["symbols"]) and index["symbols"][i] == symbol and index["names"][i]:
+        return f"{symbol} – {index['names'][i]}"
+    return str(symbol)
@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# محرك المؤشرات الفنية المتجه (Panel)
+# =========================
+# كل الدوال هنا تعمل على مصفوفات ثنائية الأبعاد (صفوف = أيام، أعمدة = أسهم)
+# على المحور 0، بنفس منطق pandas rolling(window) (أى NaN داخل النافذة -> NaN).
+# مصفوفة عمود واحد تكافئ حساب سهم واحد.
+
+RSI_WINDOW = 14
+ATR_WINDOW = 14
+BB_WINDOW = 20
+BB_STD = 2.0
+
+
+def _as_2d(x) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return x.reshape(-1, 1) if x.ndim == 1 else x
+
+
+def _window_sums(x: np.ndarray, window: int):
+    """مجموع النافذة وعدد القيم الصالحة فيها لكل صف عن طريق cumsum واحد."""
+    valid = ~np.isnan(x)
+    zero = np.zeros((1, x.shape[1]))
+    cs = np.concatenate([zero, np.cumsum(np.where(valid, x, 0.0), axis=0)])
+    cn = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    return cs[window:] - cs[:-window], cn[window:] - cn[:-window]
+
+
+def rolling_mean(x, window: int) -> np.ndarray:
+    """متوسط متحرك لكل عمود (مثل pandas rolling(window).mean())."""
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    if window <= 0 or x.shape[0] < window:
+        return out
+    s, n = _window_sums(x, window)
+    out[window - 1:] = np.where(n == window, s / window, np.nan)
+    return out
+
+
+def rolling_std(x, window: int) -> np.ndarray:
+    """انحراف معيارى متحرك (ddof=1 مثل pandas) من مجموع القيم ومربعاتها."""
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    if window <= 1 or x.shape[0] < window:
+        return out
+    s, n = _window_sums(x, window)
+    s2, _ = _window_sums(x * x, window)
+    var = (s2 - s * s / window) / (window - 1)
+    out[window - 1:] = np.where(n == window, np.sqrt(np.clip(var, 0, None)), np.nan)
+    return out
+
+
+def diff(x) -> np.ndarray:
+    """الفرق عن الصف السابق (الصف الأول NaN)."""
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    out[1:] = x[1:] - x[:-1]
+    return out
+
+
+def rsi(close, window: int = RSI_WINDOW) -> np.ndarray:
+    """RSI بمتوسط بسيط للمكاسب والخسائر (نفس حساب صفحة Technical View)."""
+    delta = diff(close)
+    gain = np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None))
+    loss = np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None))
+    avg_gain = rolling_mean(gain, window)
+    avg_loss = rolling_mean(loss, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+        return 100 - 100 / (1 + rs)
+
+
+def atr(high, low, close, window: int = ATR_WINDOW) -> np.ndarray:
+    """Average True Range: متوسط max(H-L, |H-C_prev|, |L-C_prev|)."""
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[1:] = close[:-1]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return rolling_mean(tr, window)
+
+
+def bollinger(close, window: int = BB_WINDOW, n_std: float = BB_STD):
+    """حدود Bollinger: (الوسط، العلوى، السفلى)."""
+    mid = rolling_mean(close, window)
+    sd = rolling_std(close, window)
+    return mid, mid + n_std * sd, mid - n_std * sd
+
+
+def compute_indicators(close, volume=None, high=None, low=None) -> dict:
+    """
+    حساب كل المؤشرات لكل الأسهم مرة واحدة.
+    يرجع dict من مصفوفات بنفس أبعاد close.
+    """
+    close = _as_2d(close)
+    out = {
+        "Close": close,
+        "MA20": rolling_mean(close, 20),
+        "MA50": rolling_mean(close, 50),
+        "RSI14": rsi(close, RSI_WINDOW),
+    }
+    out["Vol20"] = rolling_mean(volume, 20) if volume is not None else np.full(close.shape, np.nan)
+
+    if high is not None and low is not None:
+        out["ATR14"] = atr(high, low, close, ATR_WINDOW)
+    else:
+        out["ATR14"] = np.full(close.shape, np.nan)
+
+    out["BB_Mid"], out["BB_Upper"], out["BB_Lower"] = bollinger(close, BB_WINDOW, BB_STD)
+    return out
+
+
+def last_row_table(panel: dict, indicators: dict = None) -> pd.DataFrame:
+    """
+    جدول صف واحد لكل سهم (آخر يوم) جاهز للفرز والفلترة.
+    panel: ناتج utils.load_case_panel (مفاتيح: symbols, dates, close, volume, high, low).
+    """
+    if indicators is None:
+        indicators = compute_indicators(
+            panel["close"], panel.get("volume"), panel.get("high"), panel.get("low")
+        )
+
+    close = indicators["Close"]
+    n_rows, n_cols = close.shape
+    if n_rows == 0:
+        return pd.DataFrame(columns=["Symbol", "Date"] + list(indicators))
+
+    # آخر صف فيه إغلاق صالح لكل سهم
+    valid = ~np.isnan(close)
+    last_idx = n_rows - 1 - np.argmax(valid[::-1], axis=0)
+    has_data = valid.any(axis=0)
+    cols = np.arange(n_cols)
+
+    table = {"Symbol": list(panel["symbols"])}
+    dates = panel["dates"]
+    table["Date"] = dates[last_idx] if dates.ndim == 1 else dates[last_idx, cols]
+    for name, arr in indicators.items():
+        table[name] = arr[last_idx, cols]
+
+    df = pd.DataFrame(table)[has_data]
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.reset_index(drop=True)
+
+
+# =========================
+# حالة المؤشرات المتدحرجة (تحديث O(1) لكل سهم)
+# =========================
+# بدل إعادة حساب النوافذ كلها عند إضافة يوم جديد، نحتفظ لكل سهم بـ:
+#   - ring buffer لآخر 50 إغلاق و 20 حجم و 14 مكسب/خسارة
+#   - مجموع كل نافذة وعدد القيم الصالحة فيها
+# إضافة صف جديد = طرح القيمة الخارجة من النافذة وإضافة الداخلة (متجه على كل الأسهم).
+
+ROLLING_HISTORY = 51  # MA50 + صف إضافى للفرق الأول فى RSI
+
+_ROLLING_WINDOWS = {
+    # اسم النافذة: (الـ buffer، طول النافذة)
+    "ma20": ("close_buf", 20),
+    "ma50": ("close_buf", 50),
+    "vol20": ("vol_buf", 20),
+    "gain14": ("gain_buf", RSI_WINDOW),
+    "loss14": ("loss_buf", RSI_WINDOW),
+}
+
+
+def init_rolling_state(n_symbols: int) -> dict:
+    """حالة فارغة لعدد n_symbols سهم."""
+    state = {
+        "n_obs": np.zeros(n_symbols, dtype=np.int64),
+        "last_close": np.full(n_symbols, np.nan),
+        "close_buf": np.full((50, n_symbols), np.nan),
+        "vol_buf": np.full((20, n_symbols), np.nan),
+        "gain_buf": np.full((RSI_WINDOW, n_symbols), np.nan),
+        "loss_buf": np.full((RSI_WINDOW, n_symbols), np.nan),
+    }
+    for name in _ROLLING_WINDOWS:
+        state[f"{name}_sum"] = np.zeros(n_symbols)
+        state[f"{name}_cnt"] = np.zeros(n_symbols, dtype=np.int64)
+    return state
+
+
+def _push_window(state: dict, name: str, idx: np.ndarray, n: np.ndarray, x: np.ndarray):
+    buf_name, window = _ROLLING_WINDOWS[name]
+    buf = state[buf_name]
+    leaving = np.where(n >= window, buf[(n - window) % buf.shape[0], idx], np.nan)
+
+    x_ok, out_ok = ~np.isnan(x), ~np.isnan(leaving)
+    state[f"{name}_sum"][idx] += np.where(x_ok, x, 0.0) - np.where(out_ok, leaving, 0.0)
+    state[f"{name}_cnt"][idx] += x_ok.astype(np.int64) - out_ok.astype(np.int64)
+
+
+def update_rolling_state(state: dict, close, volume=None, mask=None) -> dict:
+    """
+    إضافة صف جديد (إغلاق/حجم لكل سهم) للحالة.
+    mask يحدد الأسهم التى لها صف جديد فعلاً (الباقى لا يتغير).
+    """
+    close = np.asarray(close, dtype=float)
+    volume = np.full(close.shape, np.nan) if volume is None else np.asarray(volume, dtype=float)
+    idx = np.arange(close.size) if mask is None else np.flatnonzero(mask)
+    if idx.size == 0:
+        return state
+
+    n = state["n_obs"][idx]
+    x = close[idx]
+    v = volume[idx]
+    with np.errstate(invalid="ignore"):
+        delta = x - state["last_close"][idx]
+        gain = np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None))
+        loss = np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None))
+
+    for name, values in [("ma20", x), ("ma50", x), ("vol20", v),
+                         ("gain14", gain), ("loss14", loss)]:
+        _push_window(state, name, idx, n, values)
+
+    # الكتابة فى الـ buffers بعد قراءة القيم الخارجة
+    state["close_buf"][n % 50, idx] = x
+    state["vol_buf"][n % 20, idx] = v
+    state["gain_buf"][n % RSI_WINDOW, idx] = gain
+    state["loss_buf"][n % RSI_WINDOW, idx] = loss
+
+    state["last_close"][idx] = x
+    state["n_obs"][idx] = n + 1
+    return state
+
+
+def rolling_state_from_panel(panel: dict) -> dict:
+    """بناء الحالة من آخر ROLLING_HISTORY صف فى panel محاذى لآخر جلسة (align='last')."""
+    close = panel["close"]
+    state = init_rolling_state(close.shape[1])
+    has_row = ~np.isnat(panel["dates"])
+    for r in range(close.shape[0]):
+        update_rolling_state(state, close[r], panel["volume"][r], has_row[r])
+    return state
+
+
+def rolling_state_values(state: dict) -> dict:
+    """القيم الحالية: Close, MA20, MA50, Vol20, RSI14 (NaN لو النافذة غير مكتملة)."""
+    def _mean(name):
+        window = _ROLLING_WINDOWS[name][1]
+        return np.where(state[f"{name}_cnt"] == window, state[f"{name}_sum"] / window, np.nan)
+
+    avg_gain, avg_loss = _mean("gain14"), _mean("loss14")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+        rsi_values = 100 - 100 / (1 + rs)
+
+    return {
+        "Close": state["last_close"].copy(),
+        "MA20": _mean("ma20"),
+        "MA50": _mean("ma50"),
+        "Vol20": _mean("vol20"),
+        "RSI14": rsi_values,
+    }
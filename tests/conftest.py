@@ -0,0 +1,167 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# الموديولات فى جذر المشروع (بدون package)
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import features  # noqa: E402
+import utils  # noqa: E402
+
+# كاشات وعدادات الذاكرة (تُفرّغ قبل وبعد كل اختبار)
+_MEMORY_CACHES = [
+    (utils, ["_ENCODING_CACHE", "ENCODING_STATS", "_CASE_STORE_CACHE", "_DATASET_CACHE",
+             "DATASET_STATS", "_LIVE_SIGNALS", "_TAPE_TAILS", "_MODEL_CACHE", "LOAD_COUNTS"]),
+    (features, ["_FEATURE_STORE_CACHE"]),
+]
+
+
+def _clear_memory_caches():
+    for module, names in _MEMORY_CACHES:
+        for name in names:
+            getattr(module, name).clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """
+    كل مسارات cache/ (المخزن، الخصائص، الأرشيف، الشموع...) داخل tmp_path حتى لا
+    تكتب الاختبارات فى cache/ الحقيقى. المسارات محسوبة وقت الـ import فى utils،
+    فنستبدل كل مسار تحت CACHE_DIR بنفس المسار النسبى تحت الكاش المؤقت.
+    """
+    real = utils.CACHE_DIR
+    cache = tmp_path / "cache"
+    for name, value in list(vars(utils).items()):
+        if isinstance(value, Path) and (value == real or real in value.parents):
+            monkeypatch.setattr(utils, name, cache / value.relative_to(real))
+    monkeypatch.setattr(utils, "MODEL_PATH", tmp_path / "models" / utils.MODEL_PATH.name)
+    _clear_memory_caches()
+    yield cache
+    _clear_memory_caches()
+
+
+def make_tape(n_rows: int = 2000, n_symbols: int = 12, seed: int = 0,
+              direction_only: bool = False) -> pd.DataFrame:
+    """شريط معاملات صغير: Side مختلط (أو Direction فقط)، أسعار وأوقات، وصفوف بدون رمز."""
+    rng = np.random.default_rng(seed)
+    symbols = np.array([f"S{i:02d}" for i in range(n_symbols)], dtype=object)
+    volume = rng.integers(1, 500, n_rows).astype(float)
+    price = np.round(rng.uniform(1.0, 50.0, n_rows), 2)
+    tape = pd.DataFrame({
+        "Symbol": symbols[rng.integers(0, n_symbols, n_rows)],
+        "Side": rng.choice(np.array(["B", "S", "buy", "Sell", ""], dtype=object), n_rows),
+        "Price": price,
+        "Volume": volume,
+        "Turnover": volume * price,
+        "Time": pd.to_datetime(rng.integers(36_000, 51_000, n_rows), unit="s").strftime("%H:%M:%S"),
+    })
+    tape.loc[::97, "Symbol"] = np.nan
+    if direction_only:
+        tape["Side"] = np.nan
+        tape["Direction"] = rng.choice(np.array([2, 1, 0, -1, -2]), n_rows)
+    return tape
+
+
+# أعمدة CASE كما فى ملفات البورصة (عربى، الأحدث أولاً، ترميز cp1256)
+CASE_HEADERS = {
+    "Date": "التاريخ", "Open": "فتح", "High": "أعلى", "Low": "الأدنى", "Closed": "مغلق",
+    "Prev. Closed": "إقفال سابق", "%Chg": "التغير %", "Chg.": "التغير",
+    "Turnover": "قيمة التداول", "Volume": "حجم التداول",
+}
+
+
+def make_case_history(n_days: int = 120, seed: int = 0, end: str = "2026-01-13") -> pd.DataFrame:
+    """تاريخ CASE لسهم واحد (أيام الأحد-الخميس) بالأعمدة الإنجليزية، مرتب تصاعدياً."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=n_days, freq="C", weekmask="Sun Mon Tue Wed Thu")
+    close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days))), 3)
+    prev = np.concatenate([[close[0]], close[:-1]])
+    volume = rng.integers(1_000, 100_000, n_days)
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": prev,
+        "High": np.round(np.maximum(close, prev) * (1 + rng.uniform(0, 0.02, n_days)), 3),
+        "Low": np.round(np.minimum(close, prev) * (1 - rng.uniform(0, 0.02, n_days)), 3),
+        "Closed": close,
+        "Prev. Closed": prev,
+        "%Chg": np.round((close / prev - 1) * 100, 3),
+        "Chg.": np.round(close - prev, 3),
+        "Turnover": np.round(volume * close, 2),
+        "Volume": volume,
+    })
+
+
+def write_case_csv(path: Path, history: pd.DataFrame, encoding: str = "cp1256"):
+    """ملف CASE بنفس شكل ملفات البورصة: الأحدث أولاً، التاريخ 2026/01/13."""
+    df = history.sort_values("Date", ascending=False).copy()
+    df["Date"] = df["Date"].dt.strftime("%Y/%m/%d")
+    df.rename(columns=CASE_HEADERS).to_csv(path, index=False, encoding=encoding)
+
+
+@pytest.fixture
+def case_dir(tmp_path, monkeypatch):
+    """مجلد CASE مؤقت فيه 6 أسهم بتواريخ بداية مختلفة، و {symbol: history}."""
+    folder = tmp_path / "CASE"
+    folder.mkdir()
+    histories = {}
+    for i in range(6):
+        hist = make_case_history(n_days=120 - 10 * i, seed=i)
+        histories[f"C{i:02d}"] = hist
+        write_case_csv(folder / f"C{i:02d}.csv", hist, encoding="utf-8-sig" if i == 5 else "cp1256")
+    monkeypatch.setattr(utils, "CASE_DIR", folder)
+    return histories
+
+
+def make_intraday(symbols, seed: int = 0) -> pd.DataFrame:
+    """ملف جلسة (intraday) صغير بالأعمدة الإنجليزية لكل الرموز المعطاة."""
+    rng = np.random.default_rng(seed)
+    n = len(symbols)
+    prev = np.round(rng.uniform(5, 50, n), 2)
+    last = np.round(prev * (1 + rng.normal(0, 0.02, n)), 2)
+    return pd.DataFrame({
+        "Symbol": list(symbols),
+        "S. Description": [f"Company {s}" for s in symbols],
+        "Last": last,
+        "% Change": np.round((last / prev - 1) * 100, 2),
+        "Open": prev,
+        "High": np.round(np.maximum(last, prev) * 1.01, 2),
+        "Low": np.round(np.minimum(last, prev) * 0.99, 2),
+        "Close": last,
+        "Prev. Closed": prev,
+        "Volume": rng.integers(1_000, 100_000, n).astype(float),
+        "Turnover": np.round(rng.uniform(1e4, 1e6, n), 2),
+    })
+
+
+def write_intraday_xlsx(path: Path, df: pd.DataFrame):
+    df.to_excel(path, index=False, engine="openpyxl")
+
+
+@pytest.fixture
+def daily_dirs(tmp_path, monkeypatch):
+    """
+    مجلدا intraday و transaction مؤقتان فيهما جلسة 14-1-2026: ملف XLSX للأسهم S00..S11
+    وأول 1500 صف من الشريط. يرجع (intraday_path, tx_path, الشريط كاملاً 3000 صف).
+    """
+    intraday_dir, tx_dir = tmp_path / "intraday", tmp_path / "transaction"
+    intraday_dir.mkdir()
+    tx_dir.mkdir()
+    monkeypatch.setattr(utils, "INTRADAY_DIR", intraday_dir)
+    monkeypatch.setattr(utils, "TRANSACTION_DIR", tx_dir)
+
+    intraday_path = intraday_dir / "14-1-2026.xlsx"
+    write_intraday_xlsx(intraday_path, make_intraday([f"S{i:02d}" for i in range(12)]))
+    tape = make_tape(3000)
+    tx_path = tx_dir / "14-1-2026.csv"
+    tape.iloc[:1500].to_csv(tx_path, index=False)
+    return intraday_path, tx_path, tape
+
+
+def append_tape(tx_path: Path, rows: pd.DataFrame):
+    with open(tx_path, "a", encoding="utf-8") as f:
+        f.write(rows.to_csv(index=False, header=False))
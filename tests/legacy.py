@@ -0,0 +1,88 @@
+"""
+مراجع pandas من النسخة الأصلية (قبل المحركات المتجهة/المتدفقة) للمقارنة فى الاختبارات.
+"""
+import numpy as np
+import pandas as pd
+
+
+def aggregate_transactions(df_tx: pd.DataFrame) -> pd.DataFrame:
+    if df_tx is None or df_tx.empty:
+        return pd.DataFrame(columns=["Symbol", "total_volume", "total_turnover",
+                                     "buy_volume", "sell_volume", "buy_ratio",
+                                     "behavior"])
+
+    df = df_tx.copy()
+    df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0)
+    df["Turnover"] = pd.to_numeric(df["Turnover"], errors="coerce").fillna(0)
+
+    side = df["Side"].astype(str).str.upper()
+    buy_mask = side.isin(["B", "BUY"])
+    sell_mask = side.isin(["S", "SELL"])
+
+    if (not buy_mask.any()) and ("Direction" in df.columns):
+        dir_col = pd.to_numeric(df["Direction"], errors="coerce")
+        buy_mask = dir_col.gt(0)
+        sell_mask = dir_col.lt(0)
+
+    grouped = df.groupby("Symbol")
+    agg = pd.DataFrame({
+        "total_volume": grouped["Volume"].sum(),
+        "total_turnover": grouped["Turnover"].sum(),
+        "buy_volume": df[buy_mask].groupby("Symbol")["Volume"].sum(),
+        "sell_volume": df[sell_mask].groupby("Symbol")["Volume"].sum(),
+    }).fillna(0)
+
+    agg["buy_ratio"] = agg.apply(
+        lambda r: r["buy_volume"] / r["total_volume"] if r["total_volume"] > 0 else np.nan,
+        axis=1
+    )
+
+    def classify_behavior(row):
+        if np.isnan(row["buy_ratio"]):
+            return "Normal"
+        if row["buy_ratio"] > 0.6:
+            return "Accumulation"
+        if row["buy_ratio"] < 0.4:
+            return "Distribution"
+        return "Normal"
+
+    agg["behavior"] = agg.apply(classify_behavior, axis=1)
+    agg.reset_index(inplace=True)
+    return agg
+
+
+def rsi(close: pd.Series, window: int = 14) -> pd.Series:
+    """RSI كما كان فى صفحة Technical View."""
+    delta = close.diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    avg_gain = gain.rolling(window).mean()
+    avg_loss = loss.rolling(window).mean()
+    rs = avg_gain / avg_loss.replace(0, np.nan)
+    return 100 - 100 / (1 + rs)
+
+
+def add_pivot_levels(df_intraday: pd.DataFrame) -> pd.DataFrame:
+    df = df_intraday.copy()
+    columns = ["Pivot Point", "Resistance 1 (R1)", "Resistance 2 (R2)",
+               "Support 1 (S1)", "Support 2 (S2)"]
+    for col in columns:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    high = pd.to_numeric(df.get("High"), errors="coerce")
+    low = pd.to_numeric(df.get("Low"), errors="coerce")
+    if "Prev. Closed" in df.columns:
+        close_for_pivot = pd.to_numeric(df["Prev. Closed"], errors="coerce")
+    else:
+        close_for_pivot = pd.to_numeric(df.get("Last"), errors="coerce")
+
+    mask_valid = (~high.isna()) & (~low.isna()) & (~close_for_pivot.isna())
+    need_calc = mask_valid & df[columns].isna().all(axis=1)
+
+    P = (high + low + close_for_pivot) / 3.0
+    calc = {"Pivot Point": P, "Resistance 1 (R1)": 2 * P - low, "Resistance 2 (R2)": P + (high - low),
+            "Support 1 (S1)": 2 * P - high, "Support 2 (S2)": P - (high - low)}
+    for col, values in calc.items():
+        df.loc[need_calc, col] = values[need_calc]
+    return df
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import utils
+
+
+@pytest.fixture
+def market():
+    """40 يوم × 15 سهم: درجات، عوائد تالية وأسهم غائبة فى بعض الأيام."""
+    rng = np.random.default_rng(7)
+    scores = rng.normal(size=(40, 15))
+    fwd = rng.normal(0.001, 0.02, size=(40, 15))
+    scores[rng.random(scores.shape) < 0.1] = np.nan
+    fwd[rng.random(fwd.shape) < 0.1] = np.nan
+    scores[5] = np.nan  # يوم بدون أى درجة
+    return scores, fwd
+
+
+def _reference(scores, fwd, top_n, n_deciles):
+    """نفس التقييم بحلقة على الأيام بـ pandas."""
+    port, hits, picks_total, prev, turnover = [], 0, 0, None, []
+    dec_sum, dec_cnt = np.zeros(n_deciles), np.zeros(n_deciles, dtype=int)
+    for s, f in zip(scores, fwd):
+        day = pd.DataFrame({"s": s, "f": f}).dropna()
+        if day.empty:
+            port.append(np.nan)
+            continue
+        rank = day["s"].rank(method="first").astype(int) - 1
+        for d, r in zip(rank * n_deciles // len(day), day["f"]):
+            dec_sum[d] += r
+            dec_cnt[d] += 1
+        top = day.loc[rank.sort_values().index[-top_n:]]
+        hits += int((top["f"] > 0).sum())
+        picks_total += len(top)
+        port.append(top["f"].mean())
+        weights = pd.Series(1.0 / len(top), index=top.index)
+        if prev is not None:
+            turnover.append(0.5 * weights.sub(prev, fill_value=0).abs().sum())
+        prev = weights
+    port = np.array(port)
+    equity = np.cumprod(1 + np.nan_to_num(port))
+    return {
+        "days": int((~np.isnan(port)).sum()),
+        "picks": picks_total,
+        "hit_rate": hits / picks_total,
+        "mean_return": np.nanmean(port),
+        "turnover": np.mean(turnover),
+        "max_drawdown": (equity / np.maximum.accumulate(equity) - 1).min(),
+        "total_return": equity[-1] - 1,
+        "decile_returns": dec_sum / dec_cnt,
+        "decile_counts": dec_cnt,
+    }
+
+
+@pytest.mark.parametrize("top_n", [1, 5])
+def test_evaluate_scores_matches_daily_loop(market, top_n):
+    scores, fwd = market
+    got = backtest.evaluate_scores(scores, fwd, top_n=top_n, n_deciles=5)
+    expected = _reference(scores, fwd, top_n, 5)
+    for k, v in expected.items():
+        np.testing.assert_allclose(got[k], v, rtol=1e-12, err_msg=k)
+
+
+def test_evaluate_scores_without_valid_days():
+    res = backtest.evaluate_scores(np.full((3, 4), np.nan), np.zeros((3, 4)))
+    assert res["days"] == res["picks"] == 0
+    assert np.isnan(res["hit_rate"]) and np.isnan(res["turnover"])
+
+
+def test_forward_returns_match_pandas_shift():
+    close = np.array([[10.0, 5.0], [11.0, np.nan], [12.1, 5.5], [0.0, 6.0]])
+    expected = (pd.DataFrame(close).shift(-1) / pd.DataFrame(close) - 1).to_numpy(copy=True)
+    expected[~np.isfinite(expected)] = np.nan
+    np.testing.assert_allclose(backtest.forward_returns(close), expected)
+
+
+def test_rule_scores_match_signal_rules():
+    rng = np.random.default_rng(3)
+    n = 30
+    signals = pd.DataFrame({
+        "Symbol": [f"S{i}" for i in range(n)],
+        "% Change": rng.normal(0, 2, n).round(1),
+        "buy_ratio": np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0, 1, n)),
+        "Volume": rng.integers(0, 1_000, n).astype(float),
+        "Range": rng.uniform(0, 8, n),
+    })
+    signals["behavior"] = utils.classify_behavior(signals["buy_ratio"])
+    scored = utils.apply_ai_score(signals)
+    prob = backtest.ai_prob_scores(signals["% Change"], signals["buy_ratio"])
+    np.testing.assert_allclose(prob, scored["AI_Prob"])
+
+    cand = utils.build_t0_t1_candidates(scored, top_n=n)
+    t0t1 = backtest.t0t1_scores(prob[None, :], signals["Range"].to_numpy()[None, :],
+                                signals["Volume"].to_numpy()[None, :],
+                                signals["buy_ratio"].to_numpy()[None, :])[0]
+    np.testing.assert_array_equal(np.flatnonzero(~np.isnan(t0t1)), np.sort(cand.index.to_numpy()))
+    np.testing.assert_allclose(t0t1[cand.index], cand["T0T1_Score"])
+
+
+def test_sweep_rows_match_run_backtest(case_dir):
+    import sweep
+
+    utils.build_case_store()
+    params = sweep.sweep_random(3, seed=1)
+    results = sweep.run_sweep(params, workers=2, top_n=2)
+    assert (utils.SWEEP_DIR / "results.csv").exists()
+    assert list(results["Rank"]) == [1, 2, 3]
+    for _, row in results.iterrows():
+        p = {k: row[k] for k in sweep.SWEEP_SPACE}
+        expected = backtest.run_backtest(top_n=2, **p)
+        for score, res in expected.items():
+            for metric in sweep.SWEEP_METRICS:
+                np.testing.assert_allclose(row[f"{score}_{metric}"], res[metric], err_msg=metric)
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import technicals
+import utils
+from conftest import make_case_history, write_case_csv
+
+
+def _expected(history: pd.DataFrame) -> pd.DataFrame:
+    return history.astype({c: float for c in utils.CASE_NUMERIC_COLUMNS}).reset_index(drop=True)
+
+
+def test_load_case_store_matches_csv(case_dir):
+    utils.build_case_store()
+    for sym, hist in case_dir.items():
+        df = utils.load_case(sym)
+        assert list(df.columns) == ["Date"] + utils.CASE_NUMERIC_COLUMNS
+        pd.testing.assert_frame_equal(df, _expected(hist), check_dtype=False)
+
+
+def test_load_case_csv_fallback_has_same_columns_and_does_not_rebuild(case_dir):
+    utils.build_case_store()
+    index = utils.CASE_STORE_DIR / "index.json"
+    before = index.stat().st_mtime_ns
+
+    path = utils.CASE_DIR / "C01.csv"
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # الملف "اتغير"
+    stale = utils.load_case("C01")
+    assert index.stat().st_mtime_ns == before
+
+    # بدون مخزن خالص: نفس الشكل من الـ CSV
+    utils._CASE_STORE_CACHE.clear()
+    for f in utils.CASE_STORE_DIR.iterdir():
+        f.unlink()
+    from_csv = utils.load_case("C02")
+
+    pd.testing.assert_frame_equal(stale, _expected(case_dir["C01"]), check_dtype=False)
+    pd.testing.assert_frame_equal(from_csv, _expected(case_dir["C02"]), check_dtype=False)
+
+
+def test_build_case_store_reads_only_new_head_rows(case_dir):
+    utils.build_case_store()
+    hist = case_dir["C03"]
+    longer = pd.concat([hist, make_case_history(n_days=3, seed=99, end="2026-01-18")])
+    write_case_csv(utils.CASE_DIR / "C03.csv", longer)
+
+    utils.build_case_store()
+    pd.testing.assert_frame_equal(utils.load_case("C03"), _expected(longer), check_dtype=False)
+
+    incremental = {k: np.array(v) for k, v in utils._open_case_store().items() if k in ("dates", "values")}
+    rebuilt = utils.build_case_store(force=True)
+    np.testing.assert_array_equal(incremental["dates"], rebuilt["dates"])
+    np.testing.assert_array_equal(incremental["values"], rebuilt["values"])
+
+
+def test_case_panel_matches_pandas_pivot(case_dir):
+    utils.build_case_store()
+    panel = utils.load_case_panel(align="date")
+    long = pd.concat([h.assign(Symbol=s) for s, h in case_dir.items()])
+    expected = long.pivot(index="Date", columns="Symbol", values="Closed")
+    np.testing.assert_array_equal(panel["dates"], expected.index.to_numpy(dtype="datetime64[D]"))
+    np.testing.assert_allclose(panel["close"], expected[panel["symbols"]].to_numpy())
+
+    last = utils.load_case_panel(align="last", lookback=30)
+    for j, sym in enumerate(last["symbols"]):
+        np.testing.assert_allclose(last["close"][:, j], case_dir[sym]["Closed"].to_numpy()[-30:])
+
+
+def _full_technicals():
+    return technicals.last_row_table(utils.load_case_panel(align="last"))
+
+
+def test_market_technicals_from_rolling_state_match_full_history(case_dir):
+    utils.build_case_store()
+    pd.testing.assert_frame_equal(utils.market_technicals(), _full_technicals(), check_exact=False)
+
+    # يوم جديد عبر append_case_rows: الحالة المتدحرجة تتحدث بدون إعادة بناء
+    rows = pd.concat([make_case_history(n_days=1, seed=50 + i, end="2026-01-14").assign(Symbol=sym)
+                      for i, sym in enumerate(case_dir)])
+    assert utils.append_case_rows(rows) == len(case_dir)
+    state_mtime = utils.ROLLING_STATE_PATH.stat().st_mtime_ns
+    tech = utils.market_technicals(["C02", "C04"])
+    assert utils.ROLLING_STATE_PATH.stat().st_mtime_ns == state_mtime
+    expected = _full_technicals().set_index("Symbol").loc[["C02", "C04"]].reset_index()
+    pd.testing.assert_frame_equal(tech, expected, check_exact=False)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlation
+import utils
+from conftest import make_case_history, write_case_csv
+
+
+@pytest.fixture
+def close():
+    """أسعار 150 يوم × 8 أسهم: أزواج مرتبطة، فجوات NaN وسهم بدأ متأخراً."""
+    rng = np.random.default_rng(4)
+    base = rng.normal(0, 0.02, (150, 4))
+    noise = rng.normal(0, 0.01, (150, 8))
+    rets = np.concatenate([base, base * [1, -1, 0.5, 0]], axis=1) + noise
+    close = 10 * np.exp(np.cumsum(rets, axis=0))
+    close[rng.random(close.shape) < 0.05] = np.nan
+    close[:60, 7] = np.nan
+    return close
+
+
+def test_returns_skip_missing_days(close):
+    expected = pd.DataFrame(close).ffill().pct_change(fill_method=None).to_numpy(copy=True)
+    expected[np.isnan(close)] = np.nan
+    np.testing.assert_allclose(correlation.returns_from_prices(close), expected, rtol=1e-12)
+
+
+def test_corr_from_stats_matches_pandas(close):
+    returns = correlation.returns_from_prices(close)
+    stats = correlation.corr_stats(returns)
+    expected = pd.DataFrame(returns).corr(min_periods=80).to_numpy()
+    np.testing.assert_allclose(correlation.corr_from_stats(stats, min_overlap=80), expected,
+                               rtol=1e-9, atol=1e-12)
+    valid = pd.DataFrame(returns).notna().astype(float)
+    np.testing.assert_array_equal(stats["n"], (valid.T @ valid).to_numpy())
+
+    idx = np.array([1, 3, 6])
+    np.testing.assert_allclose(correlation.corr_from_stats(stats, idx, min_overlap=80),
+                               expected[np.ix_(idx, idx)], rtol=1e-9, atol=1e-12)
+
+
+def test_update_corr_stats_add_and_remove_rows(close):
+    returns = correlation.returns_from_prices(close)
+    stats = correlation.corr_stats(returns[:100])
+    correlation.update_corr_stats(stats, add_rows=returns[100:], remove_rows=returns[:40])
+    expected = correlation.corr_stats(returns[40:])
+    for k in expected:
+        np.testing.assert_allclose(stats[k], expected[k], rtol=1e-9, atol=1e-12)
+
+
+def test_pairs_from_corr_matches_pandas_filter(close):
+    returns = correlation.returns_from_prices(close)
+    corr = correlation.corr_from_stats(correlation.corr_stats(returns), min_overlap=60)
+    symbols = [f"S{i}" for i in range(close.shape[1])]
+    pairs = correlation.pairs_from_corr(corr, symbols, min_abs_corr=0.5)
+
+    frame = pd.DataFrame(returns, columns=symbols).corr(min_periods=60)
+    upper = frame.where(np.triu(np.ones(frame.shape, dtype=bool), k=1)).stack()
+    expected = upper[upper.abs() >= 0.5]
+    assert list(pairs.columns) == correlation.PAIR_COLUMNS
+    assert len(pairs) == len(expected) > 0
+    assert (np.diff(pairs["Corr"].abs().to_numpy()) <= 0).all()
+    got = pairs.set_index(["Symbol_A", "Symbol_B"])["Corr"]
+    np.testing.assert_allclose(got.loc[expected.index].to_numpy(), expected.to_numpy(), rtol=1e-9)
+    assert (pairs["Relation"] == np.where(pairs["Corr"] > 0, "Positive", "Negative")).all()
+
+
+def _full_stats(window):
+    panel = utils.load_case_panel(align="date")
+    returns = correlation.returns_from_prices(panel["close"])
+    return correlation.corr_stats(returns if window is None else returns[-window:])
+
+
+def _assert_stats_equal(got, expected):
+    for k in expected:
+        np.testing.assert_allclose(got[k], expected[k], rtol=1e-9, atol=1e-9)
+
+
+def _new_day(symbols, end, seed):
+    return pd.concat([make_case_history(n_days=1, seed=seed + i, end=end).assign(Symbol=s)
+                      for i, s in enumerate(symbols)])
+
+
+@pytest.mark.parametrize("window", [None, 60])
+def test_correlation_stats_update_matches_full_recompute(case_dir, monkeypatch, window):
+    utils.build_case_store()
+    _assert_stats_equal(utils.load_correlation_stats(window)["stats"], _full_stats(window))
+
+    # يومان جديدان (بعض الأسهم بدون تداول فى أحدهما): تُقرأ الصفوف الجديدة فقط
+    sizes = []
+    real = correlation.corr_stats
+    monkeypatch.setattr(correlation, "corr_stats", lambda r: sizes.append(len(r)) or real(r))
+    utils.append_case_rows(_new_day(list(case_dir), "2026-01-14", 10))
+    utils.append_case_rows(_new_day(["C00", "C02", "C05"], "2026-01-15", 20))
+    cached = utils.load_correlation_stats(window)
+    assert max(sizes) <= 2
+    assert cached["through_date"] == np.datetime64("2026-01-15")
+    monkeypatch.setattr(correlation, "corr_stats", real)
+    _assert_stats_equal(cached["stats"], _full_stats(window))
+
+
+def test_correlation_stats_rebuilt_when_history_changes(case_dir):
+    utils.build_case_store()
+    utils.append_case_rows(_new_day(list(case_dir), "2026-01-14", 10))
+    utils.load_correlation_stats(60)
+
+    # الملف النهائى للجلسة يستبدل آخر صف (إغلاق مختلف)
+    rows = _new_day(["C01"], "2026-01-14", 10)
+    rows["Closed"] *= 1.05
+    utils.append_case_rows(rows, replace=True)
+    _assert_stats_equal(utils.load_correlation_stats(60)["stats"], _full_stats(60))
+
+    # ملف CSV اتعدل تاريخه القديم (المخزن أعاد قراءته بالكامل)
+    hist = case_dir["C03"].copy()
+    hist.loc[10, "Closed"] *= 1.5
+    write_case_csv(utils.CASE_DIR / "C03.csv", hist)
+    utils.build_case_store()
+    _assert_stats_equal(utils.load_correlation_stats(60)["stats"], _full_stats(60))
+
+
+def test_correlation_stats_kept_when_csv_only_gains_head_rows(case_dir):
+    utils.build_case_store()
+    utils.load_correlation_stats()
+    longer = pd.concat([case_dir["C02"], make_case_history(n_days=2, seed=5, end="2026-01-15")])
+    write_case_csv(utils.CASE_DIR / "C02.csv", longer)
+    utils.build_case_store()
+    cached = utils.load_correlation_stats()
+    assert cached["through_date"] == np.datetime64("2026-01-15")
+    _assert_stats_equal(cached["stats"], _full_stats(None))
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+import utils
+from conftest import append_tape
+
+
+class LoadLog:
+    """يسجل كل قراءة فعلية لملف مصدر (add_load_hook) كـ (kind, file)."""
+
+    def __init__(self):
+        self.loads = []
+
+    def __call__(self, kind, path, source):
+        self.loads.append((kind, path.name))
+
+    def take(self):
+        loads, self.loads = sorted(self.loads), []
+        return loads
+
+
+def _render_tape_pages(intraday_path, tx_path):
+    """نفس ما تطلبه صفحات الجلسة: الإشارات، الصفقات اللحظية، والشموع بفترتين."""
+    utils.daily_signals(intraday_path, tx_path)
+    utils.daily_ticks(tx_path)
+    utils.daily_bars(tx_path, interval=5, symbol="S03")
+    utils.daily_bars(tx_path, interval=1)
+
+
+def test_one_load_per_file_per_refresh(daily_dirs):
+    intraday_path, tx_path, tape = daily_dirs
+    log = utils.add_load_hook(LoadLog())
+    try:
+        _render_tape_pages(intraday_path, tx_path)
+        assert log.take() == [("intraday", intraday_path.name), ("transactions", tx_path.name)]
+
+        # الشريط كبر: الأسطر الجديدة فقط، مرة واحدة لكل الصفحات
+        append_tape(tx_path, tape.iloc[1500:2200])
+        _render_tape_pages(intraday_path, tx_path)
+        assert log.take() == [("transactions_tail", tx_path.name)]
+
+        # بدون تغيير: لا قراءة
+        _render_tape_pages(intraday_path, tx_path)
+        assert log.take() == []
+    finally:
+        utils.remove_load_hook(log)
+
+
+def test_build_signals_for_day_reuses_loaded_frames(daily_dirs):
+    intraday_path, tx_path, _ = daily_dirs
+    from_paths = utils.build_signals_for_day(intraday_path, tx_path)
+    counts = utils.load_counts().set_index("kind")["loads"]
+    assert counts.to_dict() == {"intraday": 1, "transactions": 1}
+
+    df_intraday, df_tx = utils.load_intraday(intraday_path), utils.load_transactions(tx_path)
+    utils.reset_load_counts()
+    log = utils.add_load_hook(LoadLog())
+    try:
+        from_frames = utils.build_signals_for_day(df_intraday=df_intraday, df_tx=df_tx)
+        with_agg = utils.build_signals_for_day(df_intraday=df_intraday,
+                                               agg_tx=utils.aggregate_transactions(df_tx))
+    finally:
+        utils.remove_load_hook(log)
+    assert log.take() == [] and utils.load_counts().empty
+    pd.testing.assert_frame_equal(from_frames, from_paths)
+    pd.testing.assert_frame_equal(with_agg, from_paths)
+
+
+def test_load_hook_removed_and_counts_per_file(daily_dirs):
+    intraday_path, tx_path, _ = daily_dirs
+    log = utils.add_load_hook(LoadLog())
+    utils.load_intraday(intraday_path)
+    utils.remove_load_hook(log)
+    utils.load_intraday(intraday_path)
+    assert log.take() == [("intraday", intraday_path.name)]
+
+    # الصفحات كلها بعد القراءتين: لا قراءة جديدة للملف غير المتغير
+    utils.reset_load_counts()
+    _render_tape_pages(intraday_path, tx_path)
+    _render_tape_pages(intraday_path, tx_path)
+    counts = utils.load_counts()
+    assert (counts["loads"] == 1).all()
+    assert sorted(counts["file"]) == sorted([intraday_path.name, tx_path.name])
+
+
+def test_tape_pages_follow_the_growing_tape(daily_dirs):
+    intraday_path, tx_path, tape = daily_dirs
+    _render_tape_pages(intraday_path, tx_path)
+    append_tape(tx_path, tape.iloc[1500:])
+
+    # الصفحات بترتيب مختلف: الصفقات تقرأ الجديد، والإشارات تعرف الأسهم المتغيرة منها
+    ticks = utils.daily_ticks(tx_path)
+    signals = utils.daily_signals(intraday_path, tx_path)
+
+    full = utils.load_transactions(tx_path)
+    expected = utils.build_tick_analytics(full)
+    for k in expected:
+        np.testing.assert_array_equal(ticks[k], expected[k], err_msg=k)
+    agg = utils.aggregate_transactions(full).set_index("Symbol")
+    got = signals.set_index("Symbol")
+    np.testing.assert_allclose(got["total_volume"], agg.loc[got.index, "total_volume"])
+    np.testing.assert_allclose(got["buy_ratio"], agg.loc[got.index, "buy_ratio"])
+
+    bars = utils.daily_bars(tx_path, interval=5)
+    np.testing.assert_allclose(bars["Volume"].sum(), expected["total_volume"].sum())
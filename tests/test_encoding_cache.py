@@ -0,0 +1,61 @@
+import json
+import os
+
+import pandas as pd
+
+import utils
+from conftest import make_case_history, write_case_csv
+
+
+def test_encoding_cache_hit_miss_and_signature_change(tmp_path):
+    path = tmp_path / "a.csv"
+    pd.DataFrame({"الاسم": ["سهم", "بنك"], "x": [1, 2]}).to_csv(path, index=False, encoding="cp1256")
+
+    df, enc = utils.read_csv_any_encoding(path)
+    assert enc == "cp1256" and list(df.columns) == ["الاسم", "x"]
+    assert utils.ENCODING_STATS["cache_miss"] == 1
+    saved = json.loads(utils.ENCODING_CACHE_PATH.read_text(encoding="utf-8"))
+    assert saved[str(path.resolve())][2] == "cp1256"
+
+    utils.read_csv_any_encoding(path)
+    assert utils.ENCODING_STATS["cache_hit"] == 1
+
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    utils.read_csv_any_encoding(path)
+    assert utils.ENCODING_STATS["cache_miss"] == 2
+
+
+def test_encoding_cache_written_once_per_batch(tmp_path):
+    paths = []
+    for i in range(5):
+        p = tmp_path / f"f{i}.csv"
+        pd.DataFrame({"x": [i]}).to_csv(p, index=False)
+        paths.append(p)
+
+    before = utils.ENCODING_STATS["cache_writes"]
+    with utils.encoding_cache_batch():
+        for p in paths:
+            utils.read_csv_any_encoding(p)
+        assert utils.ENCODING_STATS["cache_writes"] == before
+    assert utils.ENCODING_STATS["cache_writes"] == before + 1
+    assert len(json.loads(utils.ENCODING_CACHE_PATH.read_text(encoding="utf-8"))) == 5
+
+    # دفعة كلها من الكاش لا تكتب شيئاً
+    with utils.encoding_cache_batch():
+        for p in paths:
+            utils.read_csv_any_encoding(p)
+    assert utils.ENCODING_STATS["cache_writes"] == before + 1
+
+
+def test_build_case_store_writes_encoding_cache_once(case_dir):
+    utils.build_case_store()
+    assert utils.ENCODING_STATS["cache_writes"] == 1
+
+    # ملفات كبرت (قراءة الرءوس) + ملف جديد (قراءة كاملة) = كتابة واحدة
+    for sym in ("C01", "C02"):
+        longer = pd.concat([case_dir[sym], make_case_history(n_days=2, seed=7, end="2026-01-15")])
+        write_case_csv(utils.CASE_DIR / f"{sym}.csv", longer)
+    write_case_csv(utils.CASE_DIR / "C09.csv", make_case_history(n_days=30, seed=9))
+    utils.build_case_store()
+    assert utils.ENCODING_STATS["cache_writes"] == 2
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+import features
+import utils
+from conftest import make_case_history, write_case_csv
+
+
+def _new_day(symbols, end, seed):
+    return pd.concat([make_case_history(n_days=1, seed=seed + i, end=end).assign(Symbol=s)
+                      for i, s in enumerate(symbols)])
+
+
+def _snapshot(store):
+    return {"symbols": dict(store["symbols"]), "values": np.array(store["values"])}
+
+
+def test_feature_store_matches_panel_features(case_dir):
+    utils.build_case_store()
+    store = features.build_feature_store()
+    panel = utils.load_case_panel(align="last")
+    expected = features.panel_features(panel["close"], panel["high"], panel["low"], panel["volume"])
+    for j, sym in enumerate(panel["symbols"]):
+        start, stop = store["symbols"][sym][:2]
+        n = stop - start
+        for k, c in enumerate(features.FEATURE_COLUMNS):
+            np.testing.assert_allclose(store["values"][k, start:stop], expected[c][-n:, j], err_msg=c)
+
+
+def test_incremental_feature_store_equals_forced_rebuild(case_dir, monkeypatch):
+    utils.build_case_store()
+    features.build_feature_store()
+
+    # يومان جديدان + استبدال آخر صف لسهم + CSV اتعدل تاريخه القديم
+    utils.append_case_rows(_new_day(list(case_dir), "2026-01-14", 10))
+    utils.append_case_rows(_new_day(["C00", "C03"], "2026-01-15", 20))
+    rows = _new_day(["C01"], "2026-01-14", 10)
+    rows["Closed"] *= 1.05
+    utils.append_case_rows(rows, replace=True)
+    hist = case_dir["C04"].copy()
+    hist.loc[5, "Closed"] *= 1.5
+    write_case_csv(utils.CASE_DIR / "C04.csv", hist)
+    utils.build_case_store()
+
+    # الأسهم التى لم يتغير ملفها: الصفوف الجديدة فقط من آخر FEATURE_LOOKBACK صف
+    sizes = []
+    real = features.panel_features
+    monkeypatch.setattr(features, "panel_features",
+                        lambda close, *a: sizes.append(close.shape) or real(close, *a))
+    incremental = _snapshot(features.build_feature_store())
+    monkeypatch.setattr(features, "panel_features", real)
+    assert sizes[0][1] == 1  # C04 وحده من الأول
+    assert sizes[1] == (features.FEATURE_LOOKBACK + 3, len(case_dir) - 1)
+
+    rebuilt = _snapshot(features.build_feature_store(force=True))
+    assert incremental["symbols"] == rebuilt["symbols"]
+    np.testing.assert_allclose(incremental["values"], rebuilt["values"], rtol=1e-9, atol=1e-12)
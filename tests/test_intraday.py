@@ -0,0 +1,23 @@
+import pandas as pd
+
+import utils
+from conftest import make_intraday, write_intraday_xlsx
+
+
+def test_intraday_snapshot_reused_until_version_changes(tmp_path, monkeypatch):
+    path = tmp_path / "14-1-2026.xlsx"
+    write_intraday_xlsx(path, make_intraday(["AAA", "BBB", "CCC"]))
+    sources = []
+    hook = utils.add_load_hook(lambda kind, p, source: sources.append(source))
+    try:
+        first = utils.load_intraday(path)
+        second = utils.load_intraday(path)
+        monkeypatch.setattr(utils, "INTRADAY_SNAPSHOT_VERSION", utils.INTRADAY_SNAPSHOT_VERSION + 1)
+        third = utils.load_intraday(path)
+    finally:
+        utils.remove_load_hook(hook)
+
+    assert sources == ["xlsx", "snapshot", "xlsx"]
+    assert third.attrs["snapshot_version"] == utils.INTRADAY_SNAPSHOT_VERSION
+    pd.testing.assert_frame_equal(first, second)
+    assert {"Pivot Point", "Resistance 1 (R1)", "Support 1 (S1)"} <= set(first.columns)
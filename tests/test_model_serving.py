@@ -0,0 +1,64 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import classifier
+import features
+import utils
+from conftest import make_intraday
+
+DAY = pd.Timestamp("2026-01-14")
+
+
+@pytest.fixture
+def session(case_dir):
+    """مخزن CASE حتى 13-1 + لقطة جلسة 14-1 المفتوحة (لم تُضف للمخزن) مع buy_ratio."""
+    utils.build_case_store()
+    snapshot = make_intraday(list(case_dir), seed=3)
+    snapshot["buy_ratio"] = [0.7, 0.2, np.nan, 0.55, 0.4, 0.9]
+    return snapshot
+
+
+def _save_model():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, len(features.FEATURE_COLUMNS)))
+    y = (X[:, features.FEATURE_COLUMNS.index("buy_ratio")] + rng.normal(0, 0.5, 200) > 0).astype(int)
+    model = classifier.LogisticClassifier().fit(X, y, feature_names=features.FEATURE_COLUMNS)
+    utils.MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(utils.MODEL_PATH, "wb") as f:
+        pickle.dump(model, f)
+    return model
+
+
+def test_live_features_match_store_after_close(session):
+    symbols = session["Symbol"]
+    live = utils.model_features(symbols, DAY, snapshot=session)
+    assert not np.isnan(np.delete(live, features.FEATURE_COLUMNS.index("buy_ratio"), axis=1)).any()
+
+    # نفس الجلسة بعد إضافتها للمخزن (close_session): نفس الخصائص من مخزن الخصائص
+    utils.append_case_rows(utils.case_rows_from_intraday(session, DAY))
+    np.testing.assert_allclose(live, utils.model_features(symbols, DAY), rtol=1e-12)
+    # بدون لقطة لجلسة بعد آخر تاريخ مخزن: صفوف NaN
+    assert np.isnan(utils.model_features(symbols, DAY + pd.Timedelta(days=1))).all()
+
+
+def test_score_signals_serves_model_with_rules_fallback(session):
+    model = _save_model()
+    scored = utils.score_signals(session, DAY)
+    rules = utils.apply_ai_score(session)
+
+    served = session["buy_ratio"].notna().to_numpy()
+    assert list(scored["AI_Source"]) == np.where(served, "model", "rules").tolist()
+    X = utils.model_features(session["Symbol"], DAY, session["buy_ratio"], snapshot=session)
+    np.testing.assert_allclose(scored.loc[served, "AI_Prob"],
+                               np.clip(model.predict_proba(X[served])[:, 1], 0.05, 0.95))
+    np.testing.assert_allclose(scored.loc[~served, "AI_Prob"], rules.loc[~served, "AI_Prob"])
+
+
+def test_score_signals_without_model_uses_rules(session):
+    scored = utils.score_signals(session, DAY)
+    assert (scored["AI_Source"] == "rules").all()
+    np.testing.assert_allclose(scored["AI_Prob"], utils.apply_ai_score(session)["AI_Prob"])
+    assert "not found" in utils.MODEL_STATS["last_error"]
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import legacy
+import pivots
+import utils
+from conftest import make_case_history
+
+
+@pytest.fixture
+def hlc():
+    rng = np.random.default_rng(2)
+    close = rng.uniform(5, 50, 40)
+    high = close * (1 + rng.uniform(0, 0.05, 40))
+    low = close * (1 - rng.uniform(0, 0.05, 40))
+    high[3], low[7], close[11] = np.nan, np.nan, np.nan
+    return pd.DataFrame({"High": high, "Low": low, "Close": close})
+
+
+def _expected_levels(df: pd.DataFrame, method: str) -> pd.DataFrame:
+    """المعادلات المرجعية لكل طريقة مكتوبة بـ pandas مباشرة."""
+    h, lo, c = df["High"], df["Low"], df["Close"]
+    rng = h - lo
+    p = (h + lo + 2 * c) / 4 if method == "woodie" else (h + lo + c) / 3
+    if method in ("classic", "woodie"):
+        r = [2 * p - lo, p + rng, h + 2 * (p - lo)]
+        s = [2 * p - h, p - rng, lo - 2 * (h - p)]
+    elif method == "fibonacci":
+        r = [p + k * rng for k in (0.382, 0.618, 1.0)]
+        s = [p - k * rng for k in (0.382, 0.618, 1.0)]
+    else:
+        r = [c + rng * 1.1 / k for k in (12, 6, 4)]
+        s = [c - rng * 1.1 / k for k in (12, 6, 4)]
+    return pd.DataFrame(dict(zip(pivots.LEVELS, [p, *r, *s])))
+
+
+@pytest.mark.parametrize("method", pivots.METHODS)
+def test_method_levels_match_formulas(hlc, method):
+    result = pivots.method_levels(hlc["High"], hlc["Low"], hlc["Close"], method)
+    assert result.shape == (len(pivots.LEVELS), len(hlc))
+    np.testing.assert_allclose(result.T, _expected_levels(hlc, method).to_numpy(), rtol=1e-12)
+
+
+def test_unknown_method_raises(hlc):
+    with pytest.raises(ValueError):
+        pivots.method_levels(hlc["High"], hlc["Low"], hlc["Close"], "demark")
+
+
+@pytest.mark.parametrize("timeframe,before", [
+    ("daily", "2026-03-10"),
+    ("weekly", "2026-03-10"),   # ثلاثاء → الأسبوع السابق يبدأ الأحد 1 مارس
+    ("weekly", "2026-03-08"),   # أحد
+    ("monthly", "2026-03-10"),
+    ("monthly", "2026-01-05"),  # لا توجد فترة سابقة فى البيانات
+])
+def test_previous_period_hlc_matches_groupby(timeframe, before):
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range("2026-01-04", "2026-03-12", freq="C", weekmask="Sun Mon Tue Wed Thu")
+    n_sym = 4
+    close = rng.uniform(5, 50, (len(dates), n_sym))
+    high, low = close * 1.02, close * 0.98
+    close[rng.random(close.shape) < 0.15] = np.nan
+    high[np.isnan(close)] = np.nan
+    low[np.isnan(close)] = np.nan
+
+    h, lo, c = pivots.previous_period_hlc(dates.to_numpy(), high, low, close,
+                                          np.datetime64(before), timeframe)
+
+    # المرجع: groupby على الفترة (الأسبوع يبدأ الأحد فى البورصة المصرية)
+    if timeframe == "daily":
+        period = dates.to_period("D")
+        current = pd.Timestamp(before).to_period("D")
+    elif timeframe == "weekly":
+        period = dates.to_period("W-SAT")
+        current = pd.Timestamp(before).to_period("W-SAT")
+    else:
+        period = dates.to_period("M")
+        current = pd.Timestamp(before).to_period("M")
+    earlier = period[period < current]
+    if len(earlier) == 0:
+        assert np.isnan(h).all() and np.isnan(lo).all() and np.isnan(c).all()
+        return
+    rows = period == earlier.max()
+    np.testing.assert_allclose(h, pd.DataFrame(high[rows]).max().to_numpy())
+    np.testing.assert_allclose(lo, pd.DataFrame(low[rows]).min().to_numpy())
+    np.testing.assert_allclose(c, pd.DataFrame(close[rows]).ffill().iloc[-1].to_numpy())
+
+
+def _intraday_frame():
+    rng = np.random.default_rng(4)
+    n = 30
+    last = rng.uniform(5, 50, n)
+    df = pd.DataFrame({
+        "Symbol": [f"S{i:02d}" for i in range(n)],
+        "High": last * 1.03, "Low": last * 0.97, "Last": last,
+        "Prev. Closed": last * rng.uniform(0.95, 1.05, n),
+    })
+    df.loc[2, "High"] = np.nan
+    df.loc[5, "Prev. Closed"] = np.nan
+    return df
+
+
+def test_add_pivot_levels_matches_pandas():
+    df = _intraday_frame()
+    pd.testing.assert_frame_equal(utils.add_pivot_levels(df), legacy.add_pivot_levels(df),
+                                  check_dtype=False)
+
+
+def test_add_pivot_levels_keeps_existing_levels():
+    df = legacy.add_pivot_levels(_intraday_frame())
+    # مستويات الملف تبقى كما هى، والصفوف التى كل مستوياتها NaN فقط تُحسب
+    df.loc[0, "Pivot Point"] = 1.0
+    df.loc[[1, 4], list(utils.PIVOT_COLUMNS.values())] = np.nan
+    result = utils.add_pivot_levels(df)
+    pd.testing.assert_frame_equal(result, legacy.add_pivot_levels(df), check_dtype=False)
+    assert result.loc[0, "Pivot Point"] == 1.0
+
+    before = df.copy()
+    utils.add_pivot_levels(df)
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_session_breakouts_match_pandas_shift():
+    rng = np.random.default_rng(5)
+    n_sym, n_days = 5, 60
+    frame = pd.DataFrame({
+        "seg": np.repeat(np.arange(n_sym), n_days),
+        "Close": 10 * np.exp(np.cumsum(rng.normal(0, 0.03, n_sym * n_days))),
+    })
+    frame["High"] = frame["Close"] * (1 + rng.uniform(0, 0.02, len(frame)))
+    frame["Low"] = frame["Close"] * (1 - rng.uniform(0, 0.02, len(frame)))
+
+    events = pivots.session_breakouts(frame["High"], frame["Low"], frame["Close"], frame["seg"])
+
+    prev = frame.groupby("seg")[["High", "Low", "Close"]].shift(1)
+    levels = _expected_levels(prev, "classic")
+    expected_rows, expected_types = [], []
+    for t, name in enumerate(pivots.BREAK_TYPES):
+        hit = frame["Close"] >= levels[name] if name.startswith("r") else frame["Close"] <= levels[name]
+        idx = np.flatnonzero(hit.to_numpy())
+        expected_rows.append(idx)
+        expected_types.append(np.full(idx.size, t))
+    np.testing.assert_array_equal(events["row"], np.concatenate(expected_rows))
+    np.testing.assert_array_equal(events["type"], np.concatenate(expected_types))
+
+    for h in pivots.FOLLOW_THROUGH:
+        fwd = frame.groupby("seg")["Close"].shift(-h) / frame["Close"] - 1
+        np.testing.assert_allclose(events[f"fwd_{h}"], fwd.to_numpy()[events["row"]], rtol=1e-12)
+
+
+def test_breakout_history_cached_per_case_store(case_dir):
+    utils.build_case_store()
+    events, stats = utils.load_breakout_history()
+    mtime = (utils.BREAKOUTS_DIR / "events.pkl").stat().st_mtime_ns
+
+    hist = case_dir["C02"]
+    prev = hist[["High", "Low", "Closed"]].shift(1).rename(columns={"Closed": "Close"})
+    levels = _expected_levels(prev, "classic")
+    c = hist["Closed"]
+    r1 = (c >= levels["r1"]).to_numpy()
+    got = utils.symbol_breakouts(events, "C02")
+    np.testing.assert_array_equal(got.loc[got["Type"] == "R1", "Date"], hist["Date"][r1])
+    np.testing.assert_allclose(got.loc[got["Type"] == "R1", "Ret_1d"],
+                               (c.shift(-1) / c - 1)[r1], rtol=1e-12)
+    assert stats.loc[("C02", "R1"), "Events"] == r1.sum()
+
+    # بدون تغيير فى المخزن: من الملف المحفوظ، وبعد يوم جديد: إعادة بناء
+    utils.load_breakout_history()
+    assert (utils.BREAKOUTS_DIR / "events.pkl").stat().st_mtime_ns == mtime
+    utils.append_case_rows(make_case_history(n_days=1, seed=30, end="2026-01-14").assign(Symbol="C02"))
+    events, _ = utils.load_breakout_history()
+    assert (utils.BREAKOUTS_DIR / "events.pkl").stat().st_mtime_ns != mtime
+    pd.testing.assert_frame_equal(events, utils.build_breakout_events())
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+import utils
+from conftest import append_tape, make_intraday, make_tape, write_intraday_xlsx
+
+
+def _add_closed_day(intraday_path, tx_path):
+    """جلسة سابقة مغلقة (13-1-2026) بجانب جلسة اليوم المفتوحة."""
+    write_intraday_xlsx(intraday_path.with_name("13-1-2026.xlsx"),
+                        make_intraday([f"S{i:02d}" for i in range(10)], seed=1))
+    make_tape(800, n_symbols=10, seed=1).to_csv(tx_path.with_name("13-1-2026.csv"), index=False)
+
+
+def test_page_archive_leaves_open_session_out(daily_dirs):
+    intraday_path, tx_path, tape = daily_dirs
+    _add_closed_day(intraday_path, tx_path)
+
+    archive = utils.daily_signals_archive()
+    assert sorted(archive.index.get_level_values("Date").unique()) == [pd.Timestamp("2026-01-13")]
+    assert not (utils.SIGNALS_DIR / "2026-01-14.pkl").exists()
+
+    # الشريط المفتوح يكبر: لا إعادة تحميل ولا كتابة فى الأرشيف
+    index_mtime = (utils.SIGNALS_DIR / "index.json").stat().st_mtime_ns
+    append_tape(tx_path, tape.iloc[1500:])
+    assert utils.daily_signals_archive() is archive
+    assert (utils.SIGNALS_DIR / "index.json").stat().st_mtime_ns == index_mtime
+
+
+def test_close_session_archives_the_day(daily_dirs, case_dir):
+    intraday_path, tx_path, _ = daily_dirs
+    _add_closed_day(intraday_path, tx_path)
+    utils.build_case_store()
+    utils.daily_signals_archive()
+
+    utils.close_session(intraday_path)
+    archive = utils.daily_signals_archive()
+    today = utils.signals_on(archive, "2026-01-14")
+    assert len(today) == 12
+
+    expected = utils.build_day_signals(intraday_path, tx_path)
+    got = today.set_index("Symbol")["buy_ratio"]
+    np.testing.assert_allclose(got.loc[expected["Symbol"]], expected["buy_ratio"])
+
+
+def test_archive_queries(daily_dirs):
+    intraday_path, tx_path, _ = daily_dirs
+    _add_closed_day(intraday_path, tx_path)
+    utils.build_signals_archive(include_open=True)
+    archive = utils.load_signals_archive()
+
+    assert archive.index.names == ["Date", "Symbol"] and archive.index.is_monotonic_increasing
+    day = utils.signals_on(archive, "2026-01-13")
+    assert sorted(day["Symbol"]) == [f"S{i:02d}" for i in range(10)]
+    assert utils.signals_on(archive, "2026-01-12").empty
+
+    hist = utils.symbol_history(archive, "S03")
+    assert list(hist["Date"]) == [pd.Timestamp("2026-01-13"), pd.Timestamp("2026-01-14")]
+    assert list(utils.symbol_history(archive, "S03", days=1)["Date"]) == [pd.Timestamp("2026-01-14")]
+    assert list(utils.symbol_history(archive, "S11")["Date"]) == [pd.Timestamp("2026-01-14")]
@@ -0,0 +1,66 @@
+import pytest
+
+import symbol_index
+
+
+@pytest.fixture
+def index():
+    return symbol_index.build_index([
+        ("COMI", ["البنك التجارى الدولى", "Commercial International Bank"], "بنوك"),
+        ("COMI", ["البنك التجاري الدولي"], None),  # نفس السهم من ملف الجلسة
+        ("CIEB", ["كريدى أجريكول مصر", "Credit Agricole Egypt"], "بنوك"),
+        ("ETEL", ["المصرية للاتصالات", "Telecom Egypt"], "اتصالات"),
+        ("EAST", ["الشرقية - ايسترن كومباني", "Eastern Company"], "أغذية"),
+        ("ORAS", ["أوراسكوم كونستراكشون", "Orascom Construction"], "مقاولات"),
+        ("ABUK", ["أبوقير للأسمدة", "Abu Qir Fertilizers"], "أسمدة"),
+        ("MCQE", ["مصر للأسمنت قنا", "Misr Cement Qena"], "مواد بناء"),
+        ("", ["بدون رمز"], None),
+    ])
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("أبوقير", "ابوقير"),
+    ("إسكان آمن", "اسكان امن"),
+    ("مصرى", "مصري"),
+    ("الشركة المصرية", "الشركه المصريه"),
+    ("مؤسسة", "موسسه"),
+    ("مُحَمَّد", "محمد"),
+    ("الـــبنك", "البنك"),
+    ("  Telecom-Egypt (TE) ", "telecom egypt te"),
+    (None, ""),
+    (float("nan"), ""),
+])
+def test_normalize_folds_arabic_forms(text, expected):
+    assert symbol_index.normalize(text) == expected
+
+
+def test_build_index_merges_duplicate_symbols(index):
+    assert index["symbols"] == ["ABUK", "CIEB", "COMI", "EAST", "ETEL", "MCQE", "ORAS"]
+    i = index["symbols"].index("COMI")
+    assert index["names"][i] == "البنك التجارى الدولى"
+    assert index["sectors"][i] == "بنوك"
+    assert symbol_index.label(index, "COMI") == "COMI – البنك التجارى الدولى"
+    assert symbol_index.label(index, "XXXX") == "XXXX"
+
+
+def test_search_ranks_symbol_then_name_then_word(index):
+    # بداية رمز، ثم بداية كلمة (بالرمز عند التساوى)، ثم جزء من كلمة (agricole)
+    assert symbol_index.search(index, "co") == ["COMI", "EAST", "ORAS", "CIEB"]
+    assert symbol_index.search(index, "co", limit=2) == ["COMI", "EAST"]
+    # رمز مطابق أولاً
+    assert symbol_index.search(index, "comi")[0] == "COMI"
+    # بداية اسم، ثم كلمة داخل اسم، ثم جزء من كلمة (المصرية)
+    assert symbol_index.search(index, "مصر") == ["MCQE", "CIEB", "ETEL"]
+
+
+def test_search_arabic_forms_and_typos(index):
+    # الاسم مكتوب بأشكال مختلفة للحروف: نفس النتيجة
+    assert symbol_index.search(index, "ابوقير") == ["ABUK"]
+    assert symbol_index.search(index, "أبوقير") == ["ABUK"]
+    assert symbol_index.search(index, "التجارى") == symbol_index.search(index, "التجاري") == ["COMI"]
+    assert symbol_index.search(index, "اوراسكوم") == ["ORAS"]
+    # جزء من الاسم وخطأ إملائى
+    assert symbol_index.search(index, "صرية") == ["ETEL"]
+    assert symbol_index.search(index, "orascon") == ["ORAS"]
+    assert symbol_index.search(index, "") == []
+    assert symbol_index.search(index, "zzzz") == []
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import legacy
+import technicals
+import utils
+from conftest import make_case_history
+
+
+@pytest.fixture
+def panel():
+    """أسعار 120 يوم × 6 أسهم مع فجوات NaN (أيام بدون تداول) وأصفار فى الحجم."""
+    rng = np.random.default_rng(1)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (120, 6)), axis=0))
+    close[rng.random(close.shape) < 0.05] = np.nan
+    close[:30, 5] = np.nan  # سهم بدأ التداول متأخراً
+    volume = rng.integers(0, 10_000, close.shape).astype(float)
+    high = close * (1 + rng.uniform(0, 0.03, close.shape))
+    low = close * (1 - rng.uniform(0, 0.03, close.shape))
+    return close, volume, high, low
+
+
+@pytest.mark.parametrize("window", [1, 5, 20, 50])
+def test_rolling_mean_std_match_pandas(panel, window):
+    close = panel[0]
+    frame = pd.DataFrame(close)
+    np.testing.assert_allclose(technicals.rolling_mean(close, window),
+                               frame.rolling(window).mean().to_numpy(), rtol=1e-9, atol=1e-12)
+    if window > 1:
+        np.testing.assert_allclose(technicals.rolling_std(close, window),
+                                   frame.rolling(window).std().to_numpy(), rtol=1e-7, atol=1e-10)
+
+
+def test_rolling_shorter_than_window():
+    out = technicals.rolling_mean(np.arange(3.0), 5)
+    assert out.shape == (3, 1) and np.isnan(out).all()
+
+
+def test_rsi_matches_technical_view(panel):
+    close = panel[0]
+    expected = np.column_stack([legacy.rsi(pd.Series(close[:, j])).to_numpy()
+                                for j in range(close.shape[1])])
+    np.testing.assert_allclose(technicals.rsi(close), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_atr_and_bollinger_match_pandas(panel):
+    close, _, high, low = panel
+    c, h, lo = pd.DataFrame(close), pd.DataFrame(high), pd.DataFrame(low)
+    prev = c.shift(1)
+    # أكبر المدى الثلاثة مع تجاهل NaN (يوم أول بدون إغلاق سابق)
+    tr = pd.concat([h - lo, (h - prev).abs(), (lo - prev).abs()], keys=range(3)).groupby(level=1).max()
+    np.testing.assert_allclose(technicals.atr(high, low, close),
+                               tr.rolling(14).mean().to_numpy(), rtol=1e-9)
+
+    mid, upper, lower = technicals.bollinger(close)
+    sd = c.rolling(20).std().to_numpy()
+    np.testing.assert_allclose(upper, c.rolling(20).mean().to_numpy() + 2 * sd, rtol=1e-9)
+    np.testing.assert_allclose(lower, mid - 2 * sd, rtol=1e-9)
+
+
+def test_rolling_state_matches_full_recompute(panel):
+    close, volume, _, _ = panel
+    has_row = ~np.isnan(close)
+    state = technicals.init_rolling_state(close.shape[1])
+    for r in range(close.shape[0]):
+        technicals.update_rolling_state(state, close[r], volume[r], has_row[r])
+    values = technicals.rolling_state_values(state)
+
+    for j in range(close.shape[1]):
+        # الحالة تتابع صفوف السهم الفعلية فقط (مثل panel بمحاذاة last)
+        rows = has_row[:, j]
+        c, v = pd.Series(close[rows, j]), pd.Series(volume[rows, j])
+        np.testing.assert_allclose(values["MA20"][j], c.rolling(20).mean().iloc[-1], rtol=1e-9)
+        np.testing.assert_allclose(values["MA50"][j], c.rolling(50).mean().iloc[-1], rtol=1e-9)
+        np.testing.assert_allclose(values["Vol20"][j], v.rolling(20).mean().iloc[-1], rtol=1e-9)
+        np.testing.assert_allclose(values["RSI14"][j], legacy.rsi(c).iloc[-1], rtol=1e-9)
+
+
+def test_compute_basic_technicals_last_row():
+    df = make_case_history(n_days=80, seed=3)
+    row = utils.compute_basic_technicals(df.iloc[::-1])  # ترتيب الملف (الأحدث أولاً)
+    close, volume = df["Closed"], df["Volume"].astype(float)
+    assert row.index.tolist() == [df.index[-1]]
+    np.testing.assert_allclose(row["Close"].iloc[0], close.iloc[-1])
+    np.testing.assert_allclose(row["MA20"].iloc[0], close.rolling(20).mean().iloc[-1], rtol=1e-9)
+    np.testing.assert_allclose(row["MA50"].iloc[0], close.rolling(50).mean().iloc[-1], rtol=1e-9)
+    np.testing.assert_allclose(row["Vol20"].iloc[0], volume.rolling(20).mean().iloc[-1], rtol=1e-9)
+    np.testing.assert_allclose(row["RSI14"].iloc[0], legacy.rsi(close).iloc[-1], rtol=1e-9)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import legacy
+import utils
+from conftest import append_tape, make_tape
+
+
+@pytest.mark.parametrize("direction_only", [False, True])
+def test_aggregate_transactions_matches_pandas(direction_only):
+    tape = make_tape(direction_only=direction_only)
+    result = utils.aggregate_transactions(tape)
+    expected = legacy.aggregate_transactions(tape)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_aggregate_transactions_direction_only_uses_direction():
+    tape = make_tape(direction_only=True)
+    agg = utils.aggregate_transactions(tape)
+    assert agg["buy_volume"].sum() > 0 and agg["sell_volume"].sum() > 0
+
+
+def test_side_masks_all_nan_side():
+    tape = pd.DataFrame({"Side": [np.nan, np.nan, np.nan]})
+    buy, sell = utils._side_masks(tape)
+    assert not buy.any() and not sell.any()
+    assert buy.shape == sell.shape == (3,)
+
+
+@pytest.mark.parametrize("direction_only", [False, True])
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "cp1256", "utf-16"])
+def test_streamed_aggregation_matches_full_load(tmp_path, encoding, direction_only):
+    tape = make_tape(direction_only=direction_only)
+    tape["Symbol"] = tape["Symbol"].str.replace("S", "سهم")
+    path = tmp_path / "14-1-2026.csv"
+    tape.to_csv(path, index=False, encoding=encoding)
+
+    streamed = utils.aggregate_transactions_file(path, chunksize=333)
+    full = utils.aggregate_transactions(utils.load_transactions(path))
+    pd.testing.assert_frame_equal(streamed, full)
+
+
+def test_streamed_aggregation_surfaces_data_errors(tmp_path, monkeypatch):
+    path = tmp_path / "tape.csv"
+    make_tape(200).to_csv(path, index=False)
+
+    calls = []
+
+    def broken(acc, chunk):
+        calls.append(1)
+        raise IndexError("bad chunk")
+
+    monkeypatch.setattr(utils, "update_tape_accumulator", broken)
+    with pytest.raises(IndexError, match="bad chunk"):
+        utils.aggregate_transactions_file(path)
+    assert len(calls) == 1
+
+
+def test_tape_tail_matches_full_aggregation(tmp_path):
+    tape = make_tape(3000)
+    path = tmp_path / "tape.csv"
+    tape.iloc[:1000].to_csv(path, index=False)
+
+    tail = utils.open_tape_tail(path)
+    utils.tail_transactions(tail)
+    # إضافة باقى الشريط على دفعتين (آخر سطر بدون newline يُقرأ فى المرة التالية)
+    rest = tape.iloc[1000:].to_csv(index=False, header=False)
+    cut = rest.index("\n", len(rest) // 2) + 5
+    for part in (rest[:cut], rest[cut:]):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(part)
+        utils.tail_transactions(tail)
+
+    expected = utils.aggregate_transactions(utils.load_transactions(path))
+    pd.testing.assert_frame_equal(utils.tape_accumulator_frame(tail["acc"]), expected)
+
+
+@pytest.mark.parametrize("direction_only", [False, True])
+def test_tick_analytics_totals_match_aggregation(direction_only):
+    tape = make_tape(direction_only=direction_only)
+    agg = utils.aggregate_transactions(tape)
+    ticks = utils.build_tick_analytics(tape)
+
+    assert list(ticks["symbols"]) == list(agg["Symbol"])
+    np.testing.assert_allclose(ticks["total_volume"], agg["total_volume"])
+    np.testing.assert_allclose(ticks["delta"], agg["buy_volume"] - agg["sell_volume"])
+
+
+def _assert_ticks_equal(got, expected):
+    assert set(got) == set(expected)
+    for k in expected:
+        np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+
+
+@pytest.mark.parametrize("direction_only", [False, True])
+def test_tick_analytics_from_tail_match_full_load(tmp_path, direction_only):
+    tape = make_tape(3000, direction_only=direction_only)
+    tape["Sequence ID"] = np.arange(len(tape))
+    path = tmp_path / "tape.csv"
+    tape.iloc[:1200].to_csv(path, index=False)
+
+    tail = utils.open_tape_tail(path)
+    utils.tail_transactions(tail)
+    append_tape(path, tape.iloc[1200:])
+    utils.tail_transactions(tail)
+
+    expected = utils.build_tick_analytics(utils.load_transactions(path))
+    _assert_ticks_equal(utils.tape_tick_analytics(tail["acc"]), expected)
@@ -0,0 +1,91 @@
+"""
+تدريب نموذج التوصيات (models/model_stock_reco.pkl) من تاريخ CASE.
+الملف يُبنى محلياً بهذا السكريبت ولا يُضاف للـ repo. التدريب على أيام أرشيف
+الإشارات التى لها ملف معاملات فقط (buy_ratio حقيقى)، فلازم transaction/ فيه
+ملفات الأيام السابقة وإلا يتوقف برسالة بعدد الصفوف المتاحة.
+
+الاستخدام:
+    python train.py                  # تحديث مخزن الخصائص (الأيام الجديدة فقط) + تدريب
+    python train.py --force-features # إعادة حساب كل الخصائص
+"""
+import argparse
+import os
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+
+import classifier
+import features
+import utils
+
+# أقل عدد صفوف (سهم × يوم فيه شريط معاملات) لتدريب النموذج
+MODEL_MIN_TRAIN_ROWS = 1000
+
+
+def train_model(horizon: int = 1, valid_fraction: float = 0.2, alpha: float = 1.0,
+                path: Path = None) -> dict:
+    """
+    تدريب classifier.LogisticClassifier على مخزن الخصائص وحفظه (pickle) فى
+    models/model_stock_reco.pkl. التقييم على أحدث valid_fraction من الصفوف (تقسيم
+    زمنى)، ثم النموذج المحفوظ يُدرب على كل الصفوف. يرجع مقاييس التقييم.
+    الصفوف فقط من الأيام التى لها شريط معاملات، ولو أقل من MODEL_MIN_TRAIN_ROWS
+    لا يُحفظ نموذج (ValueError).
+    """
+    path = Path(path or utils.MODEL_PATH)
+    data = features.training_set(horizon)
+    if len(data["y"]) < MODEL_MIN_TRAIN_ROWS:
+        raise ValueError(
+            f"only {len(data['y'])} training rows with tape data (buy_ratio), need "
+            f"{MODEL_MIN_TRAIN_ROWS}: build the signals archive for days that have "
+            f"transaction files first"
+        )
+
+    # أحدث valid_fraction من الصفوف (الأسهم ليست كلها متاحة من أول التاريخ)
+    ordered = np.sort(data["dates"])
+    cutoff = ordered[min(int(len(ordered) * (1 - valid_fraction)), len(ordered) - 1)]
+    train = data["dates"] < cutoff
+    valid = ~train
+
+    t0 = time.perf_counter()
+    metrics = {"rows": int(len(data["y"])), "train_rows": int(train.sum()),
+               "valid_rows": int(valid.sum()), "valid_from": str(cutoff),
+               "base_rate": float(data["y"][valid].mean()) if valid.any() else np.nan}
+    if train.any() and valid.any():
+        model = classifier.LogisticClassifier(alpha=alpha)
+        model.fit(data["X"][train], data["y"][train], feature_names=features.FEATURE_COLUMNS)
+        prob = model.predict_proba(data["X"][valid])[:, 1]
+        metrics["valid_accuracy"] = model.score(data["X"][valid], data["y"][valid])
+        metrics["valid_auc"] = classifier.roc_auc(data["y"][valid], prob)
+
+    model = classifier.LogisticClassifier(alpha=alpha)
+    model.fit(data["X"], data["y"], feature_names=features.FEATURE_COLUMNS)
+    metrics["train_seconds"] = time.perf_counter() - t0
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(model, f)
+    os.replace(tmp, path)
+    print(f"Model saved: {path.name} ({metrics['rows']:,} rows).")
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EGX AI recommendation model training")
+    parser.add_argument("--horizon", type=int, default=1, help="عدد الجلسات للعائد المستهدف")
+    parser.add_argument("--alpha", type=float, default=1.0, help="قوة L2")
+    parser.add_argument("--valid-fraction", type=float, default=0.2, help="نسبة آخر الأيام للتقييم")
+    parser.add_argument("--force-features", action="store_true")
+    args = parser.parse_args()
+
+    if args.force_features:
+        features.build_feature_store(force=True)
+    try:
+        metrics = train_model(horizon=args.horizon, valid_fraction=args.valid_fraction,
+                              alpha=args.alpha)
+    except ValueError as e:
+        raise SystemExit(f"⚠️ {e}")
+    for k, v in metrics.items():
+        print(f"  {k:<16} {v}")
@@ -1,7 +1,19 @@
+import io
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
 from pathlib import Path
 import pandas as pd
 import numpy as np
 
+import correlation
+import orderflow
+import pivots
+import symbol_index
+import technicals
+
 # =========================
 # مسارات رئيسية
 # =========================
@@ -11,6 +23,33 @@ INTRADAY_DIR = BASE_DIR / "intraday"
 TRANSACTION_DIR = BASE_DIR / "transaction"
 MODELS_DIR = BASE_DIR / "models"
 DATA_DIR = BASE_DIR / "data"
+CACHE_DIR = BASE_DIR / "cache"
+CASE_STORE_DIR = CACHE_DIR / "case_store"
+MODEL_PATH = MODELS_DIR / "model_stock_reco.pkl"
+SYMBOLS_MASTER_PATH = DATA_DIR / "symbols_master.xlsx"
+ROLLING_STATE_PATH = CACHE_DIR / "rolling_state.npz"
+INTRADAY_CACHE_DIR = CACHE_DIR / "intraday"
+CORR_DIR = CACHE_DIR / "correlation"
+
+# نوافذ الارتباط المتاحة (None = كل التاريخ)
+CORR_WINDOWS = [None, 60, 120, 250]
+SCREENER_DIR = CACHE_DIR / "screener"
+TICKS_DIR = CACHE_DIR / "ticks"
+BARS_DIR = CACHE_DIR / "bars"
+SIGNALS_DIR = CACHE_DIR / "signals"
+SWEEP_DIR = CACHE_DIR / "sweep"
+FEATURE_STORE_DIR = CACHE_DIR / "features"
+BREAKOUTS_DIR = CACHE_DIR / "breakouts"
+ENCODING_CACHE_PATH = CACHE_DIR / "encodings.json"
+
+# ترتيب الترميزات المجربة عند فشل الكشف التلقائى
+CSV_ENCODINGS = ["utf-8-sig", "utf-16", "cp1256", "cp1252"]
+
+# الأعمدة الرقمية المحفوظة فى مخزن CASE العمودى (بنفس ترتيبها فى values.npy)
+CASE_NUMERIC_COLUMNS = ["Open", "High", "Low", "Closed", "Prev. Closed",
+                        "%Chg", "Chg.", "Turnover", "Volume"]
+# يتم رفعه عند تغيير طريقة تحويل CASE حتى يُعاد بناء المخزن بالكامل
+CASE_STORE_VERSION = 2
 
 # مؤشرات السوق العامة (لا نعرضها وسط الأسهم)
 INDEX_SYMBOLS = {
@@ -133,17 +172,254 @@ def normalize_case_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.loc[:, ~df.columns.duplicated()]
 
     if "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"], dayfirst=True, errors="coerce")
+        # ملفات CASE بصيغة 2026/01/13؛ التخمين التلقائى كان يقلب اليوم والشهر
+        # فى بعض الملفات، لذلك نجرب الصيغة الصريحة أولاً ثم dayfirst للباقى
+        raw = df["Date"]
+        dates = pd.to_datetime(raw, format="%Y/%m/%d", errors="coerce")
+        other = dates.isna() & raw.notna()
+        if other.any():
+            dates[other] = pd.to_datetime(raw[other], dayfirst=True, errors="coerce")
+        df["Date"] = dates
     return df
 
 
+# =========================
+# كشف الترميز مع كاش دائم
+# =========================
+# الكاش محفوظ فى cache/encodings.json بالشكل: {path: [size, mtime_ns, encoding]}
+# ENCODING_STATS يعد كم مرة تم اختيار كل ترميز (بالإضافة لعدد مرات الكاش/الكشف/التجربة
+# وعدد مرات كتابة الكاش على القرص cache_writes).
+# داخل encoding_cache_batch() الكتابة تتأجل لنهاية الدفعة بدل ملف JSON كامل لكل ملف.
+
+ENCODING_STATS = Counter()
+_ENCODING_CACHE = {}
+_ENCODING_BATCH = {"depth": 0, "dirty": False}
+
+
+def _file_signature(path: Path) -> list:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def sniff_encoding(path: Path, sample_size: int = 65536):
+    """
+    تخمين ترميز الملف من الـ BOM وعينة من البايتات بدون قراءة الملف كله.
+    يرجع اسم الترميز أو None لو العينة غير حاسمة.
+    """
+    with open(path, "rb") as f:
+        raw = f.read(sample_size)
+
+    if raw.startswith(b"\xef\xbb\xbf"):
+        return "utf-8-sig"
+    if raw.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+
+    # لو العينة مقطوعة نتجاهل آخر 3 بايت لأنها ممكن تقطع حرف UTF-8 فى النص
+    text = raw[:-3] if len(raw) == sample_size else raw
+    try:
+        text.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        pass
+
+    # حروف cp1256 العربية فى النطاق 0xC1-0xFE، ولو موجودة بكثرة فالملف عربى
+    high = np.frombuffer(raw, dtype=np.uint8)
+    high = high[high >= 0x80]
+    if high.size and np.mean(high >= 0xC1) > 0.5:
+        return "cp1256"
+    try:
+        raw.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return None
+
+
+def _load_encoding_cache() -> dict:
+    if not _ENCODING_CACHE and ENCODING_CACHE_PATH.exists():
+        try:
+            with open(ENCODING_CACHE_PATH, encoding="utf-8") as f:
+                _ENCODING_CACHE.update(json.load(f))
+        except Exception:
+            pass
+    return _ENCODING_CACHE
+
+
+def _save_encoding_cache():
+    if _ENCODING_BATCH["depth"] > 0:
+        _ENCODING_BATCH["dirty"] = True
+        return
+    _ENCODING_BATCH["dirty"] = False
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = ENCODING_CACHE_PATH.with_name(ENCODING_CACHE_PATH.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_ENCODING_CACHE, f)
+        os.replace(tmp, ENCODING_CACHE_PATH)
+        ENCODING_STATS["cache_writes"] += 1
+    except Exception as e:
+        print(f"⚠️ Could not save encoding cache: {e}")
+
+
+@contextmanager
+def encoding_cache_batch():
+    """تأجيل كتابة cache/encodings.json لنهاية الدفعة (مرة واحدة لو اتغير أى مدخل)."""
+    _ENCODING_BATCH["depth"] += 1
+    try:
+        yield
+    finally:
+        _ENCODING_BATCH["depth"] -= 1
+        if _ENCODING_BATCH["depth"] == 0 and _ENCODING_BATCH["dirty"]:
+            _save_encoding_cache()
+
+
+def read_csv_any_encoding(path: Path, persist: bool = True, **kwargs):
+    """
+    قراءة CSV بالترميز الصحيح:
+    1) من الكاش لو حجم الملف و mtime لم يتغيرا.
+    2) وإلا نكشف الترميز من العينة ونجربه أولاً ثم باقى CSV_ENCODINGS.
+    3) وأخيراً latin1 مع استبدال الحروف غير المفهومة.
+    persist=False لا يكتب الكاش على القرص (للعمليات الفرعية فى load_case_many).
+    يرجع (df, encoding).
+    """
+    path = Path(path)
+    cache = _load_encoding_cache()
+    key = str(path.resolve())
+    sig = _file_signature(path)
+
+    cached = cache.get(key)
+    if cached is not None and cached[:2] == sig:
+        try:
+            df = pd.read_csv(path, encoding=cached[2], **kwargs)
+            ENCODING_STATS[cached[2]] += 1
+            ENCODING_STATS["cache_hit"] += 1
+            return df, cached[2]
+        except Exception:
+            pass
+
+    ENCODING_STATS["cache_miss"] += 1
+    sniffed = sniff_encoding(path)
+    candidates = [sniffed] if sniffed else []
+    candidates += [enc for enc in CSV_ENCODINGS if enc != sniffed]
+
+    for enc in candidates:
+        try:
+            df = pd.read_csv(path, encoding=enc, **kwargs)
+        except Exception:
+            continue
+        ENCODING_STATS[enc] += 1
+        ENCODING_STATS["sniffed" if enc == sniffed else "trial"] += 1
+        cache[key] = sig + [enc]
+        if persist:
+            _save_encoding_cache()
+        return df, enc
+
+    df = pd.read_csv(path, encoding="latin1", encoding_errors="replace", **kwargs)
+    ENCODING_STATS["latin1"] += 1
+    return df, "latin1"
+
+
+def encoding_stats() -> dict:
+    """عدد مرات اختيار كل ترميز + cache_hit / cache_miss / sniffed / trial / cache_writes."""
+    return dict(ENCODING_STATS)
+
+
 # =========================
 # تحميل البيانات الأساسية
 # =========================
+# كل قراءة فعلية لملف مصدر تُسجل فى LOAD_COUNTS بالمفتاح (النوع، اسم الملف):
+#   intraday          : ملف XLSX (source = xlsx أو snapshot)
+#   transactions      : شريط المعاملات كله (source = csv أو stream أو tail)
+#   transactions_tail : الأسطر الجديدة فقط من الشريط المتابَع
+# و add_load_hook(fn) يستدعى fn(kind, path, source) مع كل قراءة (للقياس أو الاختبار).
+
+LOAD_COUNTS = Counter()
+_LOAD_HOOKS = []
+
+
+def add_load_hook(fn):
+    _LOAD_HOOKS.append(fn)
+    return fn
+
+
+def remove_load_hook(fn):
+    if fn in _LOAD_HOOKS:
+        _LOAD_HOOKS.remove(fn)
+
+
+def _record_load(kind: str, path: Path, source: str):
+    LOAD_COUNTS[(kind, Path(path).name)] += 1
+    for fn in list(_LOAD_HOOKS):
+        fn(kind, Path(path), source)
+
+
+def load_counts() -> pd.DataFrame:
+    """عدد مرات قراءة كل ملف مصدر منذ آخر reset_load_counts."""
+    rows = [{"kind": k, "file": name, "loads": n} for (k, name), n in sorted(LOAD_COUNTS.items())]
+    return pd.DataFrame(rows, columns=["kind", "file", "loads"])
+
+
+def reset_load_counts():
+    LOAD_COUNTS.clear()
+
+
+def read_xlsx_streaming(path: Path) -> pd.DataFrame:
+    """
+    قراءة أول شيت فى ملف XLSX بوضع openpyxl read-only (صف بصف) بدون طبقة
+    pd.read_excel. الناتج مطابق لـ pd.read_excel(path, engine="openpyxl").
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, None) or [])
+        data = [r for r in rows if any(v is not None for v in r)]
+    finally:
+        wb.close()
+
+    # الأعمدة الفارغة فى آخر الشيت (بدون عنوان أو قيم) لا تظهر فى read_excel
+    width = max(
+        [i + 1 for i, h in enumerate(header) if h is not None]
+        + [i + 1 for r in data for i, v in enumerate(r) if v is not None],
+        default=0,
+    )
+    header = [h if h is not None else f"Unnamed: {i}" for i, h in enumerate(header[:width])]
+    header += [f"Unnamed: {i}" for i in range(len(header), width)]
+    return pd.DataFrame([tuple(r[:width]) + (None,) * (width - len(r)) for r in data],
+                        columns=header)
+
+
+# يتم رفعه عند تغيير التطبيع / التحويل / حساب Pivot حتى لا تُقرأ لقطة من كود أقدم
+INTRADAY_SNAPSHOT_VERSION = 1
+
+
+def _intraday_snapshot_path(path: Path) -> Path:
+    return INTRADAY_CACHE_DIR / f"{Path(path).stem}.pkl"
+
 
 def load_intraday(path: Path) -> pd.DataFrame:
-    """قراءة ملف intraday (XLSX) مع تحديد openpyxl كـ engine."""
-    df = pd.read_excel(path, engine="openpyxl")
+    """
+    قراءة ملف intraday (XLSX).
+    أول مرة: قراءة streaming بـ openpyxl ثم التطبيع والتحويل لأرقام و Pivot،
+    ويُحفظ الناتج النهائى كلقطة typed فى cache/intraday/<اسم الملف>.pkl.
+    المرات التالية: قراءة اللقطة مباشرة طالما حجم و mtime ملف الـ XLSX لم يتغيرا
+    ونسخة اللقطة = INTRADAY_SNAPSHOT_VERSION.
+    """
+    path = Path(path)
+    sig = _file_signature(path)
+    snap_path = _intraday_snapshot_path(path)
+    if snap_path.exists():
+        try:
+            df = pd.read_pickle(snap_path)
+            if (df.attrs.get("source_signature") == sig
+                    and df.attrs.get("snapshot_version") == INTRADAY_SNAPSHOT_VERSION):
+                _record_load("intraday", path, "snapshot")
+                return df
+        except Exception as e:
+            print(f"⚠️ Could not read intraday snapshot {snap_path.name}: {e}")
+
+    df = read_xlsx_streaming(path)
+    _record_load("intraday", path, "xlsx")
     df = normalize_intraday_columns(df)
 
     core = ["Symbol", "S. Description", "Last", "% Change", "Open", "High", "Low", "Volume"]
@@ -157,30 +433,31 @@ def load_intraday(path: Path) -> pd.DataFrame:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    # حساب مستويات Pivot لو ناقصة / فيها NaN
-    df = add_pivot_levels(df)
+    # حساب مستويات Pivot لو ناقصة / فيها NaN (الإطار جديد فنكتب فيه مباشرة)
+    df = add_pivot_levels(df, inplace=True)
+
+    df.attrs["source_signature"] = sig
+    df.attrs["snapshot_version"] = INTRADAY_SNAPSHOT_VERSION
+    try:
+        INTRADAY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = snap_path.with_name(snap_path.name + ".tmp")
+        df.to_pickle(tmp)
+        os.replace(tmp, snap_path)
+    except Exception as e:
+        print(f"⚠️ Could not save intraday snapshot: {e}")
 
     return df
 
 
 def load_transactions(path: Path) -> pd.DataFrame:
-    """قراءة ملف معاملات الجلسة مع تجربة أكثر من ترميز."""
-    encodings_to_try = ["utf-8-sig", "utf-16", "cp1256", "cp1252"]
-
-    df = None
-    for enc in encodings_to_try:
-        try:
-            df = pd.read_csv(path, encoding=enc)
-            df = normalize_transactions_columns(df)
-            print(f"Loaded transactions using encoding: {enc}")
-            break
-        except Exception:
-            df = None
-
-    if df is None:
-        df = pd.read_csv(path, encoding="latin1", errors="replace")
-        df = normalize_transactions_columns(df)
+    """قراءة ملف معاملات الجلسة مع كشف الترميز (وكاش للترميز المكتشف)."""
+    df, enc = read_csv_any_encoding(path)
+    _record_load("transactions", path, "csv")
+    df = normalize_transactions_columns(df)
+    if enc == "latin1":
         print("⚠️ Loaded transactions with fallback encoding (latin1 with replacement).")
+    else:
+        print(f"Loaded transactions using encoding: {enc}")
 
     # تحويل أرقام
     for c in ["Price", "% Change", "Volume", "Turnover"]:
@@ -190,25 +467,18 @@ def load_transactions(path: Path) -> pd.DataFrame:
     return df
 
 
-def load_case(symbol: str) -> pd.DataFrame:
-    """قراءة ملف CASE التاريخى لسهم معين مع دعم ترميزات عربية."""
-    path = CASE_DIR / f"{symbol}.csv"
+def _read_case_csv(path: Path, symbol: str, nrows: int = None) -> pd.DataFrame:
+    """قراءة ملف CASE من الـ CSV مباشرة مع كشف الترميز العربى (nrows = أول صفوف فقط)."""
+    df, enc = read_csv_any_encoding(path, nrows=nrows)
+    if enc == "latin1":
+        print(f"⚠️ Loaded CASE for {symbol} with fallback encoding (latin1 with replacement).")
+    else:
+        print(f"Loaded CASE for {symbol} using encoding: {enc}")
+    return _prepare_case_frame(df)
 
-    encodings_to_try = ["utf-8-sig", "utf-16", "cp1256", "cp1252"]
-    df = None
-    for enc in encodings_to_try:
-        try:
-            df = pd.read_csv(path, encoding=enc)
-            df = normalize_case_columns(df)
-            print(f"Loaded CASE for {symbol} using encoding: {enc}")
-            break
-        except Exception:
-            df = None
 
-    if df is None:
-        df = pd.read_csv(path, encoding="latin1", errors="replace")
-        df = normalize_case_columns(df)
-        print(f"⚠️ Loaded CASE for {symbol} with fallback encoding (latin1 with replacement).")
+def _prepare_case_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = normalize_case_columns(df)
 
     # تأكد من أن الإغلاق أرقام
     for c in ["Open", "High", "Low", "Closed", "Prev. Closed", "Turnover", "Volume"]:
@@ -218,65 +488,889 @@ def load_case(symbol: str) -> pd.DataFrame:
     return df
 
 
+def load_case(symbol: str) -> pd.DataFrame:
+    """
+    قراءة بيانات CASE التاريخية لسهم معين.
+    القراءة تتم من المخزن العمودى (cache/case_store) فى أجزاء من الثانية،
+    ولو الملف الأصلى اتغير أو المخزن غير متاح نرجع لقراءة الـ CSV (بدون إعادة
+    بناء المخزن: ده دور build_case_store / close_session وليس الصفحات).
+    فى الحالتين نفس الأعمدة: Date + CASE_NUMERIC_COLUMNS، مرتبة تصاعدياً حسب التاريخ.
+    """
+    path = CASE_DIR / f"{symbol}.csv"
+    if not path.exists():
+        raise FileNotFoundError(f"CASE file not found: {path}")
+
+    try:
+        store = _case_store_for(symbol, path)
+        if store is not None:
+            start, stop = store["symbols"][symbol][:2]
+            return _case_frame(store["dates"][start:stop], store["values"][:, start:stop])
+    except Exception as e:
+        print(f"⚠️ CASE store unavailable for {symbol}, reading CSV instead: {e}")
+
+    return _case_frame(*_case_frame_to_arrays(_read_case_csv(path, symbol)))
+
+
+# =========================
+# مخزن CASE العمودى (NumPy memory-mapped)
+# =========================
+# الملفات داخل cache/case_store:
+#   dates.npy  : datetime64[D] لكل الصفوف (كل سهم فى شريحة متصلة مرتبة تصاعدياً)
+#   values.npy : مصفوفة (عدد الأعمدة × عدد الصفوف) float64 — كل عمود متصل فى الذاكرة
+#   index.json : لكل سهم [start, stop, size, mtime_ns] لملف الـ CSV الأصلى
+
+_CASE_STORE_CACHE = {}
+
+
+def _case_frame_to_arrays(df: pd.DataFrame, sort: bool = True):
+    """تحويل إطار CASE إلى (dates, values) مرتبة تصاعدياً حسب التاريخ."""
+    if "Date" in df.columns:
+        if sort:
+            df = df.sort_values("Date", kind="stable")
+        dates = df["Date"].to_numpy(dtype="datetime64[D]")
+    else:
+        dates = np.full(len(df), np.datetime64("NaT"), dtype="datetime64[D]")
+
+    values = np.full((len(CASE_NUMERIC_COLUMNS), len(df)), np.nan)
+    for j, c in enumerate(CASE_NUMERIC_COLUMNS):
+        if c in df.columns:
+            values[j] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)
+    return dates, values
+
+
+def _open_case_store():
+    """فتح المخزن (memory-mapped) مع إعادة فتحه فقط لو index.json اتغير."""
+    index_path = CASE_STORE_DIR / "index.json"
+    if not index_path.exists():
+        return None
+
+    sig = _file_signature(index_path)
+    cached = _CASE_STORE_CACHE.get("store")
+    if cached is not None and cached["signature"] == sig:
+        return cached
+
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    store = {
+        "signature": sig,
+        "version": index.get("version"),
+        "columns": index["columns"],
+        "symbols": index["symbols"],
+        "dates": np.load(CASE_STORE_DIR / "dates.npy", mmap_mode="r"),
+        "values": np.load(CASE_STORE_DIR / "values.npy", mmap_mode="r"),
+    }
+    _CASE_STORE_CACHE["store"] = store
+    return store
+
+
+def _save_npy(path: Path, arr: np.ndarray):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def _write_case_store(symbols: dict, dates: np.ndarray, values: np.ndarray):
+    """كتابة المخزن بالكامل؛ index.json يُكتب آخراً حتى لا يُقرأ مخزن ناقص."""
+    CASE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    _CASE_STORE_CACHE.clear()  # تحرير الـ memmap القديم قبل الاستبدال
+
+    _save_npy(CASE_STORE_DIR / "dates.npy", dates)
+    _save_npy(CASE_STORE_DIR / "values.npy", values)
+
+    index_path = CASE_STORE_DIR / "index.json"
+    tmp = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": CASE_STORE_VERSION, "columns": CASE_NUMERIC_COLUMNS,
+                   "symbols": symbols}, f)
+    os.replace(tmp, index_path)
+
+
+def build_case_store(force: bool = False, workers: int = None) -> dict:
+    """
+    تحويل مجلد CASE بالكامل إلى مخزن عمودى واحد.
+    - الملفات التى لم يتغير حجمها/mtime تُنسخ من المخزن القديم بدون إعادة قراءة.
+    - الملفات المعدلة التى أضيف لها أيام جديدة فى أولها نقرأ منها الصفوف الجديدة فقط.
+    - الملفات الجديدة أو التى تغير تاريخها القديم يُعاد قراءتها بالكامل.
+    - force=True يعيد قراءة كل الملفات.
+    - workers: عدد العمليات للقراءة الكاملة (افتراضياً حسب عدد الأنوية).
+    يرجع المخزن بعد فتحه.
+    """
+    old = None if force else _open_case_store()
+    if old is not None and (old["columns"] != CASE_NUMERIC_COLUMNS
+                            or old["version"] != CASE_STORE_VERSION):
+        old = None
+
+    sources = {p.stem: p for p in CASE_DIR.glob("*.csv")}
+    # قراءة رءوس الملفات + القراءة الكاملة تكتب كاش الترميز مرة واحدة فى الآخر
+    with encoding_cache_batch():
+        arrays, to_parse = {}, []
+        parsed = reused = appended = 0
+
+        for sym in sorted(sources):
+            path = sources[sym]
+            entry = old["symbols"].get(sym) if old is not None else None
+            if entry is not None and entry[2:] == _file_signature(path):
+                arrays[sym] = (np.array(old["dates"][entry[0]:entry[1]]),
+                               np.array(old["values"][:, entry[0]:entry[1]]))
+                reused += 1
+                continue
+
+            head = _case_head_append(old, entry, path, sym) if entry is not None else None
+            if head is not None:
+                arrays[sym] = head
+                appended += 1
+            else:
+                to_parse.append(sym)
+
+        # الملفات التى تحتاج قراءة كاملة تُقرأ بالتوازى
+        errors = {}
+        for sym, df in load_case_many(to_parse, workers=workers, errors=errors).items():
+            arrays[sym] = _case_frame_to_arrays(df)
+            parsed += 1
+    for sym, err in errors.items():
+        print(f"⚠️ Skipping CASE file {sym}.csv: {err}")
+
+    dates_parts, values_parts, symbols = [], [], {}
+    start = 0
+    for sym in sorted(arrays):
+        d, v = arrays[sym]
+        dates_parts.append(d)
+        values_parts.append(v)
+        symbols[sym] = [start, start + len(d)] + _file_signature(sources[sym])
+        start += len(d)
+
+    if dates_parts:
+        dates = np.concatenate(dates_parts)
+        values = np.concatenate(values_parts, axis=1)
+    else:
+        dates = np.array([], dtype="datetime64[D]")
+        values = np.empty((len(CASE_NUMERIC_COLUMNS), 0))
+
+    _write_case_store(symbols, dates, values)
+    print(f"CASE store built: {len(symbols)} symbols, {start} rows "
+          f"({parsed} parsed, {appended} appended, {reused} reused).")
+    return _open_case_store()
+
+
+def _case_head_append(old: dict, entry: list, path: Path, symbol: str):
+    """
+    ملفات CASE مرتبة من الأحدث للأقدم، فلو الملف كبر نقرأ أوله فقط حتى نصل
+    لآخر تاريخ موجود فى المخزن. لو صف التداخل مطابق نضيف الأيام الجديدة فقط،
+    وإلا (تعديل تاريخى / تجزئة) نرجع None لإعادة القراءة بالكامل.
+    """
+    start, stop = entry[:2]
+    if stop <= start or path.stat().st_size < entry[2]:
+        return None
+    last_date = old["dates"][stop - 1]
+    last_close = old["values"][CASE_NUMERIC_COLUMNS.index("Closed"), stop - 1]
+    if np.isnat(last_date):
+        return None
+
+    nrows = 64
+    while True:
+        head = _read_case_csv(path, symbol, nrows=nrows)
+        if "Date" not in head.columns or "Closed" not in head.columns:
+            return None
+        head_dates = head["Date"].to_numpy(dtype="datetime64[D]")
+        if len(head) < nrows or (head_dates <= last_date).any():
+            break
+        nrows *= 4
+
+    overlap = head[head_dates == last_date]
+    if overlap.empty or not np.isclose(overlap["Closed"].iloc[0], last_close, equal_nan=True):
+        return None
+
+    d_new, v_new = _case_frame_to_arrays(head[head_dates > last_date])
+    d = np.concatenate([np.array(old["dates"][start:stop]), d_new])
+    v = np.concatenate([np.array(old["values"][:, start:stop]), v_new], axis=1)
+    return d, v
+
+
+def _case_store_for(symbol: str, path: Path):
+    """المخزن لو فيه السهم ومطابق لملف الـ CSV الحالى، وإلا None (القراءة من الـ CSV)."""
+    store = _open_case_store()
+    entry = store["symbols"].get(symbol) if store is not None else None
+    if (entry is None or entry[2:] != _file_signature(path)
+            or store["version"] != CASE_STORE_VERSION):
+        return None
+    return store
+
+
+def ensure_case_store() -> dict:
+    """فتح المخزن بعد التأكد أن كل ملفات CASE (إضافة/حذف/تعديل) منعكسة فيه."""
+    store = _open_case_store()
+    if store is None or store["version"] != CASE_STORE_VERSION:
+        return build_case_store()
+
+    sources = {p.stem: p for p in CASE_DIR.glob("*.csv")}
+    if set(sources) != set(store["symbols"]):
+        return build_case_store()
+    for sym, path in sources.items():
+        if store["symbols"][sym][2:] != _file_signature(path):
+            return build_case_store()
+    return store
+
+
+def _case_frame(dates: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+    """إطار CASE (Date + CASE_NUMERIC_COLUMNS) من مصفوفات المخزن أو _case_frame_to_arrays."""
+    df = pd.DataFrame(np.array(values).T, columns=CASE_NUMERIC_COLUMNS)
+    df.insert(0, "Date", pd.to_datetime(np.array(dates)))
+    return df
+
+
+# =========================
+# قراءة CASE بالتوازى (Process Pool)
+# =========================
+
+def _parse_case_worker(args):
+    """تعمل داخل عملية فرعية: قراءة ملف واحد وإرجاع (symbol, df, encoding, error)."""
+    symbol, path = args
+    try:
+        df, enc = read_csv_any_encoding(Path(path), persist=False)
+        df = _prepare_case_frame(df)
+        if "Date" in df.columns:
+            df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+        return symbol, df, enc, None
+    except Exception as e:
+        return symbol, None, None, f"{type(e).__name__}: {e}"
+
+
+# أقل عدد ملفات لاستخدام ProcessPoolExecutor فى load_case_many
+CASE_PARALLEL_MIN_FILES = 16
+
+
+def load_case_many(symbols=None, workers: int = None, as_panel: bool = False,
+                   errors: dict = None):
+    """
+    قراءة ملفات CASE (من الـ CSV) لعدة أسهم بالتوازى عبر ProcessPoolExecutor،
+    لأن فك الترميز وتحليل الـ CSV عمل CPU ويمسك الـ GIL. على نواة واحدة أو أقل من
+    CASE_PARALLEL_MIN_FILES ملف القراءة متسلسلة (workers لا يتجاوز عدد الأنوية).
+    - نفس كشف الترميز والرجوع لـ latin1 المستخدم فى load_case.
+    - أى ملف يفشل لا يوقف الباقى: يُسجل فى errors (لو مُرر dict) أو يُطبع تحذير.
+    - as_panel=True يرجع panel مرتب بالتاريخ (نفس شكل load_case_panel) بدل dict.
+    ملحوظة: للقراءة المتكررة load_case / load_case_panel من المخزن أسرع بكثير.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if symbols is None:
+        symbols = sorted(p.stem for p in CASE_DIR.glob("*.csv"))
+    # أكثر من عدد الأنوية لا يفيد (على نواة واحدة الـ pool أبطأ من القراءة المتسلسلة)
+    cpus = os.cpu_count() or 1
+    workers = min(cpus, 8) if workers is None else min(workers, cpus)
+
+    tasks = []
+    for sym in symbols:
+        path = CASE_DIR / f"{sym}.csv"
+        if path.exists():
+            tasks.append((sym, str(path)))
+        elif errors is not None:
+            errors[sym] = f"FileNotFoundError: {path}"
+        else:
+            print(f"⚠️ CASE file not found for {sym}")
+
+    cache = _load_encoding_cache()
+    cache_before = dict(cache)
+    # بدء العمليات الفرعية له تكلفة ثابتة، فالملفات القليلة تُقرأ متسلسلة
+    parallel = workers > 1 and len(tasks) >= CASE_PARALLEL_MIN_FILES
+    if parallel:
+        chunk = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_parse_case_worker, tasks, chunksize=chunk))
+    else:
+        results = [_parse_case_worker(t) for t in tasks]
+
+    frames = {}
+    for (sym, path), (_, df, enc, err) in zip(tasks, results):
+        if err is not None:
+            if errors is not None:
+                errors[sym] = err
+            else:
+                print(f"⚠️ Failed to load CASE for {sym}: {err}")
+            continue
+        frames[sym] = df
+        if enc == "latin1":
+            print(f"⚠️ Loaded CASE for {sym} with fallback encoding (latin1 with replacement).")
+            continue
+
+        # الكاش والعدادات تُحدث فى العملية الرئيسية (العمليات الفرعية لا تكتب على القرص)
+        if parallel:
+            ENCODING_STATS[enc] += 1
+        key = str(Path(path).resolve())
+        cache[key] = _file_signature(Path(path)) + [enc]
+    if cache != cache_before:
+        _save_encoding_cache()
+
+    if not as_panel:
+        return frames
+
+    syms = sorted(frames)
+    parts = [_case_frame_to_arrays(frames[s]) for s in syms]
+    bounds = np.cumsum([0] + [len(d) for d, _ in parts])
+    tmp_store = {
+        "columns": CASE_NUMERIC_COLUMNS,
+        "symbols": {s: [int(bounds[i]), int(bounds[i + 1])] for i, s in enumerate(syms)},
+        "dates": np.concatenate([d for d, _ in parts]) if parts else np.array([], "datetime64[D]"),
+        "values": (np.concatenate([v for _, v in parts], axis=1) if parts
+                   else np.empty((len(CASE_NUMERIC_COLUMNS), 0))),
+    }
+    return _panel_from_store(tmp_store, syms, align="date")
+
+
+def load_case_panel(symbols=None, align: str = "date", lookback: int = None) -> dict:
+    """
+    تحميل أسعار CASE لكل الأسهم فى مصفوفات ثنائية الأبعاد (صفوف × أسهم).
+    align="date": الصفوف هى اتحاد التواريخ (مرتب تصاعدياً) والأيام الناقصة NaN.
+    align="last": كل عمود محاذى لآخر صف للسهم (آخر صف = آخر جلسة لكل سهم)،
+                  وهو المناسب لحساب المؤشرات على جلسات السهم نفسه.
+    lookback: أقصى عدد صفوف أخيرة لكل سهم (None = التاريخ كله).
+    يرجع dict: symbols, dates, open, high, low, close, volume, turnover.
+    """
+    return _panel_from_store(ensure_case_store(), symbols, align, lookback)
+
+
+def _panel_from_store(store: dict, symbols=None, align: str = "date",
+                      lookback: int = None) -> dict:
+    if symbols is None:
+        symbols = sorted(store["symbols"])
+    symbols = [s for s in symbols if s in store["symbols"]]
+
+    col_idx = {c: j for j, c in enumerate(store["columns"])}
+    fields = {"open": "Open", "high": "High", "low": "Low", "close": "Closed",
+              "volume": "Volume", "turnover": "Turnover"}
+
+    slices = []
+    for sym in symbols:
+        start, stop = store["symbols"][sym][:2]
+        if lookback is not None:
+            start = max(start, stop - lookback)
+        slices.append((start, stop))
+
+    n_cols = len(symbols)
+    if align == "last":
+        n_rows = max((b - a for a, b in slices), default=0)
+        dates = np.full((n_rows, n_cols), np.datetime64("NaT"), dtype="datetime64[D]")
+        out = {k: np.full((n_rows, n_cols), np.nan) for k in fields}
+        for j, (a, b) in enumerate(slices):
+            dates[n_rows - (b - a):, j] = store["dates"][a:b]
+            for k, c in fields.items():
+                out[k][n_rows - (b - a):, j] = store["values"][col_idx[c], a:b]
+    else:
+        rows = np.concatenate([np.arange(a, b) for a, b in slices]) if slices else np.array([], int)
+        cols = np.repeat(np.arange(n_cols), [b - a for a, b in slices])
+        row_dates = np.asarray(store["dates"])[rows]
+        keep = ~np.isnat(row_dates)
+        rows, cols, row_dates = rows[keep], cols[keep], row_dates[keep]
+
+        dates, date_pos = np.unique(row_dates, return_inverse=True)
+        values = np.asarray(store["values"])
+        out = {}
+        for k, c in fields.items():
+            arr = np.full((len(dates), n_cols), np.nan)
+            arr[date_pos, cols] = values[col_idx[c], rows]
+            out[k] = arr
+
+    out["symbols"] = symbols
+    out["dates"] = dates
+    out["align"] = align
+    return out
+
+
+# ATR14 محتاج إغلاق اليوم السابق لأول صف فى النافذة، و Bollinger نافذة 20
+TECH_PANEL_LOOKBACK = max(technicals.ATR_WINDOW + 1, technicals.BB_WINDOW)
+
+
+def market_technicals(symbols=None) -> pd.DataFrame:
+    """
+    جدول المؤشرات الفنية (MA20/MA50/Vol20/RSI14/ATR14/Bollinger) لكل الأسهم
+    فى خطوة واحدة متجهة — صف واحد لكل سهم يمثل آخر جلسة.
+    MA20/MA50/Vol20/RSI14 من الحالة المتدحرجة (مجاميع النوافذ بدون إعادة حساب)،
+    و ATR14/Bollinger من آخر TECH_PANEL_LOOKBACK صف فقط لكل سهم.
+    """
+    panel = load_case_panel(symbols, align="last", lookback=TECH_PANEL_LOOKBACK)
+    close = panel["close"]
+    mid, upper, lower = technicals.bollinger(close)
+    table = technicals.last_row_table(panel, {
+        "Close": close,
+        "ATR14": technicals.atr(panel["high"], panel["low"], close),
+        "BB_Mid": mid, "BB_Upper": upper, "BB_Lower": lower,
+    })
+
+    rolling = rolling_technicals().drop(columns=["Close"])
+    table = table.merge(rolling, on="Symbol", how="left")
+    return table[["Symbol", "Date", "Close", "MA20", "MA50", "RSI14", "Vol20",
+                  "ATR14", "BB_Mid", "BB_Upper", "BB_Lower"]]
+
+
+# =========================
+# إضافة يوم جديد للمخزن (Incremental) + حالة المؤشرات المتدحرجة
+# =========================
+
+def case_rows_from_intraday(df_intraday: pd.DataFrame, trading_date) -> pd.DataFrame:
+    """تحويل ملف الجلسة إلى صفوف CASE (صف لكل سهم بتاريخ الجلسة)."""
+    df = df_intraday.copy()
+    df["Symbol"] = df["Symbol"].astype(str)
+
+    def _num(col):
+        if col in df.columns:
+            return pd.to_numeric(df[col], errors="coerce")
+        return pd.Series(np.nan, index=df.index)
+
+    close = _num("Close").fillna(_num("Last"))
+    prev = _num("Prev. Closed")
+    return pd.DataFrame({
+        "Symbol": df["Symbol"],
+        "Date": pd.Timestamp(trading_date).normalize(),
+        "Open": _num("Open"),
+        "High": _num("High"),
+        "Low": _num("Low"),
+        "Closed": close,
+        "Prev. Closed": prev,
+        "%Chg": _num("% Change"),
+        "Chg.": close - prev,
+        "Turnover": _num("Turnover"),
+        "Volume": _num("Volume"),
+    })
+
+
+def append_case_rows(rows: pd.DataFrame, replace: bool = False) -> int:
+    """
+    إضافة صفوف جديدة (Symbol, Date, أعمدة CASE) للمخزن بدون إعادة قراءة أى CSV.
+    يُضاف فقط ما تاريخه أحدث من آخر تاريخ مخزن لكل سهم، ثم تُحدّث حالة
+    المؤشرات المتدحرجة للأسهم التى أضيف لها صفوف فقط.
+    replace=True: الصف بنفس تاريخ آخر صف مخزن للسهم يستبدله (ملف نهائى لجلسة
+    سبق إضافتها)، وحالة المؤشرات المتدحرجة تُعاد من المخزن عند أول قراءة.
+    يرجع عدد الصفوف المضافة + المستبدلة.
+    """
+    store = ensure_case_store()
+    state = load_rolling_state(store)
+
+    rows = rows[rows["Symbol"].isin(store["symbols"])].copy()
+    rows["Date"] = pd.to_datetime(rows["Date"]).dt.normalize()
+    rows = rows.dropna(subset=["Date"]).sort_values(["Symbol", "Date"])
+    rows = rows.drop_duplicates(["Symbol", "Date"], keep="last")
+
+    last_dates = {}
+    for sym in rows["Symbol"].unique():
+        start, stop = store["symbols"][sym][:2]
+        last_dates[sym] = store["dates"][stop - 1] if stop > start else np.datetime64("NaT")
+    last = rows["Symbol"].map(last_dates).to_numpy(dtype="datetime64[D]")
+    row_dates = rows["Date"].to_numpy(dtype="datetime64[D]")
+    same = (row_dates == last) if replace else np.zeros(len(rows), dtype=bool)
+    replaced = rows[same]
+    rows = rows[np.isnat(last) | (row_dates > last)]
+    if rows.empty and replaced.empty:
+        return 0
+
+    if not replaced.empty:
+        _, new_values = _case_frame_to_arrays(replaced, sort=False)
+        values = np.array(store["values"])
+        positions = [store["symbols"][s][1] - 1 for s in replaced["Symbol"]]
+        values[:, positions] = new_values
+        _write_case_store(store["symbols"], np.array(store["dates"]), values)
+        store = ensure_case_store()
+        # الحالة المتدحرجة فيها الصف القديم: تُبنى من جديد (توقيع المخزن اتغير)
+        state = None
+        print(f"CASE store: replaced {len(replaced)} rows for {replaced['Date'].nunique()} day(s).")
+        if rows.empty:
+            return len(replaced)
+
+    # rows مرتبة بالسهم ثم التاريخ، فالإدراج عند نهاية شريحة كل سهم يحافظ على الترتيب
+    new_dates, new_values = _case_frame_to_arrays(rows, sort=False)
+    sym_order = rows["Symbol"].to_numpy()
+    positions = np.array([store["symbols"][s][1] for s in sym_order])
+
+    dates = np.insert(np.asarray(store["dates"]), positions, new_dates)
+    values = np.insert(np.asarray(store["values"]), positions, new_values, axis=1)
+
+    added = pd.Series(sym_order).value_counts().to_dict()
+    symbols, shift = {}, 0
+    for sym, entry in sorted(store["symbols"].items(), key=lambda kv: kv[1][0]):
+        n_new = added.get(sym, 0)
+        symbols[sym] = [entry[0] + shift, entry[1] + shift + n_new] + entry[2:]
+        shift += n_new
+
+    _write_case_store(symbols, dates, values)
+
+    # تحديث O(1) لكل سهم: صف بعد صف بالترتيب الزمنى
+    if state is not None:
+        sym_pos = {s: j for j, s in enumerate(state["symbols"])}
+        col_close = CASE_NUMERIC_COLUMNS.index("Closed")
+        col_vol = CASE_NUMERIC_COLUMNS.index("Volume")
+        for _, day in rows.groupby("Date", sort=True):
+            close = np.full(len(sym_pos), np.nan)
+            volume = np.full(len(sym_pos), np.nan)
+            mask = np.zeros(len(sym_pos), dtype=bool)
+            idx = day["Symbol"].map(sym_pos).to_numpy()
+            close[idx] = day["Closed"].to_numpy(dtype=float)
+            volume[idx] = day["Volume"].to_numpy(dtype=float)
+            mask[idx] = True
+            technicals.update_rolling_state(state, close, volume, mask)
+        _save_rolling_state(state)
+
+    print(f"CASE store: appended {len(rows)} rows for {len(added)} symbols.")
+    return len(rows) + len(replaced)
+
+
+def refresh_case_from_intraday(intraday_path: Path, df_intraday: pd.DataFrame = None) -> int:
+    """
+    تحديث نهاية اليوم: إضافة صفوف ملف الجلسة لتاريخها إلى مخزن CASE.
+    لو اليوم مضاف من قبل (ملف أقدم لنفس الجلسة) صفوفه تُستبدل بالملف الحالى.
+    """
+    if df_intraday is None:
+        df_intraday = load_intraday(intraday_path)
+    close = pd.to_numeric(df_intraday.get("Close", pd.Series(np.nan, index=df_intraday.index)),
+                          errors="coerce")
+    if close.isna().any():
+        print(f"⚠️ {int(close.isna().sum())} symbols have no Close in "
+              f"{Path(intraday_path).name}; using Last.")
+    rows = case_rows_from_intraday(df_intraday, intraday_trading_date(intraday_path))
+    return append_case_rows(rows, replace=True)
+
+
+def close_session(intraday_path: Path = None) -> int:
+    """
+    خطوة نهاية اليوم الصريحة (close_session.py): ملف الجلسة النهائى يُضاف لمخزن CASE
+    ثم يُعاد بناء مخزن الخصائص وإشارات اليوم فى الأرشيف على الإغلاق النهائى.
+    القراءة (الصفحات / daily_*) لا تكتب فى المخزن أبداً، لأن ملف الجلسة أثناء
+    التداول ليس إغلاقاً نهائياً. يرجع عدد الصفوف المضافة.
+    """
+    import features
+
+    if intraday_path is None:
+        intraday_path = latest_daily_paths()[0]
+    if intraday_path is None:
+        raise FileNotFoundError(f"no intraday file in {INTRADAY_DIR}")
+
+    added = refresh_case_from_intraday(intraday_path)
+    features.build_feature_store()
+    day = f"{intraday_trading_date(intraday_path):%Y-%m-%d}"
+    (SIGNALS_DIR / f"{day}.pkl").unlink(missing_ok=True)
+    build_signals_archive(include_open=True)
+    return added
+
+
+def _save_rolling_state(state: dict):
+    store_index = CASE_STORE_DIR / "index.json"
+    arrays = {k: v for k, v in state.items() if isinstance(v, np.ndarray)}
+    arrays["symbols"] = np.array(state["symbols"])
+    arrays["store_signature"] = np.array(_file_signature(store_index))
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = ROLLING_STATE_PATH.with_name("rolling_state.tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, ROLLING_STATE_PATH)
+
+
+def load_rolling_state(store: dict = None) -> dict:
+    """
+    حالة المؤشرات المتدحرجة لكل الأسهم (MA20/MA50/Vol20/RSI14).
+    تُقرأ من cache/rolling_state.npz لو مطابقة للمخزن الحالى، وإلا تُبنى من
+    آخر technicals.ROLLING_HISTORY صف لكل سهم.
+    """
+    if store is None:
+        store = ensure_case_store()
+    if store is None:
+        return None
+    store_sig = _file_signature(CASE_STORE_DIR / "index.json")
+
+    if ROLLING_STATE_PATH.exists():
+        try:
+            with np.load(ROLLING_STATE_PATH) as data:
+                if list(data["store_signature"]) == store_sig:
+                    state = {k: data[k] for k in data.files if k not in ("symbols", "store_signature")}
+                    state["symbols"] = data["symbols"].tolist()
+                    return state
+        except Exception as e:
+            print(f"⚠️ Could not read rolling state: {e}")
+
+    panel = load_case_panel(align="last", lookback=technicals.ROLLING_HISTORY)
+    state = technicals.rolling_state_from_panel(panel)
+    state["symbols"] = panel["symbols"]
+    _save_rolling_state(state)
+    return state
+
+
+def rolling_technicals() -> pd.DataFrame:
+    """جدول MA20/MA50/Vol20/RSI14 الحالى لكل سهم من الحالة المتدحرجة (بدون أى نوافذ)."""
+    state = load_rolling_state()
+    df = pd.DataFrame(technicals.rolling_state_values(state))
+    df.insert(0, "Symbol", state["symbols"])
+    return df
+
+
 # =========================
 # تحليلات معاملات الجلسة
 # =========================
 
-def aggregate_transactions(df_tx: pd.DataFrame) -> pd.DataFrame:
-    """تلخيص معاملات الجلسة لكل سهم (حجم، سيولة، تجميع/تصريف)."""
-    if df_tx is None or df_tx.empty:
-        return pd.DataFrame(columns=["Symbol", "total_volume", "total_turnover",
-                                     "buy_volume", "sell_volume", "buy_ratio",
-                                     "behavior"])
+AGG_COLUMNS = ["Symbol", "total_volume", "total_turnover",
+               "buy_volume", "sell_volume", "buy_ratio", "behavior"]
+
+# حدود تصنيف سلوك الجلسة حسب buy_ratio
+ACCUMULATION_RATIO = 0.6
+DISTRIBUTION_RATIO = 0.4
+
 
-    df = df_tx.copy()
-    df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0)
-    df["Turnover"] = pd.to_numeric(df["Turnover"], errors="coerce").fillna(0)
+def classify_behavior(buy_ratio, accumulation: float = ACCUMULATION_RATIO,
+                      distribution: float = DISTRIBUTION_RATIO) -> np.ndarray:
+    """تصنيف متجه: Accumulation / Distribution / Normal (NaN -> Normal)."""
+    br = np.asarray(buy_ratio, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return np.select([br > accumulation, br < distribution],
+                         ["Accumulation", "Distribution"], default="Normal")
 
-    # تحديد عمليات الشراء والبيع:
-    side = df["Side"].astype(str).str.upper()
 
-    buy_mask = side.isin(["B", "BUY"])
-    sell_mask = side.isin(["S", "SELL"])
+def _side_masks(df_tx: pd.DataFrame):
+    """أقنعة الشراء والبيع من عمود Side (B/BUY و S/SELL)."""
+    # factorize على القيم المختلفة (قليلة جداً) بدل str.upper على كل صف
+    side_codes, side_values = pd.factorize(df_tx["Side"])
+    side_upper = pd.Index(side_values).astype(str).str.upper()
+    # Side كله NaN (شريط فيه Direction فقط) = side_values فاضية وكل الأكواد -1
+    valid = side_codes >= 0
+    safe_codes = np.maximum(side_codes, 0)
 
-    # لو مفيش معلومات فى Side نحاول نستفيد من Direction (2 / -2 / 1...)
-    if (not buy_mask.any()) and ("Direction" in df.columns):
-        dir_col = pd.to_numeric(df["Direction"], errors="coerce")
-        buy_mask = dir_col.gt(0)
-        sell_mask = dir_col.lt(0)
+    def _mask(labels):
+        lut = np.isin(side_upper, labels)
+        if lut.size == 0:
+            return np.zeros(side_codes.shape, dtype=bool)
+        return np.where(valid, lut[safe_codes], False)
 
-    grouped = df.groupby("Symbol")
+    return _mask(["B", "BUY"]), _mask(["S", "SELL"])
 
-    total_volume = grouped["Volume"].sum()
-    total_turnover = grouped["Turnover"].sum()
-    buy_volume = df[buy_mask].groupby("Symbol")["Volume"].sum()
-    sell_volume = df[sell_mask].groupby("Symbol")["Volume"].sum()
 
-    agg = pd.DataFrame({
+def _direction_masks(df_tx: pd.DataFrame):
+    """أقنعة الشراء والبيع من Direction (2 / -2 / 1...)."""
+    dir_col = pd.to_numeric(df_tx["Direction"], errors="coerce").to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        return dir_col > 0, dir_col < 0
+
+
+def _trade_side_masks(df_tx: pd.DataFrame):
+    """أقنعة الشراء والبيع للشريط: من Side، ولو مفيهوش شراء خالص من Direction."""
+    buy_mask, sell_mask = _side_masks(df_tx)
+    if (not buy_mask.any()) and ("Direction" in df_tx.columns):
+        buy_mask, sell_mask = _direction_masks(df_tx)
+    return buy_mask, sell_mask
+
+
+def _numeric_values(df: pd.DataFrame, col: str) -> np.ndarray:
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+
+def _agg_frame(symbols, total_volume, total_turnover, buy_volume, sell_volume) -> pd.DataFrame:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buy_ratio = np.where(total_volume > 0, buy_volume / total_volume, np.nan)
+
+    return pd.DataFrame({
+        "Symbol": symbols,
         "total_volume": total_volume,
         "total_turnover": total_turnover,
         "buy_volume": buy_volume,
         "sell_volume": sell_volume,
-    }).fillna(0)
+        "buy_ratio": buy_ratio,
+        "behavior": classify_behavior(buy_ratio),
+    })
+
 
-    agg["buy_ratio"] = agg.apply(
-        lambda r: r["buy_volume"] / r["total_volume"] if r["total_volume"] > 0 else np.nan,
-        axis=1
+def aggregate_transactions(df_tx: pd.DataFrame) -> pd.DataFrame:
+    """
+    تلخيص معاملات الجلسة لكل سهم (حجم، سيولة، تجميع/تصريف) فى مرور واحد:
+    أكواد السهم من factorize ثم np.bincount للحجم/القيمة/الشراء/البيع.
+    """
+    if df_tx is None or df_tx.empty:
+        return pd.DataFrame(columns=AGG_COLUMNS)
+
+    codes, symbols = pd.factorize(df_tx["Symbol"], sort=True)
+    n = len(symbols)
+    volume = _numeric_values(df_tx, "Volume")
+    turnover = _numeric_values(df_tx, "Turnover")
+    # لو مفيش معلومات فى Side نحاول نستفيد من Direction
+    buy_mask, sell_mask = _trade_side_masks(df_tx)
+
+    # الصفوف بدون رمز لا تدخل فى التجميع (مثل groupby)
+    keep = codes >= 0
+    codes, volume, turnover = codes[keep], volume[keep], turnover[keep]
+    buy_mask, sell_mask = buy_mask[keep], sell_mask[keep]
+
+    return _agg_frame(
+        symbols,
+        np.bincount(codes, weights=volume, minlength=n),
+        np.bincount(codes, weights=turnover, minlength=n),
+        np.bincount(codes[buy_mask], weights=volume[buy_mask], minlength=n),
+        np.bincount(codes[sell_mask], weights=volume[sell_mask], minlength=n),
     )
 
-    def classify_behavior(row):
-        if np.isnan(row["buy_ratio"]):
-            return "Normal"
-        if row["buy_ratio"] > 0.6:
-            return "Accumulation"
-        if row["buy_ratio"] < 0.4:
-            return "Distribution"
-        return "Normal"
 
-    agg["behavior"] = agg.apply(classify_behavior, axis=1)
+# =========================
+# قراءة شريط المعاملات على دفعات (Streaming)
+# =========================
+# الشريط يُقرأ على chunks ثابتة الحجم، وكل chunk يُضاف لمجاميع متراكمة لكل سهم
+# ثم يُرمى، فالذاكرة محدودة بحجم الـ chunk مهما كبر الملف.
+# الإضافة بـ np.add.at بترتيب الصفوف = نفس ترتيب جمع np.bincount على الملف كله،
+# فالناتج مطابق بالضبط لـ aggregate_transactions(load_transactions(path)).
 
-    agg.reset_index(inplace=True)
-    return agg
+TAPE_CHUNK_ROWS = 100_000
+
+# مجاميع Side ومجاميع Direction منفصلة لأن اختيار Direction يعتمد على الملف كله
+_TAPE_SUMS = ["total_volume", "total_turnover", "buy_volume", "sell_volume",
+              "dir_buy_volume", "dir_sell_volume"]
+
+
+def init_tape_accumulator(keep_ticks: bool = False) -> dict:
+    """
+    مجاميع فارغة لكل سهم (تكبر تلقائياً مع ظهور رموز جديدة).
+    keep_ticks=True يحتفظ أيضاً بأعمدة الصفقات نفسها (tape_tick_analytics) حتى تُحسب
+    تحليلات الصفقات والشموع من نفس القراءة بدل إعادة قراءة الشريط.
+    """
+    acc = {name: np.zeros(0) for name in _TAPE_SUMS}
+    acc.update({"codes": {}, "symbols": [], "rows": 0,
+                "has_side_buy": False, "has_direction": False,
+                "ticks": [] if keep_ticks else None})
+    return acc
+
+
+def _tape_codes(acc: dict, symbols: pd.Series) -> np.ndarray:
+    """أكواد ثابتة لكل رمز عبر الـ chunks (-1 للصفوف بدون رمز)."""
+    local, uniques = pd.factorize(symbols)
+    lut = np.empty(len(uniques), dtype=np.int64)
+    for i, sym in enumerate(uniques):
+        code = acc["codes"].get(sym)
+        if code is None:
+            code = acc["codes"][sym] = len(acc["symbols"])
+            acc["symbols"].append(sym)
+        lut[i] = code
+
+    grow = len(acc["symbols"]) - acc["total_volume"].size
+    if grow > 0:
+        for name in _TAPE_SUMS:
+            acc[name] = np.concatenate([acc[name], np.zeros(grow)])
+    codes = np.full(local.shape, -1, dtype=np.int64)
+    codes[local >= 0] = lut[local[local >= 0]]
+    return codes
+
+
+def update_tape_accumulator(acc: dict, chunk: pd.DataFrame) -> np.ndarray:
+    """
+    إضافة chunk من الشريط (بعد normalize_transactions_columns) للمجاميع.
+    يرجع أكواد الأسهم التى تغيرت مجاميعها.
+    """
+    if chunk is None or chunk.empty:
+        return np.zeros(0, dtype=np.int64)
+
+    codes = _tape_codes(acc, chunk["Symbol"])
+    volume = _numeric_values(chunk, "Volume")
+    turnover = _numeric_values(chunk, "Turnover")
+    buy_mask, sell_mask = _side_masks(chunk)
+    acc["rows"] += len(chunk)
+    acc["has_side_buy"] |= bool(buy_mask.any())
+
+    masks = {"buy_volume": buy_mask, "sell_volume": sell_mask}
+    if "Direction" in chunk.columns:
+        acc["has_direction"] = True
+        masks["dir_buy_volume"], masks["dir_sell_volume"] = _direction_masks(chunk)
+
+    keep = codes >= 0
+    np.add.at(acc["total_volume"], codes[keep], volume[keep])
+    np.add.at(acc["total_turnover"], codes[keep], turnover[keep])
+    for name, mask in masks.items():
+        mask = mask & keep
+        np.add.at(acc[name], codes[mask], volume[mask])
+
+    if acc["ticks"] is not None:
+        no_value = np.full(len(chunk), np.nan)
+        dir_buy, dir_sell = masks.get("dir_buy_volume"), masks.get("dir_sell_volume")
+        acc["ticks"].append({
+            "codes": codes,
+            "price": np.array(_float_column(chunk, "Price")),
+            "volume": volume,
+            "side_sign": buy_mask.astype(np.int8) - sell_mask.astype(np.int8),
+            "dir_sign": (dir_buy.astype(np.int8) - dir_sell.astype(np.int8)
+                         if dir_buy is not None else np.zeros(len(chunk), dtype=np.int8)),
+            "seconds": _tape_seconds(chunk["Time"]) if "Time" in chunk.columns else no_value,
+            "seq": np.array(_float_column(chunk, "Sequence ID")),
+        })
+    return np.unique(codes[keep])
+
+
+def _tape_uses_direction(acc: dict) -> bool:
+    """هل الشراء/البيع محسوب من Direction (مفيش أى B/BUY فى Side)."""
+    return (not acc["has_side_buy"]) and acc["has_direction"]
+
+
+def tape_accumulator_frame(acc: dict, codes=None) -> pd.DataFrame:
+    """
+    نفس مخرجات aggregate_transactions من المجاميع المتراكمة.
+    codes: أسهم محددة فقط (بترتيب الأكواد) للتحديث الجزئى.
+    """
+    if acc["rows"] == 0:
+        return pd.DataFrame(columns=AGG_COLUMNS)
+
+    if codes is None:
+        # ترتيب الرموز مثل factorize(sort=True)
+        order, symbols = pd.factorize(pd.Series(acc["symbols"]), sort=True)
+        codes = np.empty(len(symbols), dtype=np.int64)
+        codes[order] = np.arange(len(symbols))
+    else:
+        symbols = np.asarray(acc["symbols"], dtype=object)[codes]
+    sums = {name: acc[name][codes] for name in _TAPE_SUMS}
+
+    buy, sell = sums["buy_volume"], sums["sell_volume"]
+    if _tape_uses_direction(acc):
+        buy, sell = sums["dir_buy_volume"], sums["dir_sell_volume"]
+    return _agg_frame(symbols, sums["total_volume"], sums["total_turnover"], buy, sell)
+
+
+def iter_transaction_chunks(path: Path, encoding: str, chunksize: int = TAPE_CHUNK_ROWS,
+                            **kwargs):
+    """chunks من ملف المعاملات بعد توحيد الأعمدة وتحويل الأرقام (مثل load_transactions)."""
+    reader = pd.read_csv(path, encoding=encoding, chunksize=chunksize, **kwargs)
+    with reader:
+        for chunk in reader:
+            yield _prepare_transactions_chunk(chunk)
+
+
+def _prepare_transactions_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = normalize_transactions_columns(chunk)
+    for c in ["Price", "% Change", "Volume", "Turnover"]:
+        if c in chunk.columns:
+            chunk[c] = pd.to_numeric(chunk[c], errors="coerce")
+    return chunk
+
+
+def _encoding_candidates(path: Path) -> list:
+    """ترتيب الترميزات للتجربة: المحفوظ فى الكاش ثم المكتشف ثم CSV_ENCODINGS."""
+    cached = _load_encoding_cache().get(str(path.resolve()))
+    first = [cached[2]] if cached is not None and cached[:2] == _file_signature(path) else []
+    first.append(sniff_encoding(path))
+    return list(dict.fromkeys(enc for enc in first + CSV_ENCODINGS if enc))
+
+
+def aggregate_transactions_file(path: Path, chunksize: int = TAPE_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    تلخيص ملف المعاملات مباشرة من القرص على دفعات بدون تحميله كله فى الذاكرة.
+    لو فشل الترميز فى منتصف الملف نعيد القراءة بالترميز التالى. أخطاء البيانات
+    نفسها (أثناء التجميع) لا تُعتبر فشل ترميز وتظهر مرة واحدة كما هى.
+    """
+    path = Path(path)
+    _record_load("transactions", path, "stream")
+    for enc in _encoding_candidates(path):
+        acc = init_tape_accumulator()
+        try:
+            for chunk in iter_transaction_chunks(path, enc, chunksize):
+                update_tape_accumulator(acc, chunk)
+        except (UnicodeError, pd.errors.ParserError):
+            continue
+        ENCODING_STATS[enc] += 1
+        _load_encoding_cache()[str(path.resolve())] = _file_signature(path) + [enc]
+        _save_encoding_cache()
+        print(f"Aggregated transactions ({acc['rows']:,} rows) using encoding: {enc}")
+        return tape_accumulator_frame(acc)
+
+    print("⚠️ Aggregated transactions with fallback encoding (latin1 with replacement).")
+    acc = init_tape_accumulator()
+    for chunk in iter_transaction_chunks(path, "latin1", chunksize, encoding_errors="replace"):
+        update_tape_accumulator(acc, chunk)
+    ENCODING_STATS["latin1"] += 1
+    return tape_accumulator_frame(acc)
 
 
 # =========================
@@ -285,10 +1379,11 @@ def aggregate_transactions(df_tx: pd.DataFrame) -> pd.DataFrame:
 
 def compute_basic_technicals(df_case: pd.DataFrame) -> pd.DataFrame:
     """
-    حساب إغلاق اليوم، MA20، MA50، متوسط حجم 20 يوم.
+    حساب إغلاق اليوم، MA20، MA50، متوسط حجم 20 يوم، RSI14، ATR14 و Bollinger
+    عن طريق محرك technicals (نفس حسابات شاشة السوق بالكامل).
     يرجع صفاً واحداً يمثل آخر يوم.
     """
-    df = df_case.sort_values("Date").copy()
+    df = df_case.sort_values("Date")
 
     if "Closed" in df.columns:
         close = pd.to_numeric(df["Closed"], errors="coerce")
@@ -297,17 +1392,18 @@ def compute_basic_technicals(df_case: pd.DataFrame) -> pd.DataFrame:
     else:
         raise ValueError("لا يوجد عمود Closed/Close فى بيانات CASE.")
 
-    df["Close_val"] = close
-    df["MA20"] = df["Close_val"].rolling(20).mean()
-    df["MA50"] = df["Close_val"].rolling(50).mean()
-
-    if "Volume" in df.columns:
-        df["Vol20"] = pd.to_numeric(df["Volume"], errors="coerce").rolling(20).mean()
-    else:
-        df["Vol20"] = np.nan
+    def _col(name):
+        if name in df.columns:
+            return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+        return None
 
-    last_row = df.iloc[[-1]][["Close_val", "MA20", "MA50", "Vol20"]]
-    last_row.rename(columns={"Close_val": "Close"}, inplace=True)
+    ind = technicals.compute_indicators(
+        close.to_numpy(dtype=float), _col("Volume"), _col("High"), _col("Low")
+    )
+    last_row = pd.DataFrame(
+        {name: arr[-1:, 0] for name, arr in ind.items()},
+        index=df.index[-1:],
+    )
     return last_row
 
 
@@ -315,74 +1411,175 @@ def compute_basic_technicals(df_case: pd.DataFrame) -> pd.DataFrame:
 # حساب Pivot / R1 / R2 / S1 / S2
 # =========================
 
-def add_pivot_levels(df_intraday: pd.DataFrame) -> pd.DataFrame:
+PIVOT_COLUMNS = {
+    "pivot": "Pivot Point",
+    "r1": "Resistance 1 (R1)",
+    "r2": "Resistance 2 (R2)",
+    "s1": "Support 1 (S1)",
+    "s2": "Support 2 (S2)",
+}
+
+# أسماء كل مستويات pivots.LEVELS للعرض (R3 / S3 غير موجودة فى ملف الجلسة)
+PIVOT_LEVEL_LABELS = {**PIVOT_COLUMNS, "r3": "Resistance 3 (R3)", "s3": "Support 3 (S3)"}
+
+# صفوف CASE الأخيرة لكل سهم المطلوبة لـ Pivot الأسبوع والشهر السابقين
+PIVOT_HISTORY = 70
+
+
+def _float_column(df: pd.DataFrame, col: str) -> np.ndarray:
+    """عمود كـ float64 (بدون نسخ لو العمود float أصلاً) أو NaN لو غير موجود."""
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def _pivot_inputs(df: pd.DataFrame):
+    """High / Low / Close المستخدمة لـ Pivot اليوم من ملف الجلسة."""
+    high = _float_column(df, "High")
+    low = _float_column(df, "Low")
+    # نستخدم إقفال سابق كـ Close للحساب، لو مش موجود نستخدم Last
+    close_for_pivot = _float_column(df, "Prev. Closed" if "Prev. Closed" in df.columns else "Last")
+    return high, low, close_for_pivot
+
+
+def _pivot_values(df: pd.DataFrame) -> np.ndarray:
+    """
+    مصفوفة (5 × عدد الصفوف) متصلة بترتيب PIVOT_COLUMNS: القيم الموجودة كما هى،
+    والصفوف التى كل مستوياتها NaN تُحسب من P = (High + Low + Prev. Closed) / 3.
+    """
+    high, low, close_for_pivot = _pivot_inputs(df)
+
+    levels = np.empty((len(PIVOT_COLUMNS), len(df)))
+    for k, col in enumerate(PIVOT_COLUMNS.values()):
+        levels[k] = _float_column(df, col)
+
+    # نحسب فقط للأماكن اللى مستوياتها كلها NaN
+    need_calc = (~np.isnan(high) & ~np.isnan(low) & ~np.isnan(close_for_pivot)
+                 & np.isnan(levels).all(axis=0))
+    if need_calc.any():
+        calc = pivots.method_levels(high, low, close_for_pivot, "classic")
+        rows = [pivots.LEVELS.index(k) for k in PIVOT_COLUMNS]
+        levels[:, need_calc] = calc[rows][:, need_calc]
+    return levels
+
+
+def add_pivot_levels(df_intraday: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
     ضمان وجود الأعمدة:
       Pivot Point, Resistance 1 (R1), Resistance 2 (R2),
       Support 1 (S1), Support 2 (S2)
     لو غير موجودة أو مليانة NaN نحسبها من:
       P = (High + Low + Prev. Closed) / 3
+    لو الأعمدة كاملة بالفعل (مثل ملف intraday بعد load_intraday) يرجع نفس الإطار
+    بدون نسخ؛ inplace=True يكتب الأعمدة فى نفس الإطار.
     """
-    df = df_intraday.copy()
+    levels = _pivot_values(df_intraday)
+    complete = all(col in df_intraday.columns for col in PIVOT_COLUMNS.values()) and all(
+        np.array_equal(levels[k], _float_column(df_intraday, col), equal_nan=True)
+        for k, col in enumerate(PIVOT_COLUMNS.values())
+    )
+    if complete:
+        return df_intraday
 
-    # نتأكد أن الأعمدة موجودة
-    if "Pivot Point" not in df.columns:
-        df["Pivot Point"] = np.nan
-    if "Resistance 1 (R1)" not in df.columns:
-        df["Resistance 1 (R1)"] = np.nan
-    if "Resistance 2 (R2)" not in df.columns:
-        df["Resistance 2 (R2)"] = np.nan
-    if "Support 1 (S1)" not in df.columns:
-        df["Support 1 (S1)"] = np.nan
-    if "Support 2 (S2)" not in df.columns:
-        df["Support 2 (S2)"] = np.nan
-
-    high = pd.to_numeric(df.get("High"), errors="coerce")
-    low = pd.to_numeric(df.get("Low"), errors="coerce")
+    df = df_intraday if inplace else df_intraday.copy()
+    for k, col in enumerate(PIVOT_COLUMNS.values()):
+        df[col] = levels[k]
+    return df
 
-    # نستخدم إقفال سابق كـ Close للحساب، لو مش موجود نستخدم Last
-    if "Prev. Closed" in df.columns:
-        close_for_pivot = pd.to_numeric(df["Prev. Closed"], errors="coerce")
-    else:
-        close_for_pivot = pd.to_numeric(df.get("Last"), errors="coerce")
-
-    # pivot / R / S
-    mask_valid = (~high.isna()) & (~low.isna()) & (~close_for_pivot.isna())
-
-    # نحسب فقط للأماكن اللى فيها NaN أو القيم كلها صفر
-    need_calc = mask_valid & (
-        df["Pivot Point"].isna()
-        & df["Resistance 1 (R1)"].isna()
-        & df["Resistance 2 (R2)"].isna()
-        & df["Support 1 (S1)"].isna()
-        & df["Support 2 (S2)"].isna()
-    )
 
-    P = (high + low + close_for_pivot) / 3.0
-    R1 = 2 * P - low
-    S1 = 2 * P - high
-    R2 = P + (high - low)
-    S2 = P - (high - low)
+def pivot_levels(df_intraday: pd.DataFrame, panel: dict = None, trading_date=None) -> dict:
+    """
+    مستويات Pivot لكل صفوف ملف الجلسة كمصفوفات (تُحسب مرة واحدة لكل ملف عبر
+    daily_pivots): pivot / r1 / r2 / s1 / s2 صفوف من مصفوفة واحدة متصلة + last
+    و change، ومعها الرموز مرتبة (symbols / order) للبحث عن سهم بـ searchsorted.
+    table: {(timeframe, method): مصفوفة (pivots.LEVELS × صفوف)} لكل الطرق:
+      daily من ملف الجلسة (classic = أعمدة الملف كما هى)، و weekly / monthly من
+      الأسبوع/الشهر السابق لـ trading_date فى panel الـ CASE (align="date") لو مُرر.
+    """
+    levels = _pivot_values(df_intraday)
+    symbols = df_intraday["Symbol"].astype(str).to_numpy() if "Symbol" in df_intraday.columns \
+        else np.full(len(df_intraday), "", dtype=object)
+    order = np.argsort(symbols, kind="stable")
+
+    table = {("daily", m): arr for m, arr in pivots.all_method_levels(*_pivot_inputs(df_intraday)).items()}
+    table[("daily", "classic")][[pivots.LEVELS.index(k) for k in PIVOT_COLUMNS]] = levels
+
+    if panel is not None and trading_date is not None:
+        col_of = {sym: j for j, sym in enumerate(panel["symbols"])}
+        pos = np.array([col_of.get(sym, -1) for sym in symbols], dtype=np.int64)
+        for tf in pivots.TIMEFRAMES[1:]:
+            hlc = pivots.previous_period_hlc(panel["dates"], panel["high"], panel["low"],
+                                             panel["close"], np.datetime64(pd.Timestamp(trading_date), "D"), tf)
+            hlc = [np.where(pos >= 0, x[np.maximum(pos, 0)], np.nan) if x.size else
+                   np.full(len(symbols), np.nan) for x in hlc]
+            for m, arr in pivots.all_method_levels(*hlc).items():
+                table[(tf, m)] = arr
+
+    out = {k: levels[i] for i, k in enumerate(PIVOT_COLUMNS)}
+    out.update({
+        "levels": levels,
+        "table": table,
+        "last": _float_column(df_intraday, "Last"),
+        "change": _float_column(df_intraday, "% Change"),
+        "symbols": symbols,
+        "order": order,
+        "sorted_symbols": symbols[order],
+    })
+    return out
+
+
+def pivot_row(levels: dict, symbol: str):
+    """رقم صف السهم فى ملف الجلسة (أول ظهور) أو None."""
+    sorted_symbols = levels["sorted_symbols"]
+    i = np.searchsorted(sorted_symbols, str(symbol))
+    if i < len(sorted_symbols) and sorted_symbols[i] == str(symbol):
+        return int(levels["order"][i])
+    return None
+
+
+def symbol_pivots(levels: dict, symbol: str, method: str = None, timeframe: str = "daily") -> dict:
+    """
+    {Pivot Point, R1, R2, S1, S2} لسهم واحد من أعمدة ملف الجلسة (NaN لو السهم غير
+    موجود)، أو كل pivots.LEVELS لطريقة/فترة محددة لو method مُرر.
+    """
+    row = pivot_row(levels, symbol)
+    if method is None:
+        return {col: (float(levels[k][row]) if row is not None else np.nan)
+                for k, col in PIVOT_COLUMNS.items()}
+    arr = levels["table"].get((timeframe, method))
+    return {PIVOT_LEVEL_LABELS[k]: (float(arr[i, row]) if row is not None and arr is not None else np.nan)
+            for i, k in enumerate(pivots.LEVELS)}
 
-    df.loc[need_calc, "Pivot Point"] = P[need_calc]
-    df.loc[need_calc, "Resistance 1 (R1)"] = R1[need_calc]
-    df.loc[need_calc, "Resistance 2 (R2)"] = R2[need_calc]
-    df.loc[need_calc, "Support 1 (S1)"] = S1[need_calc]
-    df.loc[need_calc, "Support 2 (S2)"] = S2[need_calc]
 
-    return df
+def symbol_pivot_table(levels: dict, symbol: str) -> pd.DataFrame:
+    """صف لكل (فترة، طريقة) متاحة بكل المستويات لسهم واحد."""
+    rows = [{"Timeframe": tf, "Method": method, **symbol_pivots(levels, symbol, method, tf)}
+            for tf, method in levels["table"]]
+    return pd.DataFrame(rows, columns=["Timeframe", "Method",
+                                       *(PIVOT_LEVEL_LABELS[k] for k in pivots.LEVELS)])
 
 
 # =========================
 # بناء جدول الإشارات اليومية
 # =========================
 
-def build_signals_for_day(intraday_path: Path, tx_path: Path) -> pd.DataFrame:
-    """دمج بيانات intraday مع ملخص معاملات الجلسة لإنتاج جدول إشارات."""
-    df_intraday = load_intraday(intraday_path)
-    df_tx = load_transactions(tx_path)
-    agg_tx = aggregate_transactions(df_tx)
+def build_signals_for_day(intraday_path: Path = None, tx_path: Path = None,
+                          df_intraday: pd.DataFrame = None, df_tx: pd.DataFrame = None,
+                          agg_tx: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    دمج بيانات intraday مع ملخص معاملات الجلسة لإنتاج جدول إشارات.
+    أى مصدر متاح فى الذاكرة يُمرر مباشرة بدل المسار حتى لا يُقرأ الملف مرة ثانية:
+    df_intraday بدل intraday_path، و df_tx (الشريط كله) أو agg_tx (ملخصه) بدل tx_path.
+    """
+    if df_intraday is None:
+        df_intraday = load_intraday(intraday_path)
+    if agg_tx is None:
+        # الملخص يُحسب على دفعات من الملف مباشرة (بدون تحميل الشريط كله)
+        agg_tx = aggregate_transactions(df_tx) if df_tx is not None else aggregate_transactions_file(tx_path)
+    return _merge_signals(df_intraday, agg_tx)
 
+
+def _merge_signals(df_intraday: pd.DataFrame, agg_tx: pd.DataFrame) -> pd.DataFrame:
     df = df_intraday.merge(agg_tx, on="Symbol", how="left")
 
     # سيولة دخول/خروج لو مش موجودة
@@ -398,6 +1595,10 @@ def build_signals_for_day(intraday_path: Path, tx_path: Path) -> pd.DataFrame:
 # "نموذج" ذكاء اصطناعى مبدئى Rule-based
 # =========================
 
+# أوزان القواعد (نفس أسماء معاملات backtest.ai_prob_scores)
+AI_SCORE_WEIGHTS = {"w_change": 0.07, "w_buy_ratio": 0.3, "w_behavior": 0.08}
+
+
 def apply_ai_score(signals: pd.DataFrame) -> pd.DataFrame:
     """
     حساب درجة احتمالية نجاح الفرصة (AI_Prob) بناءً على قواعد بسيطة:
@@ -415,18 +1616,19 @@ def apply_ai_score(signals: pd.DataFrame) -> pd.DataFrame:
     # تأثير التغير اليومى
     if "% Change" in df.columns:
         change = pd.to_numeric(df["% Change"], errors="coerce").fillna(0)
-        df["AI_Prob"] += np.where(change > 0, 0.07, np.where(change < 0, -0.07, 0))
+        w = AI_SCORE_WEIGHTS["w_change"]
+        df["AI_Prob"] += np.where(change > 0, w, np.where(change < 0, -w, 0))
 
     # تأثير buy_ratio
     if "buy_ratio" in df.columns:
         br = pd.to_numeric(df["buy_ratio"], errors="coerce")
-        df["AI_Prob"] += 0.3 * (br - 0.5).fillna(0)
+        df["AI_Prob"] += AI_SCORE_WEIGHTS["w_buy_ratio"] * (br - 0.5).fillna(0)
 
     # سلوك الجلسة
     if "behavior" in df.columns:
         df["AI_Prob"] += df["behavior"].map({
-            "Accumulation": 0.08,
-            "Distribution": -0.08
+            "Accumulation": AI_SCORE_WEIGHTS["w_behavior"],
+            "Distribution": -AI_SCORE_WEIGHTS["w_behavior"]
         }).fillna(0)
 
     # قص القيم بين 0.05 و 0.95
@@ -435,40 +1637,736 @@ def apply_ai_score(signals: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# =========================
+# تقييم النموذج (Model serving) مع الرجوع للقواعد
+# =========================
+# النموذج يُحمّل مرة واحدة لكل process (ويُعاد فقط لو الملف اتغير)، والخصائص لكل
+# الأسهم هى صف يوم الإشارة فى مخزن الخصائص + buy_ratio من الشريط، ثم predict واحد
+# على المصفوفة كلها. الجلسة المفتوحة (لم تُضف للمخزن قبل close_session) خصائصها من
+# آخر صفوف CASE + لقطة الجلسة فى جدول الإشارات نفسه. نفس المسار (score_signals)
+# للجلسة المباشرة ولأرشيف الإشارات، والـ backtest يقرأ درجات النموذج من الأرشيف. لو
+# النموذج غير متاح أو لا يستخدم buy_ratio، أو السهم بدون خصائص كاملة (مثلاً بدون
+# شريط) تبقى درجة apply_ai_score. مخزن الخصائص فى features (يستورد utils) فيُستورد
+# داخل الدوال.
+
+_MODEL_CACHE = {}
+MODEL_STATS = {
+    "loads": 0, "load_seconds": 0.0, "predict_calls": 0, "predicted_rows": 0,
+    "fallback_rows": 0, "predict_seconds": 0.0, "last_predict_ms": 0.0, "last_error": None,
+}
+
+
+def load_model(path: Path = None):
+    """النموذج (أى كائن فيه predict_proba أو predict) أو None مع تسجيل السبب."""
+    import pickle
+
+    path = Path(path or MODEL_PATH)
+    sig = _file_signature(path) if path.exists() else None
+    cached = _MODEL_CACHE.get(str(path))
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+
+    model = None
+    if sig is None:
+        MODEL_STATS["last_error"] = f"model file not found: {path.name}"
+    else:
+        t0 = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+            if not (hasattr(model, "predict_proba") or hasattr(model, "predict")):
+                raise TypeError(f"{type(model).__name__} has no predict_proba/predict")
+            MODEL_STATS["last_error"] = None
+        except Exception as e:
+            model = None
+            MODEL_STATS["last_error"] = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Could not load model {path.name}, using rule-based AI_Prob: {e}")
+        MODEL_STATS["loads"] += 1
+        MODEL_STATS["load_seconds"] += time.perf_counter() - t0
+
+    _MODEL_CACHE[str(path)] = (sig, model)
+    return model
+
+
+def _live_feature_rows(symbols: list, day, snapshot: pd.DataFrame) -> np.ndarray:
+    """
+    خصائص جلسة لم تُضف للمخزن بعد: آخر FEATURE_LOOKBACK صف CASE لكل سهم + صف
+    اللقطة (نفس تحويل case_rows_from_intraday: Close وإلا Last، High، Low، Volume).
+    """
+    import features
+
+    today = case_rows_from_intraday(snapshot, day).drop_duplicates("Symbol", keep="last")
+    today = today.set_index("Symbol").reindex(symbols)
+    panel = load_case_panel(symbols, align="last", lookback=features.FEATURE_LOOKBACK)
+    rows = {k: np.vstack([panel[k], today[c].to_numpy(dtype=float)[None, :]])
+            for k, c in (("close", "Closed"), ("high", "High"), ("low", "Low"), ("volume", "Volume"))}
+    feats = features.panel_features(rows["close"], rows["high"], rows["low"], rows["volume"])
+    return features.feature_matrix(feats)
+
+
+def model_features(symbols, date, buy_ratio=None, snapshot: pd.DataFrame = None) -> np.ndarray:
+    """
+    مصفوفة (أسهم × FEATURE_COLUMNS) لجلسة date لكل سهم.
+    جلسة مخزنة: صفها من مخزن الخصائص. جلسة بعد آخر تاريخ مخزن للسهم (الجلسة المفتوحة
+    قبل close_session): من آخر صفوف CASE + صف السهم فى snapshot (ملف الجلسة أو جدول
+    الإشارات). غير ذلك صفوف NaN، و buy_ratio الناقص يبقى NaN.
+    """
+    import features
+
+    symbols = [str(s) for s in symbols]
+    X = np.full((len(symbols), len(features.FEATURE_COLUMNS)), np.nan)
+    feats = features.build_feature_store()
+    dates = ensure_case_store()["dates"]
+    day = np.datetime64(pd.Timestamp(date).normalize(), "D")
+    live = []
+    for i, sym in enumerate(symbols):
+        entry = feats["symbols"].get(sym)
+        if entry is None:
+            continue
+        start, stop = entry[:2]
+        if stop > start and day > dates[stop - 1]:
+            live.append(i)
+            continue
+        r = start + int(np.searchsorted(dates[start:stop], day))
+        if r < stop and dates[r] == day:
+            X[i] = feats["values"][:, r]
+    if live and snapshot is not None:
+        X[live] = _live_feature_rows([symbols[i] for i in live], day, snapshot)
+    if buy_ratio is not None:
+        X[:, features.FEATURE_COLUMNS.index("buy_ratio")] = \
+            pd.to_numeric(pd.Series(buy_ratio), errors="coerce").to_numpy(dtype=float)
+    return X
+
+
+def _model_columns(model) -> list:
+    import features
+
+    names = getattr(model, "feature_names_in_", None)
+    return list(features.FEATURE_COLUMNS) if names is None else [str(n) for n in names]
+
+
+def _model_uses_tape(model) -> bool:
+    """النموذج يتفاعل مع الشريط: buy_ratio من خصائصه ومعامله (لو معروف) ليس صفراً."""
+    columns = _model_columns(model)
+    if "buy_ratio" not in columns:
+        return False
+    coef = getattr(model, "coef_", None)
+    if coef is None:
+        return True
+    return bool(np.asarray(coef).reshape(-1, len(columns))[:, columns.index("buy_ratio")].any())
+
+
+def _model_predict(model, X: np.ndarray) -> np.ndarray:
+    import features
+
+    X = X[:, [features.FEATURE_COLUMNS.index(c) for c in _model_columns(model)]]
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(X), dtype=float)[:, -1]
+    return np.asarray(model.predict(X), dtype=float)
+
+
+def score_signals(signals: pd.DataFrame, date=None) -> pd.DataFrame:
+    """
+    AI_Prob من النموذج (predict واحد لكل الصفوف) مع AI_Source = model / rules.
+    date: يوم الإشارة (الافتراضى عمود Date). الصفوف بدون خصائص كاملة لهذا اليوم،
+    أو كل الصفوف لو النموذج غير متاح أو لا يستخدم الشريط، تأخذ apply_ai_score.
+    """
+    import features
+
+    df = apply_ai_score(signals.drop(columns=["AI_Prob", "AI_Source"], errors="ignore"))
+    df["AI_Source"] = "rules"
+    if date is None and "Date" in df.columns and not df.empty:
+        date = df["Date"].iloc[0]
+    model = load_model()
+    if model is not None and not _model_uses_tape(model):
+        MODEL_STATS["last_error"] = "model does not use buy_ratio (tape); serving rule-based AI_Prob"
+        model = None
+    if model is None or date is None or df.empty or "Symbol" not in df.columns:
+        MODEL_STATS["fallback_rows"] += len(df)
+        return df
+
+    try:
+        X = model_features(df["Symbol"], date, df.get("buy_ratio"), snapshot=df)
+        used = [features.FEATURE_COLUMNS.index(c) for c in _model_columns(model)]
+        ok = ~np.isnan(X[:, used]).any(axis=1)
+        if ok.any():
+            t0 = time.perf_counter()
+            prob = _model_predict(model, X[ok])
+            elapsed = time.perf_counter() - t0
+            MODEL_STATS["predict_calls"] += 1
+            MODEL_STATS["predicted_rows"] += int(ok.sum())
+            MODEL_STATS["predict_seconds"] += elapsed
+            MODEL_STATS["last_predict_ms"] = elapsed * 1000
+            df.loc[ok, "AI_Prob"] = np.clip(prob, 0.05, 0.95)
+            df.loc[ok, "AI_Source"] = "model"
+        MODEL_STATS["fallback_rows"] += int((~ok).sum())
+    except Exception as e:
+        MODEL_STATS["last_error"] = f"{type(e).__name__}: {e}"
+        MODEL_STATS["fallback_rows"] += len(df)
+        print(f"⚠️ Model scoring failed, using rule-based AI_Prob: {e}")
+    return df
+
+
+def model_stats() -> pd.DataFrame:
+    """إحصائيات تحميل النموذج وزمن الـ predict (صف واحد)."""
+    return pd.DataFrame([{"model": MODEL_PATH.name, **MODEL_STATS}])
+
+
+# =========================
+# متابعة شريط الجلسة المباشر (Live tailing)
+# =========================
+# أثناء الجلسة ملف المعاملات يكبر بإضافة صفوف فى آخره. بدل إعادة قراءة الملف كله
+# نحفظ آخر offset (بالبايت) ونقرأ فقط الأسطر الكاملة المضافة بعده، ونحدّث مجاميع
+# الأسهم التى ظهرت فيها، ثم نعيد تقييم AI_Prob (score_signals) لصفوف هذه الأسهم فقط.
+# حالة المتابعة واحدة لكل شريط (shared_tape_tail): الإشارات والصفقات اللحظية والشموع
+# كلها من نفس القراءة. كل قراءة فيها صفوف جديدة ترفع tail["revision"]، و
+# tail["changed_at"][code] = رقم آخر قراءة غيّرت السهم، فكل مستخدم يعرف ما تغير منذ آخر مرة.
+
+TAIL_BLOCK_BYTES = 8 * 2**20
+
+_LIVE_SIGNALS = {}
+_TAPE_TAILS = {}
+
+
+def open_tape_tail(path: Path) -> dict:
+    """حالة متابعة جديدة للملف: الترميز وأسماء الأعمدة من السطر الأول و offset بعده."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+
+    encoding = "latin1"
+    for enc in _encoding_candidates(path):
+        try:
+            header_text = header.decode(enc)
+        except UnicodeDecodeError:
+            continue
+        encoding = enc
+        break
+    else:
+        header_text = header.decode(encoding)
+
+    # utf-16 لا يصلح تقسيمه على b"\n"، فنعيد تلخيص الملف كله عند كل تغيير
+    byte_lines = not encoding.startswith("utf-16")
+    columns = list(pd.read_csv(io.StringIO(header_text), nrows=0).columns) if byte_lines else []
+    return {
+        "path": path, "encoding": encoding, "columns": columns, "byte_lines": byte_lines,
+        "offset": len(header), "acc": init_tape_accumulator(keep_ticks=True),
+        "revision": 0, "resets": 0, "changed_at": np.zeros(0, dtype=np.int64),
+    }
+
+
+def _reread_whole_tape(tail: dict) -> np.ndarray:
+    _record_load("transactions", tail["path"], "tail")
+    acc = init_tape_accumulator(keep_ticks=True)
+    for chunk in iter_transaction_chunks(tail["path"], tail["encoding"]):
+        update_tape_accumulator(acc, chunk)
+    tail["acc"] = acc
+    tail["offset"] = tail["path"].stat().st_size
+    return np.arange(len(acc["symbols"]))
+
+
+def tail_transactions(tail: dict) -> np.ndarray:
+    """
+    قراءة الأسطر الكاملة المضافة منذ آخر offset وتحديث المجاميع.
+    السطر الأخير بدون newline (الكتابة لسه شغالة) يُقرأ فى المرة الجاية.
+    يرجع أكواد الأسهم التى تغيرت (كل الأسهم لو تغير مصدر الشراء/البيع).
+    """
+    codes = _read_tape_tail(tail)
+    if codes.size:
+        tail["revision"] += 1
+        changed_at = np.zeros(len(tail["acc"]["symbols"]), dtype=np.int64)
+        changed_at[:tail["changed_at"].size] = tail["changed_at"]
+        changed_at[codes] = tail["revision"]
+        tail["changed_at"] = changed_at
+    return codes
+
+
+def _read_tape_tail(tail: dict) -> np.ndarray:
+    path = tail["path"]
+    size = path.stat().st_size
+    if size < tail["offset"]:
+        # الملف اتقص أو اتبدل بملف جديد: نبدأ من الأول (resets يبلّغ المستخدمين)
+        resets, revision = tail["resets"] + 1, tail["revision"]
+        tail.update(open_tape_tail(path), resets=resets, revision=revision)
+    if size == tail["offset"]:
+        return np.zeros(0, dtype=np.int64)
+    if not tail["byte_lines"]:
+        return _reread_whole_tape(tail)
+
+    acc = tail["acc"]
+    used_direction = _tape_uses_direction(acc)
+    # من بعد الـ header مباشرة = قراءة الشريط كله
+    _record_load("transactions" if acc["rows"] == 0 else "transactions_tail", path, "tail")
+    changed = []
+    with open(path, "rb") as f:
+        f.seek(tail["offset"])
+        while True:
+            block = f.read(TAIL_BLOCK_BYTES)
+            end = block.rfind(b"\n")
+            if end < 0:
+                break
+            block = block[:end + 1]
+            tail["offset"] += len(block)
+            f.seek(tail["offset"])
+
+            text = block.decode(tail["encoding"], errors="replace")
+            chunk = pd.read_csv(io.StringIO(text), header=None, names=tail["columns"])
+            changed.append(update_tape_accumulator(acc, _prepare_transactions_chunk(chunk)))
+
+    if _tape_uses_direction(acc) != used_direction:
+        return np.arange(len(acc["symbols"]))
+    return np.unique(np.concatenate(changed)) if changed else np.zeros(0, dtype=np.int64)
+
+
+def shared_tape_tail(tx_path: Path) -> dict:
+    """حالة المتابعة الوحيدة لشريط الجلسة (تُفتح أول مرة) بعد قراءة أى أسطر جديدة."""
+    tx_path = Path(tx_path)
+    key = str(tx_path.resolve())
+    tail = _TAPE_TAILS.get(key)
+    if tail is None:
+        tail = _TAPE_TAILS[key] = open_tape_tail(tx_path)
+    tail_transactions(tail)
+    return tail
+
+
+def _refresh_signal_rows(state: dict, codes: np.ndarray):
+    """تحديث أعمدة المعاملات و AI_Prob لصفوف الأسهم المتغيرة فقط."""
+    agg = tape_accumulator_frame(state["tail"]["acc"], codes).set_index("Symbol")
+    signals = state["signals"]
+    rows = signals["Symbol"].isin(agg.index).to_numpy()
+    if not rows.any():
+        return
+
+    symbols = signals.loc[rows, "Symbol"]
+    for col in AGG_COLUMNS[1:]:
+        signals.loc[rows, col] = symbols.map(agg[col]).to_numpy()
+    if state["cash_in_from_tape"]:
+        signals.loc[rows, "Cash in Turnover"] = signals.loc[rows, "total_turnover"].fillna(0).to_numpy()
+
+    scored = score_signals(signals.loc[rows], state["date"])
+    signals.loc[rows, "AI_Prob"] = scored["AI_Prob"].to_numpy()
+    signals.loc[rows, "AI_Source"] = scored["AI_Source"].to_numpy()
+
+
+def live_signals(intraday_path: Path, tx_path: Path,
+                 df_intraday: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    جدول الإشارات + AI_Prob مع تحديث تدريجى من شريط المعاملات المتنامى.
+    أول استدعاء (أو تغير ملف intraday أو استبدال الشريط) يبنى الجدول كاملاً،
+    وبعده يُقرأ الجديد فقط. df_intraday: ملف الجلسة لو محمّل أصلاً.
+    """
+    intraday_path, tx_path = Path(intraday_path), Path(tx_path)
+    key = (str(intraday_path.resolve()), str(tx_path.resolve()))
+    intraday_sig = _file_signature(intraday_path)
+    state = _LIVE_SIGNALS.get(key)
+    t0 = time.perf_counter()
+    tail = shared_tape_tail(tx_path)
+
+    # ملف intraday جديد أو شريط اتقص/اتبدل: بناء كامل
+    rebuild = (state is None or state["intraday_signature"] != intraday_sig
+               or state["tail"] is not tail or state["tail_resets"] != tail["resets"])
+    if rebuild:
+        if df_intraday is None:
+            df_intraday = load_intraday(intraday_path)
+        signals = _merge_signals(df_intraday, tape_accumulator_frame(tail["acc"]))
+        date = intraday_trading_date(intraday_path)
+        state = _LIVE_SIGNALS[key] = {
+            "intraday_signature": intraday_sig,
+            "tail": tail,
+            "tail_resets": tail["resets"],
+            "df_intraday": df_intraday,
+            "date": date,
+            "signals": score_signals(signals, date),
+            "cash_in_from_tape": "Cash in Turnover" not in df_intraday.columns,
+            "refreshes": 0,
+        }
+        changed = len(tail["acc"]["symbols"])
+    else:
+        # الأسهم التى تغيرت منذ آخر تحديث للإشارات (القراءة نفسها ممكن تكون من صفحة أخرى)
+        codes = np.flatnonzero(tail["changed_at"] > state["seen_revision"])
+        if codes.size:
+            _refresh_signal_rows(state, codes)
+        changed = int(codes.size)
+    state["seen_revision"] = tail["revision"]
+
+    state["refreshes"] += 1
+    state["last_changed_symbols"] = changed
+    state["last_refresh_seconds"] = time.perf_counter() - t0
+    return state["signals"].copy()
+
+
+def live_day_inputs(intraday_path: Path, tx_path: Path):
+    """
+    (df_intraday, agg_tx) من حالة المتابعة لو مطابقة للملفين الآن (الشريط مقروء
+    حتى آخره)، وإلا None. تسمح لأرشيف الإشارات باستخدام نفس القراءة.
+    """
+    if intraday_path is None or tx_path is None:
+        return None
+    intraday_path, tx_path = Path(intraday_path), Path(tx_path)
+    state = _LIVE_SIGNALS.get((str(intraday_path.resolve()), str(tx_path.resolve())))
+    if (state is None or state["intraday_signature"] != _file_signature(intraday_path)
+            or state["tail"]["offset"] != tx_path.stat().st_size):
+        return None
+    return state["df_intraday"], tape_accumulator_frame(state["tail"]["acc"])
+
+
+def live_tape_stats() -> pd.DataFrame:
+    """لكل شريط متابَع: الصفوف المقروءة، الـ offset، وزمن آخر تحديث."""
+    rows = []
+    for state in _LIVE_SIGNALS.values():
+        tail = state["tail"]
+        rows.append({
+            "file": tail["path"].name,
+            "rows": tail["acc"]["rows"],
+            "offset": tail["offset"],
+            "refreshes": state["refreshes"],
+            "last_changed_symbols": state["last_changed_symbols"],
+            "last_refresh_ms": state["last_refresh_seconds"] * 1000,
+        })
+    return pd.DataFrame(rows)
+
+
+# =========================
+# تحليلات الصفقات اللحظية (Order flow) من شريط المعاملات
+# =========================
+# الحساب نفسه فى orderflow.py؛ هنا تجهيز الأعمدة من الشريط وحفظ الناتج كمصفوفات
+# مضغوطة فى cache/ticks/<اسم الملف>.npz حتى تعرضها الصفحات بدون إعادة مسح الشريط.
+
+def _tape_seconds(col: pd.Series) -> np.ndarray:
+    """وقت الصفقة بالثوانى من بداية اليوم ("10:00:01" أو تاريخ ووقت كامل)."""
+    t = pd.to_timedelta(col.astype(str), errors="coerce")
+    if t.notna().any():
+        return t.dt.total_seconds().to_numpy(dtype=float)
+    dt = pd.to_datetime(col, errors="coerce")
+    return (dt - dt.dt.normalize()).dt.total_seconds().to_numpy(dtype=float)
+
+
+def tape_tick_analytics(acc: dict) -> dict:
+    """
+    نفس build_tick_analytics(الشريط كله) من أعمدة الصفقات المحفوظة فى المجمّع
+    (init_tape_accumulator(keep_ticks=True)) بدون إعادة قراءة الملف.
+    """
+    parts = acc["ticks"]
+    cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]} if parts else {
+        k: np.zeros(0) for k in ("codes", "price", "volume", "side_sign", "dir_sign", "seconds", "seq")}
+    # أكواد المجمّع بترتيب الظهور -> ترتيب الرموز مثل factorize(sort=True)
+    order, symbols = pd.factorize(pd.Series(acc["symbols"], dtype=object), sort=True)
+    codes = cols["codes"].astype(np.int64)
+    codes = np.where(codes >= 0, order[np.maximum(codes, 0)] if order.size else -1, -1)
+    sign = cols["dir_sign"] if _tape_uses_direction(acc) else cols["side_sign"]
+
+    result = orderflow.tick_analytics(codes, cols["price"], cols["volume"], sign.astype(float),
+                                      seconds=cols["seconds"], seq=cols["seq"],
+                                      n_symbols=len(symbols))
+    result["symbols"] = np.asarray(symbols, dtype=str)
+    return result
+
+
+def build_tick_analytics(df_tx: pd.DataFrame) -> dict:
+    """مرور واحد على الشريط كله (كل الأسهم) -> dict مصفوفات orderflow + symbols."""
+    codes, symbols = pd.factorize(df_tx["Symbol"], sort=True)
+    # نفس قواعد الشراء/البيع فى aggregate_transactions
+    buy_mask, sell_mask = _trade_side_masks(df_tx)
+    sign = buy_mask.astype(float) - sell_mask.astype(float)
+
+    price = pd.to_numeric(df_tx["Price"], errors="coerce").to_numpy(dtype=float) \
+        if "Price" in df_tx.columns else np.full(len(df_tx), np.nan)
+    seconds = _tape_seconds(df_tx["Time"]) if "Time" in df_tx.columns else None
+    seq = pd.to_numeric(df_tx["Sequence ID"], errors="coerce").to_numpy(dtype=float) \
+        if "Sequence ID" in df_tx.columns else None
+
+    result = orderflow.tick_analytics(codes, price, _numeric_values(df_tx, "Volume"), sign,
+                                      seconds=seconds, seq=seq, n_symbols=len(symbols))
+    result["symbols"] = np.asarray(symbols, dtype=str)
+    return result
+
+
+def _ticks_path(tx_path: Path) -> Path:
+    return TICKS_DIR / f"{Path(tx_path).stem}.npz"
+
+
+TICKS_VERSION = 2
+
+
+def _source_signature(path: Path, version: int) -> np.ndarray:
+    return np.asarray(_file_signature(path) + [version], dtype=np.int64)
+
+
+def _load_npz_cache(path: Path, sig: np.ndarray):
+    """محتوى ملف npz كـ dict لو اتبنى من نفس المصدر (الحجم/mtime/النسخة)، وإلا None."""
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as f:
+            if np.array_equal(f["source_signature"], sig):
+                return {k: f[k] for k in f.files if k != "source_signature"}
+    except Exception:
+        pass
+    return None
+
+
+def _save_npz_cache(path: Path, sig: np.ndarray, arrays: dict):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, source_signature=sig, **arrays)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"⚠️ Could not save {path.name}: {e}")
+
+
+def load_tick_analytics(tx_path: Path) -> dict:
+    """
+    مصفوفات orderflow للملف: من cache/ticks لو الملف لم يتغير، وإلا من حالة المتابعة
+    المشتركة (shared_tape_tail) بقراءة الأسطر الجديدة فقط، ثم حفظها.
+    """
+    tx_path = Path(tx_path)
+    sig = _source_signature(tx_path, TICKS_VERSION)
+    result = _load_npz_cache(_ticks_path(tx_path), sig)
+    if result is None:
+        result = tape_tick_analytics(shared_tape_tail(tx_path)["acc"])
+        _save_npz_cache(_ticks_path(tx_path), sig, result)
+    return result
+
+
+def tick_symbol_index(ticks: dict, symbol: str):
+    """رقم السهم داخل مصفوفات orderflow (None لو مالوش صفقات)."""
+    symbols = ticks["symbols"]
+    i = np.searchsorted(symbols, symbol)
+    return int(i) if i < len(symbols) and symbols[i] == symbol else None
+
+
+def symbol_order_flow(ticks: dict, symbol: str):
+    """(ملخص السهم، صفقاته مرتبة زمنياً، volume profile) أو None لو مالوش صفقات."""
+    if ticks is None:
+        return None
+    i = tick_symbol_index(ticks, str(symbol))
+    if i is None:
+        return None
+    summary = orderflow.summary_table(ticks, ticks["symbols"]).iloc[i]
+    return summary, orderflow.symbol_ticks(ticks, i), orderflow.volume_profile(ticks, i)
+
+
+# =========================
+# شموع الجلسة (1 / 5 / 15 دقيقة) من الشريط
+# =========================
+# كل الفترات لكل الأسهم تُبنى مرة واحدة من صفقات orderflow المرتبة وتُحفظ فى ملف
+# واحد لليوم cache/bars/YYYY-MM-DD.npz (عمود لكل حقل: m5_open, m5_close ...).
+
+BAR_INTERVALS = [1, 5, 15]  # بالدقائق
+BARS_VERSION = 1
+
+
+def _bars_path(tx_path: Path) -> Path:
+    return BARS_DIR / f"{intraday_trading_date(tx_path):%Y-%m-%d}.npz"
+
+
+def build_bars(tx_path: Path, intervals=None) -> dict:
+    """شموع كل الفترات لكل الأسهم من شريط اليوم (مسطحة بمفاتيح m<دقائق>_<حقل>)."""
+    ticks = load_tick_analytics(tx_path)
+    arrays = {"symbols": ticks["symbols"]}
+    for minutes in intervals or BAR_INTERVALS:
+        for field, values in orderflow.bars_from_ticks(ticks, minutes * 60).items():
+            arrays[f"m{minutes}_{field}"] = values
+    return arrays
+
+
+def load_bar_arrays(tx_path: Path) -> dict:
+    """ملف شموع اليوم من cache/bars (أو بناؤه وحفظه لو الشريط اتغير)."""
+    tx_path = Path(tx_path)
+    sig = _source_signature(tx_path, BARS_VERSION)
+    arrays = _load_npz_cache(_bars_path(tx_path), sig)
+    if arrays is None:
+        arrays = build_bars(tx_path)
+        _save_npz_cache(_bars_path(tx_path), sig, arrays)
+        print(f"Built {', '.join(f'{m}m' for m in BAR_INTERVALS)} bars for {tx_path.name}")
+    return arrays
+
+
+def load_bar_set(tx_path: Path, interval: int = 5) -> dict:
+    """
+    مصفوفات شموع فترة interval (دقائق) لكل الأسهم: symbols / bars / day.
+    الفترات خارج BAR_INTERVALS تُحسب مباشرة من صفقات orderflow بدون حفظ.
+    """
+    if interval in BAR_INTERVALS:
+        arrays = load_bar_arrays(tx_path)
+        prefix = f"m{interval}_"
+        bars = {k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)}
+    else:
+        arrays = load_tick_analytics(tx_path)
+        bars = orderflow.bars_from_ticks(arrays, interval * 60)
+    return {"symbols": arrays["symbols"], "bars": bars, "day": intraday_trading_date(tx_path)}
+
+
+def bars_for_symbol(bar_set: dict, symbol: str = None) -> pd.DataFrame:
+    """جدول شموع من load_bar_set: كل الأسهم (symbol=None) أو شريحة سهم واحد."""
+    bars, symbols, day = bar_set["bars"], bar_set["symbols"], bar_set["day"]
+    if symbol is None:
+        return orderflow.bars_frame(bars, symbols, day)
+    i = tick_symbol_index(bar_set, str(symbol))
+    if i is None:
+        return pd.DataFrame(columns=orderflow.BAR_COLUMNS)
+    return orderflow.bars_frame(bars, symbols, day, i)
+
+
+def load_bars(tx_path: Path, interval: int = 5, symbol: str = None) -> pd.DataFrame:
+    """شموع OHLCV + حجم الشراء/البيع لفترة interval (دقائق) لكل الأسهم أو لسهم واحد."""
+    return bars_for_symbol(load_bar_set(tx_path, interval), symbol)
+
+
 # =========================
 # S/R Breakouts helper
 # =========================
 
-def find_sr_breakouts(df_intraday: pd.DataFrame):
+SR_BREAKOUT_COLUMNS = ["Symbol", "S. Description", "Last", "% Change",
+                       "Volume", "Resistance 1 (R1)", "Resistance 2 (R2)",
+                       "Support 1 (S1)", "Support 2 (S2)"]
+
+
+def find_sr_breakouts(df_intraday: pd.DataFrame, levels: dict = None,
+                      method: str = "classic", timeframe: str = "daily"):
     """
     تحديد الأسهم التى:
     - أغلقت فوق R1 أو R2
     - أغلقت تحت S1 أو S2
     نعتمد على Last كسعر الجلسة.
+    levels: ناتج pivot_levels لنفس الإطار (daily_pivots) حتى لا يُعاد الحساب.
+    method / timeframe: أى طريقة من pivots.METHODS وفترة من pivots.TIMEFRAMES
+    (weekly / monthly تحتاج levels محسوبة مع panel الـ CASE).
     """
-    df = add_pivot_levels(df_intraday)
-
-    price = pd.to_numeric(df.get("Last"), errors="coerce")
-    r1 = pd.to_numeric(df.get("Resistance 1 (R1)"), errors="coerce")
-    r2 = pd.to_numeric(df.get("Resistance 2 (R2)"), errors="coerce")
-    s1 = pd.to_numeric(df.get("Support 1 (S1)"), errors="coerce")
-    s2 = pd.to_numeric(df.get("Support 2 (S2)"), errors="coerce")
+    if levels is None:
+        levels = pivot_levels(df_intraday)
+    if (timeframe, method) not in levels["table"]:
+        raise ValueError(f"pivot levels not available for {timeframe}/{method}")
+    table = levels["table"][(timeframe, method)]
+    target = {k: table[pivots.LEVELS.index(k)] for k in PIVOT_COLUMNS}
+    price = levels["last"]
+
+    def _rows(mask, ascending):
+        rows = np.flatnonzero(mask)
+        # ترتيب الصفوف المختارة بـ % Change (نفس ترتيب sort_values للإطار)
+        rows = rows[pd.Series(levels["change"][rows]).sort_values(ascending=ascending).index]
+        data = {}
+        for col in SR_BREAKOUT_COLUMNS:
+            k = next((k for k, c in PIVOT_COLUMNS.items() if c == col), None)
+            if k is not None:
+                data[col] = target[k][rows]
+            elif col in df_intraday.columns:
+                data[col] = df_intraday[col].iloc[rows].to_numpy()
+        return pd.DataFrame(data, index=df_intraday.index[rows])
+
+    with np.errstate(invalid="ignore"):
+        return {
+            "R1_break": _rows(price >= target["r1"], ascending=False),
+            "R2_break": _rows(price >= target["r2"], ascending=False),
+            "S1_break": _rows(price <= target["s1"], ascending=True),
+            "S2_break": _rows(price <= target["s2"], ascending=True),
+        }
 
-    cols_basic = ["Symbol", "S. Description", "Last", "% Change",
-                  "Volume", "Resistance 1 (R1)", "Resistance 2 (R2)",
-                  "Support 1 (S1)", "Support 2 (S2)"]
 
-    r1_break = df[(price >= r1) & r1.notna()][cols_basic]
-    r2_break = df[(price >= r2) & r2.notna()][cols_basic]
-    s1_break = df[(price <= s1) & s1.notna()][cols_basic]
-    s2_break = df[(price <= s2) & s2.notna()][cols_basic]
-
-    return {
-        "R1_break": r1_break.sort_values("% Change", ascending=False),
-        "R2_break": r2_break.sort_values("% Change", ascending=False),
-        "S1_break": s1_break.sort_values("% Change", ascending=True),
-        "S2_break": s2_break.sort_values("% Change", ascending=True),
-    }
+# =========================
+# أرشيف أحداث الاختراق التاريخية (R1 / R2 / S1 / S2 على تاريخ CASE)
+# =========================
+# كل صفوف مخزن CASE مرة واحدة (pivots.session_breakouts): Pivot الكلاسيكى من الجلسة
+# السابقة لكل سهم، والحدث = إغلاق فوق المقاومة أو تحت الدعم + عائد 1 / 3 / 5 جلسات.
+# الجدول وملخص النجاح لكل (سهم، نوع) يُحفظان فى cache/breakouts ويُعادان فقط لو
+# مخزن CASE اتغير. النجاح = استمرار الحركة فى اتجاه الاختراق (صعود بعد R، هبوط بعد S).
+
+BREAKOUT_EVENT_COLUMNS = ["Symbol", "Date", "Type", "Close", "Level",
+                          *(f"Ret_{h}d" for h in pivots.FOLLOW_THROUGH)]
+
+
+def build_breakout_events(method: str = "classic") -> pd.DataFrame:
+    """جدول كل أحداث الاختراق بـ MultiIndex (Symbol, Date) مرتب."""
+    store = ensure_case_store()
+    names = sorted(store["symbols"], key=lambda s: store["symbols"][s][0])
+    bounds = np.array([store["symbols"][s][:2] for s in names]).reshape(-1, 2)
+    segment = np.repeat(np.arange(len(names)), bounds[:, 1] - bounds[:, 0])
+
+    values = store["values"]
+    close = np.asarray(values[CASE_NUMERIC_COLUMNS.index("Closed")])
+    ev = pivots.session_breakouts(np.asarray(values[CASE_NUMERIC_COLUMNS.index("High")]),
+                                  np.asarray(values[CASE_NUMERIC_COLUMNS.index("Low")]),
+                                  close, segment, method)
+    dates = np.asarray(store["dates"])[ev["row"]]
+    keep = ~np.isnat(dates)
+
+    events = pd.DataFrame({
+        "Symbol": np.asarray(names, dtype=object)[segment[ev["row"]]][keep],
+        "Date": pd.to_datetime(dates[keep]),
+        "Type": np.array([t.upper() for t in pivots.BREAK_TYPES], dtype=object)[ev["type"][keep]],
+        "Close": close[ev["row"]][keep],
+        "Level": ev["level"][keep],
+        **{f"Ret_{h}d": ev[f"fwd_{h}"][keep] for h in pivots.FOLLOW_THROUGH},
+    }, columns=BREAKOUT_EVENT_COLUMNS)
+    return events.set_index(["Symbol", "Date"]).sort_index()
+
+
+def breakout_stats(events: pd.DataFrame) -> pd.DataFrame:
+    """لكل (Symbol, Type): عدد الأحداث، نسبة النجاح ومتوسط العائد لكل horizon."""
+    df = events.reset_index()
+    direction = np.where(df["Type"].str.startswith("R"), 1.0, -1.0)
+    agg = {"Events": ("Type", "size")}
+    for h in pivots.FOLLOW_THROUGH:
+        ret = df[f"Ret_{h}d"]
+        df[f"Hit_{h}d"] = np.where(ret.isna(), np.nan, (ret * direction > 0).astype(float))
+        agg[f"Hit_{h}d"] = (f"Hit_{h}d", "mean")
+        agg[f"Avg_Ret_{h}d"] = (f"Ret_{h}d", "mean")
+    agg["Last_Date"] = ("Date", "max")
+    return df.groupby(["Symbol", "Type"]).agg(**agg).sort_index()
+
+
+def load_breakout_history(force: bool = False):
+    """
+    (events, stats) من cache/breakouts لو مطابقة لمخزن CASE الحالى، وإلا حسابها وحفظها.
+    """
+    store_index = CASE_STORE_DIR / "index.json"
+    ensure_case_store()
+    sig = _file_signature(store_index)
+    paths = BREAKOUTS_DIR / "events.pkl", BREAKOUTS_DIR / "stats.pkl"
+    if not force and all(p.exists() for p in paths):
+        try:
+            events, stats = (pd.read_pickle(p) for p in paths)
+            if events.attrs.get("source_signature") == sig == stats.attrs.get("source_signature"):
+                return events, stats
+        except Exception as e:
+            print(f"⚠️ Could not read breakout history: {e}")
+
+    events = build_breakout_events()
+    stats = breakout_stats(events)
+    try:
+        BREAKOUTS_DIR.mkdir(parents=True, exist_ok=True)
+        for df, path in zip((events, stats), paths):
+            df.attrs["source_signature"] = sig
+            tmp = path.with_name(path.name + ".tmp")
+            df.to_pickle(tmp)
+            os.replace(tmp, path)
+    except Exception as e:
+        print(f"⚠️ Could not save breakout history: {e}")
+    print(f"Breakout history: {len(events):,} events for {stats.index.get_level_values(0).nunique()} symbols.")
+    return events, stats
+
+
+def symbol_breakouts(events: pd.DataFrame, symbol: str, last: int = None) -> pd.DataFrame:
+    """أحداث سهم واحد (من الـ index مباشرة) مرتبة زمنياً."""
+    symbol = str(symbol)
+    if symbol not in events.index.get_level_values("Symbol"):
+        return events.iloc[:0].reset_index()
+    hist = events.xs(symbol, level="Symbol", drop_level=False).reset_index()
+    return hist if last is None else hist.tail(last).reset_index(drop=True)
+
+
+def attach_breakout_stats(breakouts: dict, stats: pd.DataFrame, horizon: int = 5) -> dict:
+    """إضافة Hist_Events / Hit_{h}d / Avg_Ret_{h}d لكل جدول من find_sr_breakouts بنفس النوع."""
+    out = {}
+    cols = {"Events": "Hist_Events", f"Hit_{horizon}d": f"Hit_{horizon}d",
+            f"Avg_Ret_{horizon}d": f"Avg_Ret_{horizon}d"}
+    for key, df in breakouts.items():
+        kind = key.split("_")[0]
+        idx = pd.MultiIndex.from_arrays([df["Symbol"].astype(str), np.full(len(df), kind)])
+        hist = stats.reindex(idx)[list(cols)].rename(columns=cols)
+        out[key] = pd.concat([df, hist.set_axis(df.index)], axis=1)
+    return out
 
 
 # =========================
@@ -522,85 +2420,187 @@ def build_t0_t1_candidates(signals: pd.DataFrame, top_n: int = 5) -> pd.DataFram
 # علاقات الأسهم من CASE (Correlation)
 # =========================
 
+def _corr_stats_path(window) -> Path:
+    return CORR_DIR / f"stats_{window or 'all'}.npz"
+
+
+# ما نحفظه لكل سهم مع الإحصائيات للتأكد أن تاريخه المحسوب لم يتغير بدون قراءة الـ panel:
+#   n_rows: عدد صفوفه فى المخزن، csv_sig: [size, mtime_ns] لملفه، last_close: إغلاق آخر صف،
+#   prev_close: آخر إغلاق صالح (بداية عائد أول يوم جديد)، close_sum: مجموع الإغلاقات.
+_CORR_STATS_KEYS = ("n", "sx", "sxx", "sxy")
+
+
+def _corr_symbol_meta(store: dict, symbols) -> dict:
+    close = store["values"][store["columns"].index("Closed")]
+    n_rows, csv_sig, last_close, prev_close, close_sum = [], [], [], [], []
+    for sym in symbols:
+        start, stop, *sig = store["symbols"][sym]
+        c = np.asarray(close[start:stop], dtype=float)
+        valid = c[~np.isnan(c)]
+        n_rows.append(stop - start)
+        csv_sig.append(sig)
+        last_close.append(c[-1] if len(c) else np.nan)
+        prev_close.append(valid[-1] if len(valid) else np.nan)
+        close_sum.append(valid.sum())
+    return {"n_rows": np.array(n_rows, dtype=np.int64),
+            "csv_sig": np.array(csv_sig, dtype=np.int64).reshape(len(symbols), 2),
+            "last_close": np.array(last_close), "prev_close": np.array(prev_close),
+            "close_sum": np.array(close_sum)}
+
+
+def _save_corr_stats(path: Path, cached: dict):
+    CORR_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, symbols=np.array(cached["symbols"]),
+             through_date=np.array(cached["through_date"], dtype="datetime64[D]"),
+             tail=cached["tail"], **cached["stats"], **cached["meta"])
+    os.replace(tmp, path)
+
+
+def _update_corr_stats(data, store: dict, symbols, window) -> dict:
+    """
+    تحديث الإحصائيات المحفوظة بصفوف المخزن بعد through_date فقط.
+    يرجع None لو التاريخ المحسوب اتغير (صف مستبدل / ملف اتقرأ من جديد بقيم مختلفة /
+    صفوف جديدة بتاريخ قديم)، وساعتها نعيد الحساب بالكامل.
+    """
+    # ملف بصيغة أقدم (بدون بيانات الأسهم) = إعادة حساب
+    if "n_rows" not in data.files or data["symbols"].tolist() != symbols:
+        return None
+    through = data["through_date"].astype("datetime64[D]")
+    n_saved = data["n_rows"]
+    entries = np.array([store["symbols"][s] for s in symbols], dtype=np.int64).reshape(-1, 4)
+    start, stop = entries[:, 0], entries[:, 1]
+    if (stop - start < n_saved).any():
+        return None
+
+    close = store["values"][store["columns"].index("Closed")]
+    has = n_saved > 0
+    if not np.array_equal(np.asarray(close[(start + n_saved - 1)[has]]), data["last_close"][has],
+                          equal_nan=True):
+        return None
+    # ملف CSV اتغير (المخزن أعاد قراءته): تاريخه المحسوب لازم يفضل كما هو
+    for j in np.flatnonzero((entries[:, 2:] != data["csv_sig"]).any(axis=1)):
+        old_rows = np.asarray(close[start[j]:start[j] + n_saved[j]])
+        if not np.isclose(np.nansum(old_rows), data["close_sum"][j]):
+            return None
+
+    view = dict(store, symbols={s: [int(start[j] + n_saved[j]), int(stop[j])]
+                                for j, s in enumerate(symbols)})
+    new = _panel_from_store(view, symbols, align="date")
+    if len(new["dates"]) and new["dates"][0] <= through:
+        return None
+
+    meta = {k: data[k] for k in ("n_rows", "csv_sig", "last_close", "prev_close", "close_sum")}
+    meta["n_rows"], meta["csv_sig"] = stop - start, entries[:, 2:]
+    stats = {k: data[k] for k in _CORR_STATS_KEYS}
+    tail = data["tail"]
+    if len(new["dates"]):
+        prices = np.vstack([meta["prev_close"][None, :], new["close"]])
+        new_returns = correlation.returns_from_prices(prices)[1:]
+        leaving = None
+        if window is not None:
+            tail = np.vstack([tail, new_returns])
+            leaving, tail = tail[:max(0, len(tail) - window)], tail[-window:]
+        correlation.update_corr_stats(stats, new_returns, leaving)
+
+        valid = ~np.isnan(new["close"])
+        last_idx = len(new["dates"]) - 1 - np.argmax(valid[::-1], axis=0)
+        last_valid = new["close"][last_idx, np.arange(len(symbols))]
+        meta["prev_close"] = np.where(valid.any(axis=0), last_valid, meta["prev_close"])
+        meta["close_sum"] = meta["close_sum"] + np.nansum(new["close"], axis=0)
+        through = new["dates"][-1]
+    meta["last_close"] = np.where(stop > start, np.asarray(close[np.maximum(stop - 1, 0)]), np.nan)
+    return {"symbols": symbols, "through_date": through, "stats": stats, "tail": tail, "meta": meta}
+
+
+def load_correlation_stats(window: int = None) -> dict:
+    """
+    الإحصائيات الكافية للارتباط لكل أسهم CASE (كل التاريخ أو آخر window يوم).
+    - محفوظة فى cache/correlation/stats_<window>.npz مع آخر تاريخ محسوب، ومعها لكل سهم
+      عدد صفوفه وتوقيع ملفه وإغلاق آخر صف (بدل إعادة تحميل الـ panel للمقارنة).
+    - الصفوف الجديدة فى المخزن فقط تُقرأ وتُضاف (وتُحذف الأيام الخارجة من النافذة
+      من آخر window عائد محفوظة).
+    - لو التاريخ القديم اتغير أو الأسهم اتغيرت نعيد الحساب بالكامل.
+    يرجع dict: symbols, through_date, stats.
+    """
+    store = ensure_case_store()
+    symbols = sorted(store["symbols"])
+    path = _corr_stats_path(window)
+
+    cached = None
+    if path.exists():
+        try:
+            with np.load(path) as data:
+                cached = _update_corr_stats(data, store, symbols, window)
+                unchanged = cached is not None and all(
+                    np.array_equal(cached["meta"][k], data[k], equal_nan=True) for k in cached["meta"])
+        except Exception as e:
+            print(f"⚠️ Could not read correlation cache {path.name}: {e}")
+            cached = None
+        if cached is not None and unchanged:
+            return {k: cached[k] for k in ("symbols", "through_date", "stats")}
+
+    if cached is None:
+        panel = _panel_from_store(store, symbols, align="date")
+        returns = correlation.returns_from_prices(panel["close"])
+        rows = returns if window is None else returns[-window:]
+        cached = {"symbols": symbols,
+                  "through_date": panel["dates"][-1] if len(panel["dates"]) else np.datetime64("NaT"),
+                  "stats": correlation.corr_stats(rows),
+                  "tail": rows if window is not None else np.empty((0, len(symbols))),
+                  "meta": _corr_symbol_meta(store, symbols)}
+
+    try:
+        _save_corr_stats(path, cached)
+    except Exception as e:
+        print(f"⚠️ Could not save correlation cache: {e}")
+    return {k: cached[k] for k in ("symbols", "through_date", "stats")}
+
+
 def build_stock_relationships(
     intraday_df: pd.DataFrame,
     min_days: int = 60,
     min_abs_corr: float = 0.7,
-    top_n: int = 40
+    top_n: int = None,
+    window: int = None
 ) -> pd.DataFrame:
     """
     حساب علاقات (Correlation) بين عوائد الأسهم المعروضة فى جلسة اليوم
-    اعتماداً على بيانات CASE (إغلاق يومى).
-    - نختار top_n أسهم من حيث حجم التداول فى intraday
-    - نحسب العائد اليومى (نسبة التغير) لكل سهم
-    - نبنى مصفوفة ارتباط
+    اعتماداً على بيانات CASE (إغلاق يومى) لكل السوق.
+    - top_n: أعلى أسهم من حيث حجم التداول فى intraday (None = كل الأسهم)
+    - window: آخر 60/120/250 يوم أو None لكل التاريخ
+    - الارتباط من الإحصائيات الكافية المحفوظة (تُحدّث يومياً بدون إعادة حساب)
+    - الارتباط لكل زوج على الأيام المشتركة فقط بشرط min_days يوم على الأقل
+      (فى النوافذ القصيرة الحد لا يزيد عن 75% من طول النافذة)
     - نخرج الأزواج ذات |corr| >= min_abs_corr
     """
     if intraday_df is None or intraday_df.empty:
-        return pd.DataFrame(columns=["Symbol_A", "Symbol_B", "Corr", "Relation"])
+        return pd.DataFrame(columns=correlation.PAIR_COLUMNS)
 
     df_intra = intraday_df.copy()
     if "Volume" in df_intra.columns:
         df_intra["Volume"] = pd.to_numeric(df_intra["Volume"], errors="coerce").fillna(0)
         df_intra = df_intra.sort_values("Volume", ascending=False)
     symbols = df_intra["Symbol"].astype(str).dropna().unique().tolist()
-    symbols = symbols[:top_n]
-
-    returns_dict = {}
-    for sym in symbols:
-        try:
-            df_case = load_case(sym)
-            if df_case.empty:
-                continue
-            df_case = df_case.sort_values("Date")
-            if "Closed" in df_case.columns:
-                close = pd.to_numeric(df_case["Closed"], errors="coerce")
-            elif "Close" in df_case.columns:
-                close = pd.to_numeric(df_case["Close"], errors="coerce")
-            else:
-                continue
-            ret = close.pct_change()
-            ret.name = sym
-            returns_dict[sym] = ret
-        except FileNotFoundError:
-            continue
-        except Exception:
-            continue
-
-    if not returns_dict:
-        return pd.DataFrame(columns=["Symbol_A", "Symbol_B", "Corr", "Relation"])
-
-    # دمج كل السلاسل على تاريخ مشترك
-    returns_df = pd.concat(returns_dict.values(), axis=1, join="inner").dropna(how="all")
-    if len(returns_df) < min_days:
-        # لو البيانات قليلة جدًا
-        return pd.DataFrame(columns=["Symbol_A", "Symbol_B", "Corr", "Relation"])
-
-    corr_mat = returns_df.corr()
-
-    rows = []
-    syms = corr_mat.columns.tolist()
-    for i in range(len(syms)):
-        for j in range(i + 1, len(syms)):
-            a = syms[i]
-            b = syms[j]
-            c = corr_mat.loc[a, b]
-            if pd.isna(c):
-                continue
-            if abs(c) >= min_abs_corr:
-                rel = "Positive" if c > 0 else "Negative"
-                rows.append({"Symbol_A": a, "Symbol_B": b, "Corr": float(c), "Relation": rel})
-
-    if not rows:
-        return pd.DataFrame(columns=["Symbol_A", "Symbol_B", "Corr", "Relation"])
-
-    rel_df = pd.DataFrame(rows)
-    rel_df["AbsCorr"] = rel_df["Corr"].abs()
-    rel_df = rel_df.sort_values("AbsCorr", ascending=False)
-
-    # نعيد فقط أعمدة العرض
-    rel_df = rel_df[["Symbol_A", "Symbol_B", "Corr", "Relation"]]
-    return rel_df
+    if top_n is not None:
+        symbols = symbols[:top_n]
+
+    try:
+        cached = load_correlation_stats(window)
+    except Exception as e:
+        print(f"⚠️ Could not load CASE correlation stats: {e}")
+        return pd.DataFrame(columns=correlation.PAIR_COLUMNS)
+
+    pos = {s: j for j, s in enumerate(cached["symbols"])}
+    symbols = [s for s in symbols if s in pos]
+    if not symbols:
+        return pd.DataFrame(columns=correlation.PAIR_COLUMNS)
+
+    min_overlap = min_days if window is None else min(min_days, int(0.75 * window))
+    corr = correlation.corr_from_stats(
+        cached["stats"], np.array([pos[s] for s in symbols]), min_overlap=min_overlap
+    )
+    return correlation.pairs_from_corr(corr, symbols, min_abs_corr=min_abs_corr)
 
 
 # =========================
@@ -626,3 +2626,529 @@ def filter_group_picks(signals: pd.DataFrame, symbols_list) -> pd.DataFrame:
 
     df = df.sort_values("AI_Prob", ascending=False)
     return df[cols_show]
+
+
+# =========================
+# شاشة السوق (Screener) من لقطة مؤشرات محفوظة
+# =========================
+
+TREND_LABELS = ["اتجاه صاعد", "اتجاه هابط", "تذبذب / تجميع", "غير محدد"]
+RSI_ZONES = ["تشبّع بيع (Oversold)", "منطقة حيادية", "تشبّع شراء (Overbought)", "غير متاح"]
+VOLATILITY_LABELS = ["تذبذب منخفض", "تذبذب متوسط", "تذبذب مرتفع", "غير متاح"]
+BREAKOUT_STATES = ["R2_break", "R1_break", "Inside", "S1_break", "S2_break", "غير متاح"]
+
+
+def intraday_trading_date(path: Path):
+    """تاريخ الجلسة من اسم ملف intraday (مثل 14-1-2026.xlsx)، وإلا من تاريخ التعديل."""
+    path = Path(path)
+    date = pd.to_datetime(path.stem, format="%d-%m-%Y", errors="coerce")
+    if pd.isna(date):
+        date = pd.Timestamp(path.stat().st_mtime, unit="s")
+    return date.normalize()
+
+
+def classify_trend(price, ma20, ma50) -> np.ndarray:
+    """نفس قواعد صفحة Technical View: السعر مقابل MA20 / MA50 (متجهة)."""
+    price, ma20, ma50 = (np.asarray(x, dtype=float) for x in (price, ma20, ma50))
+    known = ~(np.isnan(price) | np.isnan(ma20) | np.isnan(ma50))
+    return np.select(
+        [~known, (price > ma20) & (ma20 > ma50), (price < ma20) & (ma20 < ma50)],
+        ["غير محدد", "اتجاه صاعد", "اتجاه هابط"],
+        default="تذبذب / تجميع",
+    )
+
+
+def classify_rsi(rsi_values) -> np.ndarray:
+    rsi_values = np.asarray(rsi_values, dtype=float)
+    return np.select(
+        [np.isnan(rsi_values), rsi_values < 30, rsi_values > 70],
+        ["غير متاح", "تشبّع بيع (Oversold)", "تشبّع شراء (Overbought)"],
+        default="منطقة حيادية",
+    )
+
+
+def classify_volatility(rng) -> np.ndarray:
+    rng = np.asarray(rng, dtype=float)
+    return np.select(
+        [np.isnan(rng), rng < 1, rng < 3],
+        ["غير متاح", "تذبذب منخفض", "تذبذب متوسط"],
+        default="تذبذب مرتفع",
+    )
+
+
+def classify_breakout(df_pivots: pd.DataFrame) -> np.ndarray:
+    """حالة الاختراق لكل سهم (R2 ثم R1 ثم S2 ثم S1) بنفس منطق find_sr_breakouts."""
+    price = pd.to_numeric(df_pivots.get("Last"), errors="coerce").to_numpy(dtype=float)
+    levels = {k: pd.to_numeric(df_pivots.get(c), errors="coerce").to_numpy(dtype=float)
+              for k, c in [("r1", "Resistance 1 (R1)"), ("r2", "Resistance 2 (R2)"),
+                           ("s1", "Support 1 (S1)"), ("s2", "Support 2 (S2)")]}
+    with np.errstate(invalid="ignore"):
+        return np.select(
+            [np.isnan(price),
+             price >= levels["r2"], price >= levels["r1"],
+             price <= levels["s2"], price <= levels["s1"]],
+            ["غير متاح", "R2_break", "R1_break", "S2_break", "S1_break"],
+            default="Inside",
+        )
+
+
+def build_screener_snapshot(df_intraday: pd.DataFrame) -> pd.DataFrame:
+    """
+    لقطة مؤشرات لكل أسهم الجلسة: بيانات intraday + مؤشرات CASE (من المحرك المتجه)
+    + تصنيفات الاتجاه / RSI / التذبذب / الاختراق.
+    """
+    # add_pivot_levels قد يرجع نفس إطار الكاش، فـ assign (نسخة) بدل الكتابة فيه
+    df = add_pivot_levels(df_intraday).assign(Symbol=lambda d: d["Symbol"].astype(str))
+    df = df[~df["Symbol"].isin(INDEX_SYMBOLS)].drop_duplicates("Symbol")
+
+    keep = ["Symbol", "S. Description", "Sector", "Last", "% Change", "Volume", "Range",
+            "Pivot Point", "Resistance 1 (R1)", "Resistance 2 (R2)",
+            "Support 1 (S1)", "Support 2 (S2)"]
+    snap = df[[c for c in keep if c in df.columns]].copy()
+    if "Range" not in snap.columns:
+        snap["Range"] = np.nan
+
+    tech = market_technicals(snap["Symbol"].tolist())
+    tech = tech.drop(columns=["Close"]).rename(columns={"Date": "Case_Date"})
+    snap = snap.merge(tech, on="Symbol", how="left")
+
+    snap["Trend"] = classify_trend(snap["Last"], snap["MA20"], snap["MA50"])
+    snap["RSI_Zone"] = classify_rsi(snap["RSI14"])
+    snap["Volatility"] = classify_volatility(snap["Range"])
+    snap["Breakout"] = classify_breakout(snap)
+    return snap.reset_index(drop=True)
+
+
+def load_screener_snapshot(intraday_path: Path, df_intraday: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    قراءة لقطة الـ Screener المحفوظة لتاريخ الجلسة (cache/screener/YYYY-MM-DD.pkl)،
+    أو بناؤها وحفظها لو غير موجودة أو أقدم من ملف intraday / مخزن CASE.
+    """
+    intraday_path = Path(intraday_path)
+    date = intraday_trading_date(intraday_path)
+    snap_path = SCREENER_DIR / f"{date:%Y-%m-%d}.pkl"
+
+    if snap_path.exists():
+        snap_mtime = snap_path.stat().st_mtime
+        store_index = CASE_STORE_DIR / "index.json"
+        fresh = snap_mtime >= intraday_path.stat().st_mtime and (
+            not store_index.exists() or snap_mtime >= store_index.stat().st_mtime
+        )
+        if fresh:
+            try:
+                return pd.read_pickle(snap_path)
+            except Exception as e:
+                print(f"⚠️ Could not read screener snapshot {snap_path.name}: {e}")
+
+    if df_intraday is None:
+        df_intraday = load_intraday(intraday_path)
+    snap = build_screener_snapshot(df_intraday)
+    snap.insert(0, "Trading_Date", date)
+
+    try:
+        SCREENER_DIR.mkdir(parents=True, exist_ok=True)
+        snap.to_pickle(snap_path)
+    except Exception as e:
+        print(f"⚠️ Could not save screener snapshot: {e}")
+    return snap
+
+
+# =========================
+# أرشيف الإشارات متعدد الأيام
+# =========================
+# لكل يوم له ملف intraday (ومعه ملف معاملات بنفس الاسم لو موجود) نبنى جدول الإشارات
+# كاملاً (intraday + ملخص الشريط + AI_Prob + مستويات Pivot) ونحفظه كجزء مستقل
+# cache/signals/YYYY-MM-DD.pkl. الفهرس index.json يحفظ توقيع ملفات المصدر لكل يوم،
+# فإعادة التشغيل تبنى الأيام الجديدة/المتغيرة فقط، والاستعلام لا يقرأ ملفات المصدر أبداً.
+
+def _signals_archive_index() -> dict:
+    path = SIGNALS_DIR / "index.json"
+    if not path.exists():
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _signal_day_sources() -> dict:
+    """{YYYY-MM-DD: (ملف intraday، ملف المعاملات أو None)} لكل الأيام المتاحة."""
+    days = {}
+    for path in sorted(INTRADAY_DIR.glob("*.xlsx")):
+        if path.name.startswith(("~$", "-$")):
+            continue
+        tx_path = TRANSACTION_DIR / f"{path.stem}.csv"
+        days[f"{intraday_trading_date(path):%Y-%m-%d}"] = (path, tx_path if tx_path.exists() else None)
+    return days
+
+
+def build_day_signals(intraday_path: Path, tx_path: Path = None,
+                      df_intraday: pd.DataFrame = None, agg_tx: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    جدول إشارات يوم واحد (بدون ملف معاملات تبقى أعمدة الشريط فارغة).
+    df_intraday / agg_tx: نفس معنى build_signals_for_day (بدون إعادة قراءة الملفات).
+    """
+    if agg_tx is None and tx_path is None:
+        agg_tx = pd.DataFrame(columns=AGG_COLUMNS).astype({c: float for c in AGG_COLUMNS[1:-1]})
+    # نفس تقييم الجلسة المباشرة (score_signals) حتى يطابق AI_Prob المؤرشف المعروض
+    date = intraday_trading_date(intraday_path)
+    signals = score_signals(build_signals_for_day(intraday_path, tx_path,
+                                                  df_intraday=df_intraday, agg_tx=agg_tx), date)
+    signals.insert(0, "Date", date)
+    return signals
+
+
+def _open_session_day(days: dict):
+    """أحدث يوم فى intraday/ = الجلسة المفتوحة (ملفاتها ليست نهائية حتى close_session)."""
+    return max(days) if days else None
+
+
+def build_signals_archive(force: bool = False, include_open: bool = False) -> dict:
+    """
+    بناء/تحديث أرشيف الإشارات لكل الأيام المتاحة فى intraday/.
+    الجلسة المفتوحة (أحدث يوم) لا تُؤرشف إلا مع include_open=True (close_session)،
+    ولو كانت مؤرشفة من قبل يبقى سجلها كما هو.
+    يرجع الفهرس {YYYY-MM-DD: {"sources": [...], "rows": n}}.
+    """
+    old_index = _signals_archive_index()
+    old = {} if force else old_index
+    index, built = {}, 0
+
+    days = _signal_day_sources()
+    open_day = None if include_open else _open_session_day(days)
+    # النموذج جزء من المصادر: تغييره يعيد تقييم AI_Prob لكل الأيام
+    model_path = MODEL_PATH if MODEL_PATH.exists() else None
+    for day, (intraday_path, tx_path) in days.items():
+        sources = [[p.name, *_file_signature(p)] for p in (intraday_path, tx_path, model_path)
+                   if p is not None]
+        part = SIGNALS_DIR / f"{day}.pkl"
+        if day == open_day:
+            if day in old_index and part.exists():
+                index[day] = old_index[day]
+            continue
+        if old.get(day, {}).get("sources") == sources and part.exists():
+            index[day] = old[day]
+            continue
+
+        try:
+            # يوم الجلسة المتابَعة حالياً: نفس الملفات المقروءة فى live_signals
+            live = live_day_inputs(intraday_path, tx_path)
+            df_intraday, agg_tx = live if live is not None else (None, None)
+            signals = build_day_signals(intraday_path, tx_path, df_intraday, agg_tx)
+        except Exception as e:
+            print(f"⚠️ Could not build signals for {day}: {e}")
+            continue
+        SIGNALS_DIR.mkdir(parents=True, exist_ok=True)
+        signals.to_pickle(part)
+        index[day] = {"sources": sources, "rows": len(signals)}
+        built += 1
+
+    if built or index != old_index:
+        SIGNALS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(SIGNALS_DIR / "index.json", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        print(f"Signals archive: {len(index)} days ({built} built, {len(index) - built} reused)")
+    return index
+
+
+def load_signals_archive() -> pd.DataFrame:
+    """كل أيام الأرشيف فى جدول واحد بـ MultiIndex (Date, Symbol) مرتب."""
+    index = _signals_archive_index()
+    parts = []
+    for day in sorted(index):
+        try:
+            parts.append(pd.read_pickle(SIGNALS_DIR / f"{day}.pkl"))
+        except Exception as e:
+            print(f"⚠️ Could not read signals for {day}: {e}")
+    if not parts:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=["Date", "Symbol"]))
+    archive = pd.concat(parts, ignore_index=True)
+    archive["Symbol"] = archive["Symbol"].astype(str)
+    return archive.set_index(["Date", "Symbol"]).sort_index()
+
+
+def signals_on(archive: pd.DataFrame, date) -> pd.DataFrame:
+    """كل الأسهم فى يوم واحد."""
+    date = pd.Timestamp(date).normalize()
+    if date not in archive.index.get_level_values("Date"):
+        return archive.iloc[:0].reset_index()
+    return archive.xs(date, level="Date", drop_level=False).reset_index()
+
+
+def symbol_history(archive: pd.DataFrame, symbol: str, days: int = None) -> pd.DataFrame:
+    """سهم واحد على آخر days يوم فى الأرشيف (الكل لو None)."""
+    symbols = archive.index.get_level_values("Symbol")
+    hist = archive[symbols == str(symbol)].reset_index()
+    return hist if days is None else hist.tail(days).reset_index(drop=True)
+
+
+# =========================
+# فهرس البحث عن الأسهم (symbols_master + أسماء ملف الجلسة)
+# =========================
+
+def load_symbols_master(path: Path = None) -> pd.DataFrame:
+    """جدول الرموز الرئيسى (Symbol / S. Description / Sector)، أو جدول فاضى لو غير متاح."""
+    path = path or SYMBOLS_MASTER_PATH
+    try:
+        df = read_xlsx_streaming(path)
+    except Exception as e:
+        print(f"⚠️ symbols master unavailable ({path.name}): {e}")
+        return pd.DataFrame(columns=["Symbol", "S. Description", "Sector"])
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def build_symbol_search(df_intraday: pd.DataFrame, master: pd.DataFrame = None) -> dict:
+    """
+    فهرس symbol_index لأسهم ملف الجلسة: الأسماء من symbols_master (أولاً) ثم
+    S. Description من الملف، والقطاع من symbols_master.
+    """
+    if master is None:
+        master = load_symbols_master()
+
+    master_names, master_sectors = {}, {}
+    if "Symbol" in master.columns:
+        m_symbols = master["Symbol"].astype(str).str.strip().to_numpy()
+        empty = [None] * len(m_symbols)
+        m_names = master["S. Description"].to_numpy() if "S. Description" in master.columns else empty
+        m_sectors = master["Sector"].to_numpy() if "Sector" in master.columns else empty
+        for sym, name, sector in zip(m_symbols, m_names, m_sectors):
+            master_names.setdefault(sym, []).append(name)
+            master_sectors.setdefault(sym, sector)
+
+    symbols = df_intraday["Symbol"].astype(str).str.strip().to_numpy()
+    if "S. Description" in df_intraday.columns:
+        descriptions = df_intraday["S. Description"].to_numpy()
+    else:
+        descriptions = [None] * len(symbols)
+
+    records = [
+        (sym, master_names.get(sym, []) + [desc], master_sectors.get(sym))
+        for sym, desc in zip(symbols, descriptions)
+    ]
+    return symbol_index.build_index(records)
+
+
+# =========================
+# طبقة الوصول للبيانات اليومية (Lazy + mtime)
+# =========================
+# كل dataset يُحمّل عند أول طلب فقط، ويُحفظ فى الذاكرة مع (path, size, mtime)
+# لملفاته المصدر. أى ملف أحدث فى intraday/ أو transaction/ أو تعديل نفس الملف
+# يلغى النسخة المحفوظة تلقائياً. DATASET_STATS يسجل hits / misses / زمن التحميل.
+
+_DATASET_CACHE = {}
+DATASET_STATS = {}
+
+
+def get_latest_file(folder: Path, pattern: str):
+    """أحدث ملف (حسب mtime) فى المجلد مع تجاهل ملفات Excel المؤقتة."""
+    if not folder.exists():
+        return None
+    files = [f for f in folder.glob(pattern) if not f.name.startswith(("~$", "-$"))]
+    if not files:
+        return None
+    return max(files, key=lambda f: f.stat().st_mtime)
+
+
+def latest_daily_paths():
+    """(أحدث ملف intraday، أحدث ملف معاملات)."""
+    return get_latest_file(INTRADAY_DIR, "*.xlsx"), get_latest_file(TRANSACTION_DIR, "*.csv")
+
+
+def cached_dataset(kind: str, sources, loader, key_extra=None):
+    """
+    إرجاع ناتج loader() من الذاكرة طالما ملفات sources لم تتغير، وإلا إعادة التحميل.
+    kind: اسم الـ dataset فى الإحصائيات (intraday / transactions / signals ...).
+    القيمة المرجعة هى نفس الكائن المحفوظ لكل المستدعين: لا تُعدّل فى مكانها (انسخ أولاً).
+    """
+    sources = [Path(p) for p in sources if p is not None]
+    signature = tuple((str(p), *_file_signature(p)) for p in sources if p.exists())
+    key = (kind, tuple(str(p) for p in sources), key_extra)
+    stats = DATASET_STATS.setdefault(kind, {"hits": 0, "misses": 0, "loads": 0,
+                                            "load_seconds": 0.0, "last_load_seconds": 0.0})
+
+    cached = _DATASET_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        stats["hits"] += 1
+        return cached[1]
+
+    stats["misses"] += 1
+    t0 = time.perf_counter()
+    value = loader()
+    elapsed = time.perf_counter() - t0
+    stats["loads"] += 1
+    stats["load_seconds"] += elapsed
+    stats["last_load_seconds"] = elapsed
+
+    # التوقيع بعد التحميل لأن بعض الـ loaders تحدّث مصادرها (مثل مخزن CASE)
+    signature = tuple((str(p), *_file_signature(p)) for p in sources if p.exists())
+    _DATASET_CACHE[key] = (signature, value)
+    return value
+
+
+def dataset_stats() -> pd.DataFrame:
+    """جدول hits / misses / زمن التحميل لكل dataset."""
+    if not DATASET_STATS:
+        return pd.DataFrame(columns=["dataset", "hits", "misses", "loads",
+                                     "load_seconds", "last_load_seconds"])
+    df = pd.DataFrame.from_dict(DATASET_STATS, orient="index")
+    df.index.name = "dataset"
+    return df.reset_index()
+
+
+def clear_dataset_cache():
+    _DATASET_CACHE.clear()
+
+
+def daily_intraday(intraday_path: Path = None):
+    """ملف الجلسة (intraday) لأحدث ملف أو للمسار المحدد."""
+    if intraday_path is None:
+        intraday_path = latest_daily_paths()[0]
+    if intraday_path is None:
+        return None
+    return cached_dataset("intraday", [intraday_path], lambda: load_intraday(intraday_path))
+
+
+def daily_pivots(intraday_path: Path = None):
+    """
+    مستويات Pivot كمصفوفات لملف الجلسة (pivot_levels) بكل الطرق: اليومى من الملف
+    والأسبوعى/الشهرى من مخزن CASE. تُحسب مرة واحدة لكل ملف/تحديث للمخزن.
+    """
+    if intraday_path is None:
+        intraday_path = latest_daily_paths()[0]
+    if intraday_path is None:
+        return None
+
+    def _load():
+        df_intraday = daily_intraday(intraday_path)
+        panel = None
+        try:
+            symbols = df_intraday["Symbol"].astype(str).unique().tolist()
+            panel = load_case_panel(symbols, align="date", lookback=PIVOT_HISTORY)
+        except Exception as e:
+            print(f"⚠️ Weekly/monthly pivots unavailable (CASE store): {e}")
+        return pivot_levels(df_intraday, panel, intraday_trading_date(intraday_path))
+
+    return cached_dataset("pivots", [intraday_path, CASE_STORE_DIR / "index.json"], _load)
+
+
+def daily_symbol_index(intraday_path: Path = None):
+    """فهرس البحث عن الأسهم (build_symbol_search) لملف الجلسة، يُبنى مرة لكل ملف/تحديث."""
+    if intraday_path is None:
+        intraday_path = latest_daily_paths()[0]
+    if intraday_path is None:
+        return None
+    return cached_dataset("symbol_index", [intraday_path, SYMBOLS_MASTER_PATH],
+                          lambda: build_symbol_search(daily_intraday(intraday_path)))
+
+
+def daily_breakout_history():
+    """(events, stats) أحداث الاختراق التاريخية (تُعاد فقط لو مخزن CASE اتغير)."""
+    return cached_dataset("breakout_history", [CASE_STORE_DIR / "index.json"], load_breakout_history)
+
+
+def daily_transactions(tx_path: Path = None):
+    """ملف معاملات الجلسة لأحدث ملف أو للمسار المحدد."""
+    if tx_path is None:
+        tx_path = latest_daily_paths()[1]
+    if tx_path is None:
+        return None
+    return cached_dataset("transactions", [tx_path], lambda: load_transactions(tx_path))
+
+
+def daily_signals(intraday_path: Path = None, tx_path: Path = None):
+    """جدول الإشارات + AI_Prob (يحتاج ملف intraday وملف معاملات)."""
+    latest_intraday, latest_tx = latest_daily_paths()
+    intraday_path = intraday_path or latest_intraday
+    tx_path = tx_path or latest_tx
+    if intraday_path is None or tx_path is None:
+        return None
+    # الشريط بيكبر أثناء الجلسة: كل تغيير فى الملف = قراءة الجديد فقط
+    return cached_dataset("signals", [intraday_path, tx_path],
+                          lambda: live_signals(intraday_path, tx_path,
+                                               df_intraday=daily_intraday(intraday_path)))
+
+
+def daily_ticks(tx_path: Path = None):
+    """مصفوفات الصفقات اللحظية (VWAP / دلتا / صفقات كبيرة / volume profile)."""
+    if tx_path is None:
+        tx_path = latest_daily_paths()[1]
+    if tx_path is None:
+        return None
+    return cached_dataset("ticks", [tx_path], lambda: load_tick_analytics(tx_path))
+
+
+def daily_bars(tx_path: Path = None, interval: int = 5, symbol: str = None):
+    """
+    شموع الجلسة بفترة interval دقيقة (لكل الأسهم أو لسهم واحد). المصفوفات تُحفظ
+    مرة لكل (شريط، فترة) لكل الأسهم، وكل سهم شريحة منها (بدون كاش لكل سهم).
+    """
+    if tx_path is None:
+        tx_path = latest_daily_paths()[1]
+    if tx_path is None:
+        return None
+    bar_set = cached_dataset("bars", [tx_path], lambda: load_bar_set(tx_path, interval),
+                             key_extra=interval)
+    return bars_for_symbol(bar_set, symbol)
+
+
+def daily_signals_archive() -> pd.DataFrame:
+    """
+    أرشيف الإشارات للأيام المغلقة (تحديث الأيام الجديدة/المتغيرة فقط ثم القراءة).
+    الجلسة المفتوحة ليست من المصادر: نموها لا يعيد التحميل، وتدخل الأرشيف فى close_session.
+    """
+    def _load():
+        build_signals_archive()
+        return load_signals_archive()
+
+    days = _signal_day_sources()
+    open_day = _open_session_day(days)
+    sources = [SIGNALS_DIR / "index.json", MODEL_PATH]
+    sources += [p for day, pair in days.items() if day != open_day for p in pair if p is not None]
+    return cached_dataset("signals_archive", sources, _load)
+
+
+def daily_backtest(lookback: int = None, top_n: int = None):
+    """نتائج الـ Backtest (تُعاد فقط لو مخزن CASE أو أرشيف الإشارات اتغير)."""
+    import backtest  # backtest يستورد utils
+
+    top_n = backtest.TOP_N if top_n is None else top_n
+    return cached_dataset(
+        "backtest", [CASE_STORE_DIR / "index.json", SIGNALS_DIR / "index.json"],
+        lambda: backtest.run_backtest(lookback, top_n), key_extra=(lookback, top_n),
+    )
+
+
+def daily_screener(intraday_path: Path = None):
+    """
+    لقطة الـ Screener لجلسة ملف intraday: قراءة/بناء اللقطة المحفوظة بتاريخها.
+    المؤشرات من مخزن CASE كما هو (حتى آخر جلسة مغلقة، انظر close_session).
+    """
+    if intraday_path is None:
+        intraday_path = latest_daily_paths()[0]
+    if intraday_path is None:
+        return None
+
+    def _load():
+        df_intraday = daily_intraday(intraday_path)
+        try:
+            return load_screener_snapshot(intraday_path, df_intraday)
+        except Exception as e:
+            print(f"⚠️ Screener snapshot failed: {e}")
+            return None
+
+    return cached_dataset("screener", [intraday_path, CASE_STORE_DIR / "index.json"], _load)
+
+
+def daily_relationships(intraday_path: Path = None, window: int = None, **kwargs):
+    """علاقات الأسهم لجلسة ملف intraday (تُعاد فقط لو الملف أو مخزن CASE اتغير)."""
+    if intraday_path is None:
+        intraday_path = latest_daily_paths()[0]
+    if intraday_path is None:
+        return pd.DataFrame(columns=correlation.PAIR_COLUMNS)
+    return cached_dataset(
+        "relationships", [intraday_path, CASE_STORE_DIR / "index.json"],
+        lambda: build_stock_relationships(daily_intraday(intraday_path), window=window, **kwargs),
+        key_extra=(window, tuple(sorted(kwargs.items()))),
+    )